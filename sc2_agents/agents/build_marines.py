@@ -29,12 +29,17 @@ from __future__ import division
 from __future__ import print_function
 from pysc2.agents.base_agent import BaseAgent
 from pysc2.lib import actions
+from sc2_agents.lib.decision_skipping import bounding_region
+from sc2_agents.lib.decision_skipping import layer_digest
+from sc2_agents.lib.map_cache import STATIC_MAP_CACHE
+from sc2_agents.lib.sparse_features import screen_coordinates
 
 
 class BuildBarracksAgent(BaseAgent):
     """
     Generic agent for building barracks.
     """
+    map_name = 'BuildMarines'
 
     def __init__(self):
         super(BuildBarracksAgent, self).reset()
@@ -42,6 +47,7 @@ class BuildBarracksAgent(BaseAgent):
         self.cmd_screen = [0]
         self.idle_worker_count = 7
         self.functions = actions.FUNCTIONS
+        self.map_cache = STATIC_MAP_CACHE
         self.neutral_mineralfields = 341
         self.not_queued = [0]
         self.player_friendly = 1
@@ -75,14 +81,13 @@ class BuildBarracksAgent001(BuildBarracksAgent):
         super(BuildBarracksAgent001, self).step(timestep)
         if self.supply_depot_count == 0:    # build supply depot
             if self.functions.Build_SupplyDepot_screen.id in timestep.observation.available_actions:
-                unit_type = timestep.observation.feature_screen.unit_type
-                self.cmdcenters_y, self.cmdcenters_x = (unit_type == self.terran_commandcenter).nonzero()
+                self.cmdcenters_y, self.cmdcenters_x = self.map_cache.coordinates(
+                    timestep.observation, self.map_name, 'unit_type', self.terran_commandcenter)
                 target_point = [int(self.cmdcenters_x.mean()), int(self.cmdcenters_y.mean()) - 15]
                 self.supply_depot_count += 1
                 return actions.FunctionCall(self.functions.Build_SupplyDepot_screen.id, [self.cmd_screen, target_point])
             else:     # select scv
-                unit_type = timestep.observation.feature_screen.unit_type
-                scvs_y, scvs_x = (unit_type == self.terran_scv).nonzero()
+                scvs_y, scvs_x = screen_coordinates(timestep.observation, 'unit_type', self.terran_scv)
                 target_unit = [scvs_x[0], scvs_y[0]]
                 return actions.FunctionCall(self.functions.select_point.id, [self.cmd_screen, target_unit])
         if self.barracks_count == 0:    # build barracks
@@ -97,6 +102,7 @@ class BuildMarinesAgent(BaseAgent):
     """
     Generic agent for building marines.
     """
+    map_name = 'BuildMarines'
 
     def __init__(self):
         super(BuildMarinesAgent, self).reset()
@@ -104,6 +110,7 @@ class BuildMarinesAgent(BaseAgent):
         self.functions = actions.FUNCTIONS
         self.cmd_screen = [0]
         self.idle_worker_count = 7
+        self.map_cache = STATIC_MAP_CACHE
         self.neutral_mineralfields = 341
         self.not_queued = [0]
         self.player_friendly = 1
@@ -135,18 +142,51 @@ class BuildMarinesAgent001(BuildMarinesAgent):
     Scripted agent for building marines.
     """
 
+    def __init__(self):
+        super(BuildMarinesAgent001, self).__init__()
+        self.clear_barracks_location()
+
+    def clear_barracks_location(self):
+        self.barracks_built = None
+        self.barracks_digest = None
+        self.barracks_region = None
+        self.barracks_target = None
+
+    def barracks_location(self, observation):
+        """
+        The barracks centre, rescanned when the screen region around the
+        barracks changes or the agent has ordered another barracks since,
+        which may stand outside that region.
+        """
+        unit_type = observation.feature_screen.unit_type
+        if (self.barracks_target is not None and self.barracks_built == self.barracks_count
+                and layer_digest(unit_type, self.barracks_region) == self.barracks_digest):
+            return self.barracks_target
+        barracks_y, barracks_x = screen_coordinates(observation, 'unit_type', self.terran_barrack_id)
+        if not barracks_y.any():
+            self.barracks_target = None
+            return None
+        self.barracks_built = self.barracks_count
+        self.barracks_region = bounding_region(barracks_y, barracks_x)
+        self.barracks_digest = layer_digest(unit_type, self.barracks_region)
+        self.barracks_target = [int(barracks_x.mean()), int(barracks_y.mean())]
+        return self.barracks_target
+
+    def reset(self):
+        super(BuildMarinesAgent001, self).reset()
+        self.clear_barracks_location()
+
     def step(self, timestep):
         super(BuildMarinesAgent001, self).step(timestep)
         if self.supply_depot_count == 0:    # build supply depot
             if self.functions.Build_SupplyDepot_screen.id in timestep.observation.available_actions:
-                unit_type = timestep.observation.feature_screen.unit_type
-                self.cmdcenters_y, self.cmdcenters_x = (unit_type == self.terran_commandcenter).nonzero()
+                self.cmdcenters_y, self.cmdcenters_x = self.map_cache.coordinates(
+                    timestep.observation, self.map_name, 'unit_type', self.terran_commandcenter)
                 target_point = [int(self.cmdcenters_x.mean()), int(self.cmdcenters_y.mean()) - 15]
                 self.supply_depot_count += 1
                 return actions.FunctionCall(self.functions.Build_SupplyDepot_screen.id, [self.cmd_screen, target_point])
             else:     # select scv
-                unit_type = timestep.observation.feature_screen.unit_type
-                scvs_y, scvs_x = (unit_type == self.terran_scv).nonzero()
+                scvs_y, scvs_x = screen_coordinates(timestep.observation, 'unit_type', self.terran_scv)
                 target_unit = [scvs_x[0], scvs_y[0]]
                 return actions.FunctionCall(self.functions.select_point.id, [self.cmd_screen, target_unit])
         if self.barracks_count == 0:    # build barracks
@@ -158,11 +198,9 @@ class BuildMarinesAgent001(BuildMarinesAgent):
             if timestep.observation['player'][self.supply_used_id] < timestep.observation['player'][self.supply_max_id]:
                 return actions.FunctionCall(self.functions.Train_Marine_quick.id, [self.queued])
         else:    # select barracks
-            unit_type = timestep.observation.feature_screen.unit_type
-            barracks_y, barracks_x = (unit_type == self.terran_barrack_id).nonzero()
-            if not barracks_y.any():
+            target_point = self.barracks_location(timestep.observation)
+            if target_point is None:
                 return actions.FunctionCall(self.functions.no_op.id, [])
-            target_point = [int(barracks_x.mean()), int(barracks_y.mean())]
             return actions.FunctionCall(self.functions.select_point.id, [self.cmd_screen, target_point])
         return actions.FunctionCall(self.functions.no_op.id, [])
 
@@ -209,14 +247,12 @@ class BuildSupplyDepotAgent001(BuildBarracksAgent):
         super(BuildSupplyDepotAgent001, self).step(timestep)
         if self.supply_depot_count == 0:    # build supply depot
             if self.functions.Build_SupplyDepot_screen.id in timestep.observation.available_actions:
-                unit_type = timestep.observation.feature_screen.unit_type
-                cmdcenters_y, cmdcenters_x = (unit_type == self.terran_commandcenter).nonzero()
+                cmdcenters_y, cmdcenters_x = screen_coordinates(timestep.observation, 'unit_type', self.terran_commandcenter)
                 target_point = [int(cmdcenters_x.mean()), int(cmdcenters_y.mean()) - 15]
                 self.supply_depot_count += 1
                 return actions.FunctionCall(self.functions.Build_SupplyDepot_screen.id, [self.cmd_screen, target_point])
             else:   # select scv
-                unit_type = timestep.observation.feature_screen.unit_type
-                scvs_y, scvs_x = (unit_type == self.terran_scv).nonzero()
+                scvs_y, scvs_x = screen_coordinates(timestep.observation, 'unit_type', self.terran_scv)
                 target_unit = [scvs_x[0], scvs_y[0]]
                 return actions.FunctionCall(self.functions.select_point.id, [self.cmd_screen, target_unit])
         return actions.FunctionCall(self.functions.no_op.id, [])
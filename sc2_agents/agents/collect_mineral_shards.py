@@ -31,6 +31,7 @@ from numpy import array as np_array
 from numpy import linalg as np_linalg
 from pysc2.agents.scripted_agent import CollectMineralShards
 from pysc2.lib import actions
+from sc2_agents.lib.sparse_features import screen_coordinates
 
 
 class CollectMineralShardsAgent(CollectMineralShards):
@@ -69,9 +70,8 @@ class CollectMineralShardsAgent001(CollectMineralShardsAgent):
     def step(self, timestep):
         super(CollectMineralShardsAgent001, self).step(timestep)
         if self.functions.Move_screen.id in timestep.observation.available_actions:
-            player_relative = timestep.observation.feature_screen.player_relative
-            neutral_y, neutral_x = (player_relative == self.player_neutral).nonzero()
-            player_y, player_x = (player_relative == self.player_friendly).nonzero()
+            neutral_y, neutral_x = screen_coordinates(timestep.observation, 'player_relative', self.player_neutral)
+            player_y, player_x = screen_coordinates(timestep.observation, 'player_relative', self.player_friendly)
             player = [int(player_x.mean()), int(player_y.mean())]
             closest, min_dist = None, None
             for p in zip(neutral_x, neutral_y):
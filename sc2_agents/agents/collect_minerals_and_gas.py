@@ -31,6 +31,8 @@ from numpy import array as np_array
 from numpy import linalg as np_linalg
 from pysc2.agents.base_agent import BaseAgent
 from pysc2.lib import actions
+from sc2_agents.lib.map_cache import STATIC_MAP_CACHE
+from sc2_agents.lib.sparse_features import screen_coordinates
 from scipy import stats as sp_stats
 
 
@@ -38,12 +40,14 @@ class CollectMineralsAgent(BaseAgent):
     """
     Generic agent for collecting minerals.
     """
+    map_name = 'CollectMineralsAndGas'
 
     def __init__(self):
         super(CollectMineralsAgent, self).__init__()
         self.cmd_screen = [0]
         self.functions = actions.FUNCTIONS
         self.idle_worker_count = 7
+        self.map_cache = STATIC_MAP_CACHE
         self.neutral_mineralfields = 341
         self.results = {}
         self.results['agent_id'] = self.__class__.__name__
@@ -70,8 +74,7 @@ class CollectMineralsAgent001(CollectMineralsAgent):
         super(CollectMineralsAgent001, self).step(timestep)
         if timestep.observation['player'][self.idle_worker_count] > 0:
             if self.functions.Harvest_Gather_screen.id in timestep.observation.available_actions:
-                unit_type = timestep.observation.feature_screen.unit_type
-                mineralfields_y, mineralfields_x = (unit_type == self.neutral_mineralfields).nonzero()
+                mineralfields_y, mineralfields_x = screen_coordinates(timestep.observation, 'unit_type', self.neutral_mineralfields)
                 target_unit = [mineralfields_x[10], mineralfields_y[10]]
                 return actions.FunctionCall(self.functions.Harvest_Gather_screen.id, [self.cmd_screen, target_unit])
             elif self.functions.select_idle_worker.id in timestep.observation.available_actions:
@@ -90,8 +93,7 @@ class CollectMineralsAgent002(CollectMineralsAgent):
         super(CollectMineralsAgent002, self).step(timestep)
         if timestep.observation['player'][self.idle_worker_count] > 0:
             if self.functions.Harvest_Gather_screen.id in timestep.observation.available_actions:
-                unit_type = timestep.observation.feature_screen.unit_type
-                mineralfields_y, mineralfields_x = (unit_type == self.neutral_mineralfields).nonzero()
+                mineralfields_y, mineralfields_x = screen_coordinates(timestep.observation, 'unit_type', self.neutral_mineralfields)
                 mineralfield_x = sp_stats.mode(mineralfields_x)
                 mineralfield_y = sp_stats.mode(mineralfields_y)
                 target_unit = [mineralfield_x[0], mineralfield_y[0]]
@@ -116,8 +118,8 @@ class CollectMineralsAgent003(CollectMineralsAgent):
     def step(self, timestep):
         super(CollectMineralsAgent003, self).step(timestep)
         if timestep.first():
-            unit_type = timestep.observation.feature_screen.unit_type
-            self.mineralfields_y, self.mineralfields_x = (unit_type == self.neutral_mineralfields).nonzero()
+            self.mineralfields_y, self.mineralfields_x = self.map_cache.coordinates(
+                timestep.observation, self.map_name, 'unit_type', self.neutral_mineralfields)
         if timestep.observation['player'][self.idle_worker_count] > 0:
             if self.functions.Harvest_Gather_screen.id in timestep.observation.available_actions:
                 target_unit = [self.mineralfields_x[self.steps], self.mineralfields_y[self.steps]]
@@ -146,8 +148,8 @@ class CollectMineralsAgent004(CollectMineralsAgent):
     def step(self, timestep):
         super(CollectMineralsAgent004, self).step(timestep)
         if timestep.first():
-            unit_type = timestep.observation.feature_screen.unit_type
-            self.mineralfields_y, self.mineralfields_x = (unit_type == self.neutral_mineralfields).nonzero()
+            self.mineralfields_y, self.mineralfields_x = self.map_cache.coordinates(
+                timestep.observation, self.map_name, 'unit_type', self.neutral_mineralfields)
             for x, y in zip(self.mineralfields_x, self.mineralfields_y):
                 if x < 32:
                     self.less_than_x.append(x)
@@ -178,12 +180,11 @@ class CollectMineralsAgent005(CollectMineralsAgent):
     def step(self, timestep):
         super(CollectMineralsAgent005, self).step(timestep)
         if timestep.first():
-            unit_type = timestep.observation.feature_screen.unit_type
-            self.mineralfields_y, self.mineralfields_x = (unit_type == self.neutral_mineralfields).nonzero()
+            self.mineralfields_y, self.mineralfields_x = self.map_cache.coordinates(
+                timestep.observation, self.map_name, 'unit_type', self.neutral_mineralfields)
         if timestep.observation['player'][self.idle_worker_count] > 0:
             if self.functions.Harvest_Gather_screen.id in timestep.observation.available_actions:
-                selected = timestep.observation.feature_screen.selected
-                player_y, player_x = (selected == self.player_self).nonzero()
+                player_y, player_x = screen_coordinates(timestep.observation, 'selected', self.player_self)
                 player = [int(player_x.mean()), int(player_y.mean())]
                 index, min_dist = None, None
                 for i in range(len(self.mineralfields_x)):
@@ -211,8 +212,8 @@ class CollectMineralsAgent006(CollectMineralsAgent):
     def step(self, timestep):
         super(CollectMineralsAgent006, self).step(timestep)
         if timestep.first():
-            unit_type = timestep.observation.feature_screen.unit_type
-            self.mineralfields_y, self.mineralfields_x = (unit_type == self.neutral_mineralfields).nonzero()
+            self.mineralfields_y, self.mineralfields_x = self.map_cache.coordinates(
+                timestep.observation, self.map_name, 'unit_type', self.neutral_mineralfields)
         if timestep.observation['player'][self.idle_worker_count] > 0:
             if self.functions.Harvest_Gather_screen.id in timestep.observation.available_actions:
                 target_unit = [self.mineralfields_x[0], self.mineralfields_y[self.steps]]
@@ -271,12 +272,14 @@ class CollectMineralsAndGasAgent(BaseAgent):
     """
     Generic agent for collecting minerals and gas.
     """
+    map_name = 'CollectMineralsAndGas'
 
     def __init__(self):
         super(CollectMineralsAndGasAgent, self).reset()
         self.functions = actions.FUNCTIONS
         self.cmd_screen = [0]
         self.idle_worker_count = 7
+        self.map_cache = STATIC_MAP_CACHE
         self.neutral_mineralfields = 341
         self.refinery_count = 0
         self.results = {}
@@ -304,22 +307,20 @@ class CollectMineralsAndGasAgent001(CollectMineralsAndGasAgent):
         super(CollectMineralsAndGasAgent001, self).step(timestep)
         if timestep.observation['player'][self.idle_worker_count] > 0:    # harvest minerals
             if self.functions.Harvest_Gather_screen.id in timestep.observation.available_actions:
-                unit_type = timestep.observation.feature_screen.unit_type
-                mineralfields_y, mineralfields_x = (unit_type == self.neutral_mineralfields).nonzero()
+                mineralfields_y, mineralfields_x = screen_coordinates(timestep.observation, 'unit_type', self.neutral_mineralfields)
                 target_unit = [mineralfields_x[10], mineralfields_y[10]]
                 return actions.FunctionCall(self.functions.Harvest_Gather_screen.id, [self.cmd_screen, target_unit])
             else:    # select idle workers
                 return actions.FunctionCall(self.functions.select_idle_worker.id, [self.select_worker_all])
         elif self.refinery_count == 0:    # build refinery
             if self.functions.Build_Refinery_screen.id in timestep.observation.available_actions:
-                unit_type = timestep.observation.feature_screen.unit_type
-                vespenegeysers_y, vespenegeysers_x = (unit_type == self.vespene_geyser).nonzero()
+                vespenegeysers_y, vespenegeysers_x = self.map_cache.coordinates(
+                    timestep.observation, self.map_name, 'unit_type', self.vespene_geyser)
                 target_unit = [vespenegeysers_x[10], vespenegeysers_y[10]]
                 self.refinery_count += 1
                 return actions.FunctionCall(self.functions.Build_Refinery_screen.id, [self.cmd_screen, target_unit])
             else:    # select worker
-                unit_type = timestep.observation.feature_screen.unit_type
-                unit_y, unit_x = (unit_type == self.terran_scv).nonzero()
+                unit_y, unit_x = screen_coordinates(timestep.observation, 'unit_type', self.terran_scv)
                 target_unit = [unit_x[0], unit_y[0]]
                 return actions.FunctionCall(self.functions.select_point.id, [self.cmd_screen, target_unit])
         return actions.FunctionCall(self.functions.no_op.id, [])
@@ -334,16 +335,15 @@ class CollectMineralsAndGasAgent002(CollectMineralsAndGasAgent):
         super(CollectMineralsAndGasAgent002, self).step(timestep)
         if timestep.observation['player'][self.idle_worker_count] > 0:    # harvest minerals
             if self.functions.Harvest_Gather_screen.id in timestep.observation.available_actions:
-                unit_type = timestep.observation.feature_screen.unit_type
-                mineralfields_y, mineralfields_x = (unit_type == self.neutral_mineralfields).nonzero()
+                mineralfields_y, mineralfields_x = screen_coordinates(timestep.observation, 'unit_type', self.neutral_mineralfields)
                 target_unit = [mineralfields_x[10], mineralfields_y[10]]
                 return actions.FunctionCall(self.functions.Harvest_Gather_screen.id, [self.cmd_screen, target_unit])
             else:    # select idle workers
                 return actions.FunctionCall(self.functions.select_idle_worker.id, [self.select_worker_all])
         elif self.refinery_count == 0:    # build refinery
             if self.functions.Build_Refinery_screen.id in timestep.observation.available_actions:
-                unit_type = timestep.observation.feature_screen.unit_type
-                vespene_geysers_y, vespene_geysers_x = (unit_type == self.vespene_geyser).nonzero()
+                vespene_geysers_y, vespene_geysers_x = self.map_cache.coordinates(
+                    timestep.observation, self.map_name, 'unit_type', self.vespene_geyser)
                 vespene_geyser_x, vespene_geyser_y = [], []
                 for x in vespene_geysers_x:
                     if x < 42:
@@ -355,8 +355,7 @@ class CollectMineralsAndGasAgent002(CollectMineralsAndGasAgent):
                 self.refinery_count += 1
                 return actions.FunctionCall(self.functions.Build_Refinery_screen.id, [self.cmd_screen, target_unit])
             else:    # select worker
-                unit_type = timestep.observation.feature_screen.unit_type
-                unit_y, unit_x = (unit_type == self.terran_scv).nonzero()
+                unit_y, unit_x = screen_coordinates(timestep.observation, 'unit_type', self.terran_scv)
                 target_unit = [unit_x[0], unit_y[0]]
                 return actions.FunctionCall(self.functions.select_point.id, [self.cmd_screen, target_unit])
         return actions.FunctionCall(self.functions.no_op.id, [])
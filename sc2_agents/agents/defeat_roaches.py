@@ -30,6 +30,7 @@ from __future__ import print_function
 from numpy import argmax as np_argmax
 from pysc2.agents.scripted_agent import DefeatRoaches
 from pysc2.lib import actions
+from sc2_agents.lib.sparse_features import screen_coordinates
 
 
 class DefeatRoachesAgent(DefeatRoaches):
@@ -64,8 +65,7 @@ class DefeatRoachesAgent001(DefeatRoachesAgent):
     def step(self, timestep):
         super(DefeatRoachesAgent001, self).step(timestep)
         if self.functions.Attack_screen.id in timestep.observation.available_actions:
-            player_relative = timestep.observation.feature_screen.player_relative
-            hostiles_y, hostiles_x = (player_relative == self.player_hostile).nonzero()
+            hostiles_y, hostiles_x = screen_coordinates(timestep.observation, 'player_relative', self.player_hostile)
             if not hostiles_y.any():
                 return actions.FunctionCall(self.functions.no_op.id, [])
             index = np_argmax(hostiles_y)
@@ -24,10 +24,14 @@
 A collection of agents for moving to a beacon.
 """
 
-from baselines.deepq.simple import load
 from numpy import array as np_array
+from pysc2.agents.base_agent import BaseAgent
 from pysc2.agents.scripted_agent import MoveToBeacon
 from pysc2.lib import actions
+from sc2_agents.lib.decision_skipping import bounding_region
+from sc2_agents.lib.decision_skipping import HeldDecision
+from sc2_agents.lib.numpy_policy import load_policy
+from sc2_agents.lib.sparse_features import screen_coordinates
 
 class MoveToBeaconAgent(MoveToBeacon):
 
@@ -58,18 +62,23 @@ class MoveToBeaconAgent001(MoveToBeaconAgent):
 
     def __init__(self):
         super(MoveToBeaconAgent001, self).__init__()
+        self.held_decision = None
         self.not_queued = [0]
         self.player_neutral = 3
         self.select_all = [0]
 
     def step(self, timestep):
+        BaseAgent.step(self, timestep)    # count the step without running the scripted MoveToBeacon
         if self.functions.Move_screen.id in timestep.observation.available_actions:
-            player_relative = timestep.observation.feature_screen.player_relative
-            neutral_y, neutral_x = (player_relative == self.player_neutral).nonzero()
+            neutral_y, neutral_x = screen_coordinates(timestep.observation, 'player_relative', self.player_neutral)
             if not neutral_y.any():
                 return actions.FunctionCall(self.functions.no_op.id, [])
             target = [int(neutral_x.mean()), int(neutral_y.mean())]
-            return actions.FunctionCall(self.functions.Move_screen.id, [self.not_queued, target])
+            action = actions.FunctionCall(self.functions.Move_screen.id, [self.not_queued, target])
+            # the beacon stays put until it is reached
+            self.held_decision = HeldDecision(
+                action, timestep, watch=[('player_relative', bounding_region(neutral_y, neutral_x))])
+            return action
         else:
             return actions.FunctionCall(self.functions.select_army.id, [self.select_all])
         return actions.FunctionCall(self.functions.no_op.id, [])
@@ -80,11 +89,11 @@ class MoveToBeaconAgent002(MoveToBeaconAgent):
     DeepQ agent for moving to a beacon.
     """
 
-    def __init__(self):
+    def __init__(self, act_x=None, act_y=None):
         super(MoveToBeaconAgent002, self).__init__()
-        self.act_x = load(
+        self.act_x = act_x or load_policy(
             'C:\\Users\\ben\\Google Drive\\MachineLearningProjects\\src\\reinforcement_learning\\project_starcraft\\sc2_agents\\sc2_agents\\bin\\baselines\\training\\move_to_beacon\\dqn\\64_hiddens\\trial_1\\move_to_beacon_deepq_model_1.pkl')
-        self.act_y = load(
+        self.act_y = act_y or load_policy(
             'C:\\Users\\ben\\Google Drive\\MachineLearningProjects\\src\\reinforcement_learning\\project_starcraft\\sc2_agents\\sc2_agents\\bin\\baselines\\training\\move_to_beacon\\dqn\\64_hiddens\\trial_1\\move_to_beacon_deepq_model_1.pkl')
         self.mean_reward = 0
         self.x_coord = 0
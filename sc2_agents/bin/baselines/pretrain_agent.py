@@ -0,0 +1,152 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Behavior-cloning pretraining of the act_x/act_y coordinate policies
+from scripted-agent demonstrations.
+
+The saved act functions can be loaded with baselines.deepq.simple.load,
+the same way MoveToBeaconAgent002 loads its trained policies.
+
+python -m sc2_agents.bin.baselines.pretrain_agent --demonstrations ./demonstrations/move_to_beacon --save_dir ./pretrained/move_to_beacon
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from baselines import deepq
+from baselines.common import tf_util as U
+from baselines.deepq.simple import ActWrapper
+from logging import basicConfig as logging_basicConfig
+from logging import getLogger
+from logging import INFO
+from numpy import clip as np_clip
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import mean as np_mean
+from os import makedirs
+from os import path
+from sc2_agents.lib.demonstrations import DemonstrationLoader
+from time import time
+import tensorflow as tf
+
+FLAGS = flags.FLAGS
+flags.DEFINE_integer('batch_size', 64, "Minibatch size")
+flags.DEFINE_list('convs', [], "Convolution layers as outputs:kernel:stride (empty for an mlp)")
+flags.DEFINE_string('demonstrations', None, "Directory of the recorded demonstrations")
+flags.DEFINE_bool('dueling', False, "Use a dueling network")
+flags.DEFINE_integer('epochs', 10, "Passes over the demonstrations")
+flags.DEFINE_list('hiddens', ['64'], "Hidden layer sizes")
+flags.DEFINE_float('learning_rate', 1e-3, "Adam learning rate")
+flags.DEFINE_integer('num_cpu', 1, "TensorFlow threads per policy")
+flags.DEFINE_integer('player_neutral', 3, "player_relative value of the beacon/minerals")
+flags.DEFINE_string('save_dir', None, "Directory for act_x.pkl and act_y.pkl")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_integer('shards_in_memory', 4, "Dataset shards held in memory at once")
+flags.mark_flag_as_required('demonstrations')
+flags.mark_flag_as_required('save_dir')
+
+
+def q_function():
+    hiddens = [int(hidden) for hidden in FLAGS.hiddens]
+    if FLAGS.convs:
+        convs = [tuple(int(value) for value in conv.split(':')) for conv in FLAGS.convs]
+        return deepq.models.cnn_to_mlp(convs=convs, hiddens=hiddens, dueling=FLAGS.dueling)
+    return deepq.models.mlp(hiddens)
+
+
+class CoordinatePolicy(object):
+    """
+    An act function for one screen coordinate, with the ops to fit its
+    Q-values to the demonstrated coordinate as a classification target.
+    Each policy lives in its own graph so it saves and loads exactly like
+    a policy trained with deepq.learn.
+    """
+
+    def __init__(self, q_func, screen_size, learning_rate):
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            self.session = U.make_session(num_cpu=FLAGS.num_cpu)
+            with self.session.as_default():
+                def make_obs_ph(name):
+                    return U.BatchInput((screen_size, screen_size), name=name)
+                self.act = deepq.build_act(make_obs_ph, q_func, num_actions=screen_size)
+                self.act_params = {'make_obs_ph': make_obs_ph, 'q_func': q_func, 'num_actions': screen_size}
+                self.observations = make_obs_ph('bc_observation')
+                self.targets = tf.placeholder(tf.int32, [None], name='bc_target')
+                with tf.variable_scope('deepq', reuse=True):
+                    q_values = q_func(self.observations.get(), screen_size, scope='q_func', reuse=True)
+                self.loss = tf.reduce_mean(
+                    tf.nn.sparse_softmax_cross_entropy_with_logits(labels=self.targets, logits=q_values))
+                predictions = tf.cast(tf.argmax(q_values, axis=1), tf.int32)
+                self.accuracy = tf.reduce_mean(tf.cast(tf.equal(predictions, self.targets), tf.float32))
+                self.optimize = tf.train.AdamOptimizer(learning_rate).minimize(self.loss)
+                U.initialize()
+
+    def train(self, screens, targets):
+        with self.graph.as_default():
+            loss, accuracy, _ = self.session.run(
+                [self.loss, self.accuracy, self.optimize],
+                feed_dict={self.observations.get(): screens, self.targets: targets})
+        return loss, accuracy
+
+    def save(self, save_path):
+        with self.graph.as_default(), self.session.as_default():
+            ActWrapper(self.act, self.act_params).save(save_path)
+
+
+def main(argv):
+    logging_basicConfig(level=INFO)
+    logger = getLogger(__file__)
+    logger.setLevel(INFO)
+
+    loader = DemonstrationLoader(FLAGS.demonstrations,
+                                 batch_size=FLAGS.batch_size,
+                                 shards_in_memory=FLAGS.shards_in_memory)
+    layer = loader.layer_index('player_relative')
+    policies = {'x': CoordinatePolicy(q_function(), FLAGS.screen_size, FLAGS.learning_rate),
+                'y': CoordinatePolicy(q_function(), FLAGS.screen_size, FLAGS.learning_rate)}
+    logger.info("Pretraining on {} recorded samples".format(len(loader)))
+
+    start_time = time()
+    for epoch in range(FLAGS.epochs):
+        stats = {'x': [], 'y': []}
+        for batch in loader:
+            screens = (batch['screens'][:, layer] == FLAGS.player_neutral).astype(np_float32)
+            for axis, policy in policies.items():
+                targets = np_clip(batch[axis], 0, FLAGS.screen_size - 1)
+                stats[axis].append(policy.train(screens, targets))
+        for axis in sorted(stats):
+            logger.info("Epoch {:d} act_{}: loss {:0.4f}, accuracy {:0.3f}".format(
+                epoch, axis, np_mean([s[0] for s in stats[axis]]), np_mean([s[1] for s in stats[axis]])))
+        logger.info("Elapsed {:0.1f} seconds".format(time() - start_time))
+
+    if not path.isdir(FLAGS.save_dir):
+        makedirs(FLAGS.save_dir)
+    for axis, policy in policies.items():
+        save_path = path.join(FLAGS.save_dir, 'act_{}.pkl'.format(axis))
+        policy.save(save_path)
+        logger.info("Saved act_{} to {}".format(axis, save_path))
+
+if __name__ == '__main__':
+    app.run(main)
@@ -22,53 +22,162 @@
 
 from absl import app
 from absl import flags
+from contextlib import ExitStack
 from gym import make
 from gym_sc2 import envs
+from os import path
+from sc2_agents.lib.cpu_affinity import configured_threads
+from sc2_agents.lib.cpu_affinity import session_config
+from sc2_agents.lib.env_pool import pooled_env
+from sc2_agents.lib.frame_stack import stack_frames
+from sc2_agents.lib.memory_telemetry import MemoryMonitor
+from sc2_agents.lib.metrics import MetricsServer
+from sc2_agents.lib.metrics import REGISTRY
+from sc2_agents.lib.metrics import TrainingMetrics
+from sc2_agents.lib.preprocessing import preprocess_env
+from sc2_agents.lib.run_log import RunLog
+from time import time
 
-def train_deepq_agent(env):
+def deepq_callback(run_log, training_metrics, memory_monitor=None):
+    """
+    Log the episodes deepq.learn finishes to the run log.
+    The last entry of its episode_rewards is the episode in progress.
+    The callback runs once per step, so it also times the steps.
+    """
+    state = {'step_time': None, 'episode_start': 0}
+    def callback(lcl, glb):
+        now = time()
+        if state['step_time'] is not None:
+            training_metrics.step_seconds.observe(now - state['step_time'])
+        state['step_time'] = now
+        finished = lcl['episode_rewards'][:-1]
+        for reward in finished[len(run_log.episode_rewards):]:
+            length = lcl['t'] - state['episode_start']
+            state['episode_start'] = lcl['t']
+            run_log.episode(reward, length)
+            training_metrics.episode(reward, length)
+            if memory_monitor is not None:
+                memory_monitor.episode_finished()
+        run_log.timesteps = lcl['t']
+        return False
+    return callback
+
+def ppo_callback(run_log, training_metrics, memory_monitor=None):
+    """
+    Log the episodes of each completed ppo1 segment to the run log.
+    """
+    state = {'iteration': 0}
+    def callback(lcl, glb):
+        if 'seg' in lcl and lcl['iters_so_far'] != state['iteration']:
+            state['iteration'] = lcl['iters_so_far']
+            for reward, length in zip(lcl['seg']['ep_rets'], lcl['seg']['ep_lens']):
+                run_log.episode(reward, length)
+                training_metrics.episode(reward, length)
+                if memory_monitor is not None:
+                    memory_monitor.episode_finished()
+        return False
+    return callback
+
+def train_deepq_agent(env, run_log, training_metrics, memory_monitor=None):
     from baselines import deepq
     network = 'mlp'
     act = deepq.learn(
         env,
         network,
-        total_timesteps=1000)
-    act.save(FLAGS.save_dir)
+        lr=FLAGS.lr,
+        total_timesteps=FLAGS.timesteps,
+        buffer_size=FLAGS.buffer_size,
+        exploration_fraction=FLAGS.exploration_fraction,
+        batch_size=FLAGS.batch_size,
+        target_network_update_freq=FLAGS.target_network_update_freq,
+        callback=deepq_callback(run_log, training_metrics, memory_monitor),
+        num_layers=FLAGS.num_layers,
+        num_hidden=FLAGS.num_hidden)
+    with training_metrics.checkpoint_seconds.time():
+        act.save(path.join(FLAGS.save_dir, 'model.pkl'))
 
-def train_ppo_agent(env):
+def train_ppo_agent(env, run_log, training_metrics, memory_monitor=None):
     from baselines import ppo1
     def policy_fn(name, ob_space, ac_space):
         return ppo1.cnn_policy.CnnPolicy(name, ob_space, ac_space)
     ppo1.pposgd_simple.learn(
         env,
         policy_fn,
-        max_timesteps=1000,
-        timesteps_per_actorbatch=2048,
-        clip_param=0.2,
-        entcoeff=0.0,
-        optim_epochs=5,
-        optim_stepsize=3e-4,
-        optim_batchsize=256,
-        gamma=0.99,
-        lam=0.95,
-        schedule='linear')
+        max_timesteps=FLAGS.timesteps,
+        timesteps_per_actorbatch=FLAGS.timesteps_per_actorbatch,
+        clip_param=FLAGS.clip_param,
+        entcoeff=FLAGS.entcoeff,
+        optim_epochs=FLAGS.optim_epochs,
+        optim_stepsize=FLAGS.optim_stepsize,
+        optim_batchsize=FLAGS.optim_batchsize,
+        gamma=FLAGS.gamma,
+        lam=FLAGS.lam,
+        schedule='linear',
+        callback=ppo_callback(run_log, training_metrics, memory_monitor))
 
 def main(argv):
-    env = make('{}-bbueno5000-v0'.format(FLAGS.map_name))
-    if FLAGS.algorithm is 'deepq':
-        train_deepq_agent(env)
-    elif FLAGS.algorithm is 'ppo':
-        train_ppo_agent(env)
-    else:
-        print("ERROR: Unknown algorithm selected")
+    if FLAGS.save_dir is None:
+        FLAGS.save_dir = './{}-{}-{}'.format(FLAGS.map_name, FLAGS.algorithm, 1)
+    run_log = RunLog(FLAGS.save_dir, resume=False)
+    memory_monitor = None
+    if FLAGS.memory_snapshot_episodes:
+        memory_monitor = MemoryMonitor(FLAGS.save_dir, snapshot_episodes=FLAGS.memory_snapshot_episodes).start()
+    REGISTRY.labels.update(trainer='baselines', algorithm=FLAGS.algorithm, map_name=FLAGS.map_name)
+    training_metrics = TrainingMetrics(REGISTRY)
+    if FLAGS.metrics_port:
+        MetricsServer(REGISTRY, port=FLAGS.metrics_port, host=FLAGS.metrics_host).start()
+    gym_id = '{}-bbueno5000-v0'.format(FLAGS.map_name)
+    env = pooled_env(gym_id, FLAGS.env_pool) if FLAGS.env_pool else make(gym_id)
+    env = preprocess_env(env, crop=FLAGS.crop, factor=FLAGS.downsample, mode=FLAGS.downsample_mode)
+    # ppo's CnnPolicy expects the frames as channels
+    env = stack_frames(env, FLAGS.frame_stack, channels_last=FLAGS.algorithm == 'ppo')
+    with ExitStack() as stack:
+        num_threads = FLAGS.num_threads or configured_threads()
+        if num_threads:
+            from tensorflow import Session
+            stack.enter_context(Session(config=session_config(num_threads)))
+        if FLAGS.algorithm == 'deepq':
+            train_deepq_agent(env, run_log, training_metrics, memory_monitor)
+        elif FLAGS.algorithm == 'ppo':
+            train_ppo_agent(env, run_log, training_metrics, memory_monitor)
+        else:
+            print("ERROR: Unknown algorithm selected")
+    run_log.save()
+    if memory_monitor is not None:
+        memory_monitor.stop()
     env.close()
 
 FLAGS = flags.FLAGS
-flags.DEFINE_string('algorithm', None, "Id of the Gym environment")
-flags.DEFINE_string('map_name', None, "Id of the Gym environment")
-flags.DEFINE_string('save_dir', None, "Id of the Gym environment")
+flags.DEFINE_string('algorithm', 'deepq', "Training algorithm (deepq or ppo)")
+flags.DEFINE_list('crop', None, "Crop the screen to x0,y0,x1,y1 before downsampling")
+flags.DEFINE_integer('downsample', 1, "Reduce the screen by this factor in each direction")
+flags.DEFINE_enum('downsample_mode', 'max', ['max', 'stride'], "Max-pool blocks or keep every n-th pixel")
+flags.DEFINE_string('env_pool', None, "Take the environment from the pool at host:port (see bin/env_pool)")
+flags.DEFINE_integer('frame_stack', 1, "Observe the last k frames")
+flags.DEFINE_string('map_name', 'MoveToBeacon', "Name of the minigame")
+flags.DEFINE_integer('memory_snapshot_episodes', 0, "Diff tracemalloc snapshots every x episodes (0 = disabled)")
+flags.DEFINE_string('metrics_host', '127.0.0.1', "Interface to serve metrics on")
+flags.DEFINE_integer('metrics_port', 0, "Serve Prometheus metrics on this port (0 = disabled)")
+flags.DEFINE_integer('num_threads', None, "TensorFlow threads (default: set by the launcher, else all cores)")
+flags.DEFINE_string('save_dir', None, "Directory for the model and run log")
+flags.DEFINE_integer('timesteps', 1000, "Number of timesteps to train for")
+# deepq
+flags.DEFINE_integer('batch_size', 32, "deepq: minibatch size")
+flags.DEFINE_integer('buffer_size', 50000, "deepq: replay buffer size")
+flags.DEFINE_float('exploration_fraction', 0.1, "deepq: fraction of training spent annealing epsilon")
+flags.DEFINE_float('lr', 5e-4, "deepq: learning rate")
+flags.DEFINE_integer('num_hidden', 64, "deepq: units per mlp layer")
+flags.DEFINE_integer('num_layers', 2, "deepq: number of mlp layers")
+flags.DEFINE_integer('target_network_update_freq', 500, "deepq: timesteps between target network updates")
+# ppo
+flags.DEFINE_float('clip_param', 0.2, "ppo: clipping parameter")
+flags.DEFINE_float('entcoeff', 0.0, "ppo: entropy coefficient")
+flags.DEFINE_float('gamma', 0.99, "ppo: discount factor")
+flags.DEFINE_float('lam', 0.95, "ppo: GAE lambda")
+flags.DEFINE_integer('optim_batchsize', 256, "ppo: optimizer minibatch size")
+flags.DEFINE_integer('optim_epochs', 5, "ppo: optimizer epochs per batch")
+flags.DEFINE_float('optim_stepsize', 3e-4, "ppo: optimizer step size")
+flags.DEFINE_integer('timesteps_per_actorbatch', 2048, "ppo: timesteps per actor batch")
 
 if __name__ == '__main__':
-    FLAGS.algorithm = 'deepq'
-    FLAGS.map_name = 'MoveToBeacon'
-    FLAGS.save_dir = './{}-{}-{}'.format(FLAGS.map_name, FLAGS.algorithm, 1)
     app.run(main)
@@ -0,0 +1,107 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Memory per transition and per-step stacking time of the frame-stacking
+ring buffer against stacking with np.stack and storing both stacks of
+every transition, for k = 1, 4 and 8.
+
+Frames are player_relative screens of the stand-in MoveToBeacon played
+with random moves.
+
+python -m sc2_agents.bin.benchmark_frame_stack --ks 1,4,8 --transitions 20000
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from collections import deque
+from numpy import stack as np_stack
+from numpy import uint8 as np_uint8    # pylint: disable=E0611
+from numpy.random import RandomState
+from sc2_agents.lib.frame_stack import FrameStackReplay
+from sc2_agents.lib.standin_env import StandInMinigame
+from timeit import default_timer
+
+FLAGS = flags.FLAGS
+flags.DEFINE_list('ks', ['1', '4', '8'], "Stack sizes to compare")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_integer('transitions', 20000, "Transitions stored by each replay buffer")
+
+
+def frames(count):
+    env = StandInMinigame('MoveToBeacon', screen_size=FLAGS.screen_size, seed=0)
+    random = RandomState(0)
+    timestep = env.reset()[0]
+    for _ in range(count):
+        first = timestep.first()
+        timestep = env.step(random.randint(0, FLAGS.screen_size, size=2))[0] if not timestep.last() else env.reset()[0]
+        yield first, timestep.observation.feature_screen.player_relative.astype(np_uint8), timestep.last()
+
+
+def naive(k, episode_frames):
+    transitions, recent = [], deque(maxlen=k)
+    start_time = default_timer()
+    state = None
+    for first, frame, done in episode_frames:
+        if first or state is None:
+            recent.extend([frame] * k)
+        else:
+            recent.append(frame)
+        next_state = np_stack(recent)
+        if state is not None and not first:
+            transitions.append((state, 0, 0.0, next_state, done))
+        state = next_state
+    seconds = default_timer() - start_time
+    stored = sum(t[0].nbytes + t[3].nbytes + 8 + 4 + 1 for t in transitions)
+    return stored / len(transitions), seconds
+
+
+def ring(k, episode_frames):
+    replay = FrameStackReplay(FLAGS.transitions, (FLAGS.screen_size, FLAGS.screen_size), k, np_uint8)
+    start_time = default_timer()
+    started = False
+    for first, frame, done in episode_frames:
+        if first or not started:
+            replay.reset(frame)
+            started = True
+        else:
+            replay.step(0, 0.0, frame, done)
+    seconds = default_timer() - start_time
+    return replay.nbytes / len(replay), seconds
+
+
+def main(argv):
+    row = "{:>4} {:>16} {:>16} {:>10} {:>14} {:>14}"
+    print(row.format('k', 'naive_kb/trans', 'ring_kb/trans', 'saving', 'naive_us/step', 'ring_us/step'))
+    episode_frames = list(frames(FLAGS.transitions))
+    for k in [int(k) for k in FLAGS.ks]:
+        naive_bytes, naive_seconds = naive(k, episode_frames)
+        ring_bytes, ring_seconds = ring(k, episode_frames)
+        print("{:>4d} {:>16.2f} {:>16.2f} {:>9.1f}x {:>14.2f} {:>14.2f}".format(
+            k, naive_bytes / 1024, ring_bytes / 1024, naive_bytes / ring_bytes,
+            1e6 * naive_seconds / FLAGS.transitions, 1e6 * ring_seconds / FLAGS.transitions))
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,135 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Throughput and latency of the dynamic-batching inference service against
+each agent running its own batch-size-1 forward pass.
+
+Agents are threads that each ask for an x and a y coordinate per step, as
+MoveToBeaconAgent002 does. The policy is a stand-in numpy network of the
+deepq shape (one hidden layer, one output per screen coordinate) unless
+--act_x and --act_y point at saved baselines deepq models.
+
+python -m sc2_agents.bin.benchmark_inference_service --agents 32 --max_batch 1,8,32 --max_wait_ms 0,1,2,5
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import maximum as np_maximum
+from numpy import percentile as np_percentile
+from numpy.random import RandomState
+from sc2_agents.lib.inference_service import InferenceService
+from sc2_agents.lib.inference_service import RemotePolicy
+from sc2_agents.lib.synthetic_screens import move_to_beacon_screen
+from sc2_agents.lib.synthetic_screens import PLAYER_NEUTRAL
+from threading import Thread
+from timeit import default_timer
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('act_x', None, "Saved deepq model for the x coordinate")
+flags.DEFINE_string('act_y', None, "Saved deepq model for the y coordinate")
+flags.DEFINE_integer('agents', 32, "Concurrent agents")
+flags.DEFINE_integer('hidden', 256, "Hidden units of the stand-in network")
+flags.DEFINE_list('max_batch', ['1', '8', '32'], "Largest batches to try")
+flags.DEFINE_list('max_wait_ms', ['0', '1', '2', '5'], "Gathering windows to try, in milliseconds")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_integer('steps', 200, "Steps per agent")
+
+
+class StandInHead(object):
+    """
+    A dense ReLU network with one output per screen coordinate.
+    """
+
+    def __init__(self, screen_size, hidden, random):
+        self.hidden_weights = random.standard_normal((screen_size ** 2, hidden)).astype(np_float32) / screen_size
+        self.output_weights = random.standard_normal((hidden, screen_size)).astype(np_float32)
+
+    def __call__(self, observations):
+        inputs = observations.reshape(len(observations), -1).astype(np_float32)
+        return np_maximum(inputs.dot(self.hidden_weights), 0).dot(self.output_weights).argmax(axis=1)
+
+
+def make_heads():
+    if FLAGS.act_x and FLAGS.act_y:
+        from baselines.deepq.simple import load
+        return {'x': load(FLAGS.act_x), 'y': load(FLAGS.act_y)}
+    random = RandomState(0)
+    return {'x': StandInHead(FLAGS.screen_size, FLAGS.hidden, random),
+            'y': StandInHead(FLAGS.screen_size, FLAGS.hidden, random)}
+
+
+def make_screens(count):
+    random = RandomState(1)
+    screens = []
+    for _ in range(count):
+        beacon, marine = random.randint(4, FLAGS.screen_size - 4, size=(2, 2))
+        screens.append((move_to_beacon_screen(FLAGS.screen_size, beacon, marine) == PLAYER_NEUTRAL).astype(int))
+    return screens
+
+
+def run_agents(act_x, act_y, screens):
+    latencies = [[] for _ in range(FLAGS.agents)]
+
+    def agent(index):
+        for step in range(FLAGS.steps):
+            screen = screens[(index + step) % len(screens)][None]
+            start_time = default_timer()
+            act_x(screen)
+            act_y(screen)
+            latencies[index].append(default_timer() - start_time)
+
+    threads = [Thread(target=agent, args=(index,)) for index in range(FLAGS.agents)]
+    start_time = default_timer()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = default_timer() - start_time
+    all_latencies = [latency for agent_latencies in latencies for latency in agent_latencies]
+    return (len(all_latencies) / seconds,
+            1000 * np_percentile(all_latencies, 50),
+            1000 * np_percentile(all_latencies, 99))
+
+
+def main(argv):
+    heads = make_heads()
+    screens = make_screens(64)
+    row = "{:>10} {:>12} {:>12} {:>10} {:>10} {:>10}"
+    print(row.format('max_batch', 'max_wait_ms', 'steps/s', 'p50_ms', 'p99_ms', 'mean_batch'))
+    steps_per_second, p50, p99 = run_agents(heads['x'], heads['y'], screens)
+    print("{:>10} {:>12} {:>12.0f} {:>10.2f} {:>10.2f} {:>10}".format('direct', '-', steps_per_second, p50, p99, 1))
+    for max_batch in [int(b) for b in FLAGS.max_batch]:
+        for max_wait_ms in [float(w) for w in FLAGS.max_wait_ms]:
+            with InferenceService(heads, max_batch=max_batch, max_wait=max_wait_ms / 1000) as service:
+                steps_per_second, p50, p99 = run_agents(
+                    RemotePolicy(service.infer, 'x'), RemotePolicy(service.infer, 'y'), screens)
+                mean_batch = service.report()['mean_batch_size']
+            print("{:>10d} {:>12g} {:>12.0f} {:>10.2f} {:>10.2f} {:>10.1f}".format(
+                max_batch, max_wait_ms, steps_per_second, p50, p99, mean_batch))
+
+if __name__ == '__main__':
+    app.run(main)
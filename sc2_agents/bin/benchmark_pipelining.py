@@ -0,0 +1,138 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Throughput and utilization of pipelined environment stepping against
+the strict step-then-act loop (groups=1), with the same environments
+and agent.
+
+On the stand-in minigame each step sleeps for --step_delay seconds to
+stand in for the game simulating in its own process, and the agent is a
+pair of coordinate policies, either --act_x/--act_y or randomly
+initialized networks of the default DQN shape. With --act_delay the
+policies are replaced by a wait, as if inference ran on other cores.
+With --env sc2 each environment gets its own --agent.
+
+python -m sc2_agents.bin.benchmark_pipelining --envs 8 --groups 1,2,4 --step_delay 0.01
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from json import dumps as json_dumps
+from sc2_agents.lib.pipelined_runner import agent_actor
+from sc2_agents.lib.pipelined_runner import coordinate_actor
+from sc2_agents.lib.pipelined_runner import PipelinedRunner
+from time import sleep
+
+FLAGS = flags.FLAGS
+flags.DEFINE_float('act_delay', 0.0, "Seconds of waiting per environment in place of running the policies, "
+                   "like inference served from other cores")
+flags.DEFINE_string('act_x', None, "Policy for the x coordinate (default: a random network)")
+flags.DEFINE_string('act_y', None, "Policy for the y coordinate (default: a random network)")
+flags.DEFINE_string('agent', 'sc2_agents.agents.move_to_beacon.MoveToBeaconAgent001', "--env sc2: agent to run")
+flags.DEFINE_enum('env', 'standin', ['standin', 'sc2'], "Benchmark on the stand-in minigame or on StarCraft II")
+flags.DEFINE_integer('envs', 8, "Number of environments")
+flags.DEFINE_list('groups', ['1', '2'], "Group counts to compare; 1 is the strict loop")
+flags.DEFINE_string('map_name', 'MoveToBeacon', "Name of the minigame")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_float('step_delay', 0.01, "--env standin: seconds each step spends simulating")
+flags.DEFINE_integer('step_mul', 8, "Game steps per agent step")
+flags.DEFINE_integer('steps', 2000, "Environment steps per measurement")
+
+
+class SimulatedStepEnv(object):
+    """
+    A stand-in minigame whose steps take `delay` seconds of waiting, like
+    a game simulating in another process.
+    """
+
+    def __init__(self, env, delay):
+        self.delay = delay
+        self.env = env
+
+    def __getattr__(self, name):
+        if name == 'env':
+            raise AttributeError(name)
+        return getattr(self.env, name)
+
+    def step(self, actions):
+        sleep(self.delay)
+        return self.env.step(actions)
+
+
+def make_envs():
+    if FLAGS.env == 'standin':
+        from sc2_agents.lib.standin_env import StandInMinigame
+        return [SimulatedStepEnv(StandInMinigame(FLAGS.map_name, screen_size=FLAGS.screen_size, seed=seed),
+                                 FLAGS.step_delay)
+                for seed in range(FLAGS.envs)]
+    from sc2_agents.lib.environments import make_env
+    return [make_env(FLAGS.map_name, screen_size=FLAGS.screen_size, step_mul=FLAGS.step_mul, random_seed=seed)
+            for seed in range(FLAGS.envs)]
+
+
+def make_actor(envs):
+    if FLAGS.env == 'sc2':
+        from sc2_agents.lib.agent_wrapper import agent_class
+        agents = [agent_class(FLAGS.agent)() for _ in envs]
+        for agent, env in zip(agents, envs):
+            agent.setup(env.observation_spec(), env.action_spec())
+        return agent_actor(agents)
+    if FLAGS.act_delay:
+        def act(indices, timesteps):
+            sleep(FLAGS.act_delay * len(timesteps))
+            return [(0, 0)] * len(timesteps)
+        return act
+    if FLAGS.act_x and FLAGS.act_y:
+        from sc2_agents.lib.numpy_policy import load_policy
+        return coordinate_actor(load_policy(FLAGS.act_x), load_policy(FLAGS.act_y))
+    from sc2_agents.lib.dqn import network_spec
+    from sc2_agents.lib.dqn import QNetwork
+    spec = network_spec(FLAGS.screen_size)
+    input_shape = (FLAGS.screen_size, FLAGS.screen_size, 1)
+    return coordinate_actor(QNetwork(spec, input_shape=input_shape, seed=0),
+                            QNetwork(spec, input_shape=input_shape, seed=1))
+
+
+def main(argv):
+    reports = []
+    for groups in FLAGS.groups:
+        envs = make_envs()
+        runner = PipelinedRunner(envs, make_actor(envs), groups=int(groups))
+        try:
+            # the first turns include the resets
+            runner.run(2 * FLAGS.envs).reset_report()
+            reports.append(runner.run(FLAGS.steps).report())
+        finally:
+            runner.close()
+    print("{:>6} {:>10} {:>8} {:>10} {:>10}".format('groups', 'steps/s', 'speedup', 'act_util', 'env_util'))
+    for report in reports:
+        print("{:>6d} {:>10.1f} {:>7.2f}x {:>9.1%} {:>9.1%}".format(
+            report['groups'], report['steps_per_second'], report['steps_per_second'] / reports[0]['steps_per_second'],
+            report['act_utilization'], report['env_utilization']))
+    print(json_dumps(reports, indent=2, sort_keys=True))
+
+if __name__ == '__main__':
+    app.run(main)
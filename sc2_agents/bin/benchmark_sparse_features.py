@@ -0,0 +1,103 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Compare the dense `(layer == value).nonzero()` scans the scripted agents
+used to make against the sparse coordinate lists, across screen resolutions.
+The unit count is the same at every resolution; units cover proportionally
+more pixels at higher resolutions, as they do in the game.
+
+python -m sc2_agents.bin.benchmark_sparse_features --resolutions 64,128,256
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from numpy import array_equal as np_array_equal
+from numpy import int32 as np_int32    # pylint: disable=E0611
+from numpy import zeros as np_zeros
+from numpy.random import RandomState
+from sc2_agents.lib.sparse_features import SparseLayer
+from sc2_agents.lib.synthetic_screens import draw_disc
+from sc2_agents.lib.synthetic_screens import mineral_shards_screen
+from sc2_agents.lib.synthetic_screens import unit_radius
+from timeit import default_timer
+
+FLAGS = flags.FLAGS
+flags.DEFINE_integer('frames', 200, "Frames per measurement")
+flags.DEFINE_list('resolutions', ['64', '128', '256'], "Screen resolutions to compare")
+flags.DEFINE_integer('seed', 0, "Seed for the synthetic screens")
+
+# player_relative: neutral shards and friendly marines (CollectMineralShardsAgent001)
+# unit_type: mineral fields, geysers, command center and scvs (CollectMineralsAndGasAgent*, BuildMarinesAgent001)
+QUERIES = {'player_relative': [3, 1], 'unit_type': [341, 342, 18, 45]}
+
+
+def make_frames(screen_size, random):
+    frames = []
+    for _ in range(FLAGS.frames):
+        shards = random.randint(0, screen_size, size=(20, 2))
+        marines = random.randint(0, screen_size, size=(2, 2))
+        unit_type = np_zeros((screen_size, screen_size), dtype=np_int32)
+        for unit_id, count, radius in ((341, 8, 2), (342, 2, 3), (18, 1, 5), (45, 12, 1)):
+            for x, y in random.randint(0, screen_size, size=(count, 2)):
+                draw_disc(unit_type, x, y, unit_radius(screen_size, radius), unit_id)
+        frames.append({'player_relative': mineral_shards_screen(screen_size, shards, marines),
+                       'unit_type': unit_type})
+    return frames
+
+
+def dense(frame):
+    return [(frame[layer] == value).nonzero() for layer, values in QUERIES.items() for value in values]
+
+
+def sparse(frame):
+    layers = {layer: SparseLayer(frame[layer]) for layer in QUERIES}
+    return [layers[layer].coordinates(value) for layer, values in QUERIES.items() for value in values]
+
+
+def measure(function, frames):
+    start_time = default_timer()
+    for frame in frames:
+        function(frame)
+    return (default_timer() - start_time) / len(frames) * 1e6
+
+
+def main(argv):
+    random = RandomState(FLAGS.seed)
+    print("{:>10} {:>12} {:>12} {:>10} {:>14}".format(
+        'resolution', 'dense_us', 'sparse_us', 'speedup', 'nonzero_px'))
+    for resolution in [int(r) for r in FLAGS.resolutions]:
+        frames = make_frames(resolution, random)
+        for frame in frames[:10]:
+            for (dense_y, dense_x), (sparse_y, sparse_x) in zip(dense(frame), sparse(frame)):
+                assert np_array_equal(dense_y, sparse_y) and np_array_equal(dense_x, sparse_x)
+        dense_us = measure(dense, frames)
+        sparse_us = measure(sparse, frames)
+        nonzero = sum(int((frame[layer] != 0).sum()) for frame in frames for layer in QUERIES) / len(frames)
+        print("{:>10d} {:>12.1f} {:>12.1f} {:>9.2f}x {:>14.0f}".format(
+            resolution, dense_us, sparse_us, dense_us / sparse_us, nonzero))
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,135 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Compare the shared-memory observation ring against pickling observations
+through pipes, with many environment workers feeding one learner.
+
+Each worker sends `steps` observations shaped like a pysc2 feature screen
+(17 int32 layers); the learner touches every observation before taking
+the next one.
+
+python -m sc2_agents.bin.benchmark_transport --workers 8,32,64
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+from numpy import int32 as np_int32    # pylint: disable=E0611
+from numpy import ones as np_ones
+from sc2_agents.lib.shared_memory_transport import SharedObservationRing
+from timeit import default_timer
+
+FLAGS = flags.FLAGS
+flags.DEFINE_integer('layers', 17, "Feature layers per observation")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_integer('slots_per_worker', 2, "Shared-memory slots per worker")
+flags.DEFINE_integer('steps', 200, "Observations sent by each worker")
+flags.DEFINE_list('workers', ['8', '32', '64'], "Worker counts to compare")
+
+
+def shape():
+    return (FLAGS.layers, FLAGS.screen_size, FLAGS.screen_size)
+
+
+def pipe_worker(connection, worker_id, steps, observation_shape):
+    observation = np_ones(observation_shape, dtype=np_int32) * worker_id
+    for _ in range(steps):
+        connection.send(observation)
+    connection.send(None)
+    connection.close()
+
+
+def ring_worker(ring, worker_id, steps, observation_shape):
+    observation = np_ones(observation_shape, dtype=np_int32) * worker_id
+    for _ in range(steps):
+        ring.write(observation, info=worker_id)
+    ring.write(observation, info=-1)
+
+
+def run_pipes(context, num_workers):
+    connections, processes = [], []
+    for worker_id in range(num_workers):
+        reader, writer = context.Pipe(duplex=False)
+        process = context.Process(target=pipe_worker, args=(writer, worker_id, FLAGS.steps, shape()))
+        process.start()
+        writer.close()
+        connections.append(reader)
+        processes.append(process)
+    start_time = default_timer()
+    received = 0
+    while connections:
+        for connection in wait(connections):
+            observation = connection.recv()
+            if observation is None:
+                connections.remove(connection)
+                continue
+            observation[0, 0, 0]    # pylint: disable=W0104
+            received += 1
+    seconds = default_timer() - start_time
+    for process in processes:
+        process.join()
+    return received, seconds
+
+
+def run_ring(context, num_workers):
+    ring = SharedObservationRing(num_workers * FLAGS.slots_per_worker, shape(), dtype=np_int32, context=context)
+    processes = [context.Process(target=ring_worker, args=(ring, worker_id, FLAGS.steps, shape()))
+                 for worker_id in range(num_workers)]
+    for process in processes:
+        process.start()
+    start_time = default_timer()
+    received, finished = 0, 0
+    while finished < num_workers:
+        slot, observation, info = ring.read()
+        if info == -1:
+            finished += 1
+        else:
+            observation[0, 0, 0]    # pylint: disable=W0104
+            received += 1
+        ring.release(slot)
+    seconds = default_timer() - start_time
+    for process in processes:
+        process.join()
+    ring.close()
+    return received, seconds
+
+
+def main(argv):
+    context = get_context('fork')
+    megabytes = FLAGS.layers * FLAGS.screen_size ** 2 * 4 / 2 ** 20
+    print("{:>8} {:>10} {:>14} {:>14} {:>10}".format('workers', 'transport', 'obs/s', 'MB/s', 'speedup'))
+    for num_workers in [int(w) for w in FLAGS.workers]:
+        results = {}
+        for name, run in (('pipe', run_pipes), ('shm', run_ring)):
+            received, seconds = run(context, num_workers)
+            results[name] = received / seconds
+        for name in ('pipe', 'shm'):
+            print("{:>8d} {:>10} {:>14.0f} {:>14.1f} {:>9.2f}x".format(
+                num_workers, name, results[name], results[name] * megabytes, results[name] / results['pipe']))
+
+if __name__ == '__main__':
+    app.run(main)
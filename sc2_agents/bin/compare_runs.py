@@ -0,0 +1,82 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Compare training runs against a baseline run from their run logs, e.g.
+runs trained with --crop/--downsample against one on the full screen.
+With --target_reward the episodes and timesteps each run took to reach
+that rolling reward are listed too, e.g. to compare a train_dqn run
+started with --init_from against one trained from scratch.
+
+python -m sc2_agents.bin.compare_runs --baseline ./MoveToBeacon-deepq-full --runs ./MoveToBeacon-deepq-max2,./MoveToBeacon-deepq-crop
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from os import path
+from sc2_agents.lib.run_log import RunLog
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('baseline', None, "Run directory to compare against")
+flags.DEFINE_list('runs', [], "Run directories to compare")
+flags.DEFINE_float('target_reward', None, "Also report the episodes and timesteps taken to reach this rolling reward")
+flags.DEFINE_integer('window', 100, "Episodes in the rolling reward")
+flags.mark_flag_as_required('baseline')
+
+
+def summary(directory):
+    run_log = RunLog(directory)
+    if not run_log.episode_rewards:
+        raise ValueError("No run log with episodes in {}".format(directory))
+    return {'episodes': len(run_log.episode_rewards),
+            'reward': run_log.rolling_reward(FLAGS.window),
+            'steps_per_second': run_log.steps_per_second(),
+            'to_target': (run_log.timesteps_to_reward(FLAGS.target_reward, FLAGS.window)
+                          if FLAGS.target_reward is not None else None)}
+
+
+def main(argv):
+    baseline = summary(FLAGS.baseline)
+    row = "{:<40} {:>9} {:>12} {:>9} {:>12} {:>12}"
+    header = row.format('run', 'episodes', 'steps/s', 'speedup', 'reward', 'reward_delta')
+    if FLAGS.target_reward is not None:
+        header += " {:>18} {:>18}".format('episodes_to_target', 'steps_to_target')
+    print(header)
+    for directory in [FLAGS.baseline] + FLAGS.runs:
+        run = summary(directory)
+        line = "{:<40} {:>9d} {:>12.1f} {:>8.2f}x {:>12.2f} {:>+12.2f}".format(
+            path.basename(path.normpath(directory)),
+            run['episodes'],
+            run['steps_per_second'],
+            run['steps_per_second'] / baseline['steps_per_second'] if baseline['steps_per_second'] else float('nan'),
+            run['reward'],
+            run['reward'] - baseline['reward'])
+        if FLAGS.target_reward is not None:
+            episodes, timesteps = run['to_target'] or ('-', '-')
+            line += " {:>18} {:>18}".format(episodes, timesteps)
+        print(line)
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,85 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Validate a pair of act_x/act_y coordinate policies offline: synthetic
+screens with the beacon (or the nearest mineral shard) at every screen
+position are run through the policies in batches, and the accuracy and
+error per position are written as heatmaps (npz and PNG) with a JSON
+summary. Exits with status 1 when the accuracy is below --min_accuracy.
+
+python -m sc2_agents.bin.diagnose_policy --act_x act_x.npz --act_y act_y.npz --map_name MoveToBeacon --output_dir ./diagnostics
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from json import dumps as json_dumps
+from sc2_agents.lib.numpy_policy import load_policy
+from sc2_agents.lib.policy_diagnostics import diagnose
+from sc2_agents.lib.policy_diagnostics import save_diagnostics
+from sys import exit
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('act_x', None, "Policy for the x coordinate")
+flags.DEFINE_string('act_y', None, "Policy for the y coordinate")
+flags.DEFINE_integer('batch_size', 256, "Screens per inference batch")
+flags.DEFINE_enum('map_name', 'MoveToBeacon', ['MoveToBeacon', 'CollectMineralShards'], "Minigame to draw screens for")
+flags.DEFINE_float('min_accuracy', 0.0, "Exit with status 1 below this accuracy")
+flags.DEFINE_string('output_dir', None, "Directory for the heatmaps and the summary")
+flags.DEFINE_integer('player_neutral', 3, "player_relative value of the beacon/minerals")
+flags.DEFINE_integer('samples', 4, "Screens per position, with the marine placed at random")
+flags.DEFINE_integer('screen_size', None, "Resolution of the feature screen (default: the policy's input size)")
+flags.DEFINE_integer('seed', 0, "Seed for the marine and shard placement")
+flags.DEFINE_integer('shards', 20, "CollectMineralShards: shards per screen, any of which is a target (1 isolates each position)")
+flags.DEFINE_integer('stride', 1, "Pixels between probed positions")
+flags.mark_flag_as_required('act_x')
+flags.mark_flag_as_required('act_y')
+flags.mark_flag_as_required('output_dir')
+
+def main(argv):
+    act_x = load_policy(FLAGS.act_x)
+    act_y = load_policy(FLAGS.act_y)
+    screen_size = FLAGS.screen_size
+    if screen_size is None:
+        input_shape = getattr(act_x, 'input_shape', None)
+        screen_size = int(input_shape[0]) if input_shape else 64
+    heatmaps, summary = diagnose(act_x, act_y,
+                                 map_name=FLAGS.map_name,
+                                 screen_size=screen_size,
+                                 samples=FLAGS.samples,
+                                 stride=FLAGS.stride,
+                                 shards=FLAGS.shards,
+                                 batch_size=FLAGS.batch_size,
+                                 player_neutral=FLAGS.player_neutral,
+                                 seed=FLAGS.seed)
+    summary['act_x'] = FLAGS.act_x
+    summary['act_y'] = FLAGS.act_y
+    save_diagnostics(heatmaps, summary, FLAGS.output_dir)
+    print(json_dumps(summary, indent=2, sort_keys=True))
+    if summary['accuracy'] < FLAGS.min_accuracy:
+        exit(1)
+
+if __name__ == '__main__':
+    app.run(main)
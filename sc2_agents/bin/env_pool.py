@@ -0,0 +1,77 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Run a pool of warm environments for training jobs to share. Jobs started
+with --env_pool host:port take their environment from the pool and hand
+it back when they finish. The pool only serves on 127.0.0.1, and its
+workers run whatever a connection asks of them, so connections need the
+pool's authkey: a random key written to ~/.sc2_agents/env_pool/<port>.authkey
+(readable by this user only) for the jobs of this user, or the value of
+SC2_AGENTS_ENV_POOL_AUTHKEY when it is set in the pool's and the jobs'
+environments.
+
+python -m sc2_agents.bin.env_pool --port 50000 --prestart MoveToBeacon-bbueno5000-v0:2
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from json import dumps as json_dumps
+from logging import basicConfig as logging_basicConfig
+from logging import getLogger
+from logging import INFO
+from sc2_agents.lib.env_pool import EnvPool
+from sc2_agents.lib.env_pool import EnvPoolServer
+from time import sleep
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('factory', 'sc2_agents.lib.env_pool.make_gym_env', "Function creating an environment from a gym id")
+flags.DEFINE_integer('max_workers', 8, "Environments kept alive at most")
+flags.DEFINE_integer('port', 50000, "Port to serve the pool on")
+flags.DEFINE_list('prestart', [], "gym_id:count pairs to launch before any job asks for them")
+flags.DEFINE_integer('report_seconds', 300, "Log the pool report every x seconds")
+
+def main(argv):
+    logging_basicConfig(level=INFO)
+    logger = getLogger(__file__)
+    pool = EnvPool(factory=FLAGS.factory, max_workers=FLAGS.max_workers)
+    server = EnvPoolServer(pool, address=('127.0.0.1', FLAGS.port)).start()
+    for entry in FLAGS.prestart:
+        gym_id, _, count = entry.partition(':')
+        pool.prestart(gym_id, int(count or 1))
+    logger.info("Serving the environment pool on %s:%d", *server.address)
+    try:
+        while True:
+            sleep(FLAGS.report_seconds)
+            logger.info("Pool report: %s", json_dumps(pool.report(), sort_keys=True))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(json_dumps(pool.report(), indent=2, sort_keys=True))
+        pool.close()
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,87 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Rank checkpoints and scripted agents by their mean reward over the same
+seeded episodes, played in parallel. Episodes already in the database
+are not played again, so an interrupted or extended evaluation only runs
+what is missing.
+
+A candidate is either a checkpoint directory holding act_x/act_y
+policies or the dotted name of an agent class.
+
+python -m sc2_agents.bin.evaluate_checkpoints --candidates ./MoveToBeacon-numpy_dqn-1,sc2_agents.agents.move_to_beacon.MoveToBeaconAgent001 --episodes 20 --workers 8
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from json import dump as json_dump
+from logging import basicConfig as logging_basicConfig
+from logging import INFO
+from sc2_agents.lib.evaluation import CHECKPOINT_AGENT
+from sc2_agents.lib.evaluation import evaluate
+from sc2_agents.lib.evaluation import EvaluationStore
+
+FLAGS = flags.FLAGS
+flags.DEFINE_list('candidates', None, "Checkpoint directories and agent classes to evaluate")
+flags.DEFINE_string('checkpoint_agent', CHECKPOINT_AGENT, "Agent class that plays a checkpoint's act_x/act_y policies")
+flags.DEFINE_string('database', 'evaluation.db', "SQLite database of per-episode results")
+flags.DEFINE_enum('env', 'sc2', ['sc2', 'standin'], "Evaluate on StarCraft II or on the stand-in minigame")
+flags.DEFINE_integer('episodes', 10, "Seeded episodes per candidate")
+flags.DEFINE_integer('first_seed', 0, "Seed of the first episode")
+flags.DEFINE_string('map_name', 'MoveToBeacon', "Name of the minigame")
+flags.DEFINE_string('output', None, "Also write the ranking to this JSON file")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_integer('step_mul', 8, "Game steps per agent step")
+flags.DEFINE_integer('workers', 4, "Episodes played in parallel")
+flags.mark_flag_as_required('candidates')
+
+def main(argv):
+    logging_basicConfig(level=INFO)
+    store = EvaluationStore(FLAGS.database)
+    try:
+        report = evaluate(FLAGS.candidates,
+                          list(range(FLAGS.first_seed, FLAGS.first_seed + FLAGS.episodes)),
+                          store,
+                          map_name=FLAGS.map_name,
+                          env=FLAGS.env,
+                          workers=FLAGS.workers,
+                          checkpoint_agent=FLAGS.checkpoint_agent,
+                          screen_size=FLAGS.screen_size,
+                          step_mul=FLAGS.step_mul)
+    finally:
+        store.close()
+    if FLAGS.output:
+        with open(FLAGS.output, 'w') as file:
+            json_dump(report, file, indent=2)
+    print("{} episodes played, {} already scored".format(report['evaluated'], report['skipped']))
+    print("{:<60} {:>8} {:>10} {:>20}".format('candidate', 'episodes', 'mean', '95% interval'))
+    for summary in report['summaries']:
+        print("{:<60} {:>8d} {:>10.2f} {:>20}".format(
+            summary['candidate'][-60:], summary['episodes'], summary['mean_reward'],
+            "[{:.2f}, {:.2f}]".format(summary['ci_low'], summary['ci_high'])))
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,287 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Export a trained coordinate policy to a NumPy weight file that
+sc2_agents.lib.numpy_policy can run without TensorFlow.
+
+The network is described by a layer spec in the TensorForce network
+format (see bin/tensorforce/network_configs), with a 'dueling' layer for
+dueling deepq heads, e.g. for the default pretrain_agent mlp:
+
+    [{"type": "flatten"},
+     {"type": "dense", "size": 64},
+     {"type": "dense", "size": 64, "activation": "none"}]
+
+Weights are read in spec order: from the trainable variables under
+--scope of a saved deepq act function, or from the variables listed in
+--variables of a TensorFlow checkpoint (a ppo1 or TensorForce save).
+Every shape is checked against the spec and the exported policy is
+checked against the saved model itself: against its --q_values_tensor
+within --tolerance when that is given, otherwise (deepq only) by the
+share of greedy actions it agrees on with the saved act function, which
+must reach --min_agreement. --compare measures startup time, memory and
+latency of both engines.
+
+python -m sc2_agents.bin.export_policy --source deepq --model ./pretrained/act_x.pkl --spec mlp.json --output act_x.npz
+python -m sc2_agents.bin.export_policy --source checkpoint --model ./saves/model --list_variables
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from json import dumps as json_dumps
+from json import load as json_load
+from multiprocessing import get_context
+from numpy import abs as np_abs
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import mean as np_mean
+from numpy import stack as np_stack
+from numpy.random import RandomState
+from sc2_agents.lib.memory_telemetry import resident_set_size
+from sc2_agents.lib.numpy_policy import NumpyPolicy
+from sc2_agents.lib.numpy_policy import parameter_shapes
+from sc2_agents.lib.synthetic_screens import move_to_beacon_screen
+from sc2_agents.lib.synthetic_screens import PLAYER_NEUTRAL
+from time import time
+
+FLAGS = flags.FLAGS
+flags.DEFINE_bool('compare', False, "Compare startup, memory and latency of NumPy and TensorFlow")
+flags.DEFINE_string('input_tensor', 'deepq/observation:0', "Observation placeholder fed to --q_values_tensor")
+flags.DEFINE_bool('list_variables', False, "List the variables of the model and exit")
+flags.DEFINE_float('min_agreement', 0.99, "deepq: smallest allowed share of greedy actions shared with the act function")
+flags.DEFINE_string('model', None, "Saved deepq act function or TensorFlow checkpoint")
+flags.DEFINE_string('output', None, "Path of the exported .npz weight file")
+flags.DEFINE_integer('samples', 256, "Synthetic screens used to verify the export")
+flags.DEFINE_string('scope', 'deepq/q_func', "deepq: variable scope of the Q-function")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_enum('source', 'deepq', ['deepq', 'checkpoint'], "Kind of model to export")
+flags.DEFINE_string('spec', None, "JSON layer spec of the network")
+flags.DEFINE_string('q_values_tensor', None, "Q-value tensor of the saved model to check the export against")
+flags.DEFINE_float('tolerance', 1e-4, "Largest allowed difference from --q_values_tensor")
+flags.DEFINE_string('variables', None, "checkpoint: JSON list of variable names in spec order")
+flags.mark_flag_as_required('model')
+
+
+def load_deepq(model):
+    from baselines.deepq.simple import load
+    import tensorflow as tf
+    act = load(model)
+    variables = [v for v in tf.trainable_variables() if v.name.startswith(FLAGS.scope + '/')]
+    values = tf.get_default_session().run(variables)
+    return act, [(v.name, value) for v, value in zip(variables, values)]
+
+
+def load_checkpoint(model, names):
+    import tensorflow as tf
+    reader = tf.train.NewCheckpointReader(model)
+    return [(name, reader.get_tensor(name)) for name in names]
+
+
+def model_q_values(graph, session, screens):
+    """
+    The saved model's own --q_values_tensor for a batch of screens.
+    """
+    inputs = graph.get_tensor_by_name(FLAGS.input_tensor)
+    if inputs.shape[1:].is_fully_defined():
+        screens = screens.reshape([-1] + inputs.shape[1:].as_list())
+    return session.run(graph.get_tensor_by_name(FLAGS.q_values_tensor), feed_dict={inputs: screens})
+
+
+def checkpoint_q_values(model, screens):
+    import tensorflow as tf
+    graph = tf.Graph()
+    with graph.as_default():
+        saver = tf.train.import_meta_graph(model + '.meta')
+        with tf.Session(graph=graph) as session:
+            saver.restore(session, model)
+            return model_q_values(graph, session, screens)
+
+
+def pair_weights(spec, input_shape, variables):
+    """
+    Group (name, value) variables into the (kernel, bias) pairs of the
+    spec, checking every shape.
+    """
+    shapes = parameter_shapes(spec, input_shape)
+    if len(variables) != 2 * len(shapes):
+        raise ValueError("The spec needs {} variables but {} were found:\n{}".format(
+            2 * len(shapes), len(variables),
+            "\n".join("  {} {}".format(name, value.shape) for name, value in variables)))
+    weights = []
+    for index, (kernel_shape, bias_shape) in enumerate(shapes):
+        (kernel_name, kernel), (bias_name, bias) = variables[2 * index], variables[2 * index + 1]
+        if kernel.shape != kernel_shape or bias.shape != bias_shape:
+            raise ValueError("Layer {} expects kernel {} and bias {} but {} is {} and {} is {}".format(
+                index, kernel_shape, bias_shape, kernel_name, kernel.shape, bias_name, bias.shape))
+        weights.append((kernel, bias))
+    return weights
+
+
+class TensorFlowPolicy(object):
+    """
+    The same network built from TensorFlow ops, timed by --compare for
+    checkpoints, whose saved graph may need more than the network to run.
+    """
+
+    def __init__(self, spec, weights, input_shape):
+        import tensorflow as tf
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            self.inputs = tf.placeholder(tf.float32, (None,) + tuple(input_shape))
+            remaining = iter(weights)
+            activations = {'linear': tf.identity, 'none': tf.identity, 'relu': tf.nn.relu, 'tanh': tf.tanh}
+
+            def build(layers, outputs):
+                for layer in layers:
+                    if layer['type'] == 'flatten':
+                        outputs = tf.reshape(outputs, [-1, int(outputs.shape[1:].num_elements())])
+                    elif layer['type'] == 'conv2d':
+                        kernel, bias = next(remaining)
+                        if outputs.shape.ndims == 3:
+                            outputs = tf.expand_dims(outputs, -1)
+                        stride = layer.get('stride', 1)
+                        outputs = tf.nn.conv2d(outputs, kernel, [1, stride, stride, 1],
+                                               layer.get('padding', 'SAME').upper())
+                        outputs = activations[layer.get('activation', 'relu')](outputs + bias)
+                    elif layer['type'] == 'dense':
+                        kernel, bias = next(remaining)
+                        if outputs.shape.ndims > 2:
+                            outputs = tf.reshape(outputs, [-1, int(outputs.shape[1:].num_elements())])
+                        outputs = activations[layer.get('activation', 'relu')](tf.matmul(outputs, kernel) + bias)
+                    elif layer['type'] == 'dueling':
+                        advantages = build(layer['advantage'], outputs)
+                        values = build(layer['value'], outputs)
+                        outputs = values + advantages - tf.reduce_mean(advantages, axis=1, keep_dims=True)
+                return outputs
+
+            self.outputs = build(spec, self.inputs)
+            self.session = tf.Session(graph=self.graph)
+
+    def q_values(self, observations):
+        return self.session.run(self.outputs, feed_dict={self.inputs: observations})
+
+    def __call__(self, observations):
+        return self.q_values(observations).argmax(axis=1)
+
+
+def sample_screens(count, screen_size):
+    random = RandomState(0)
+    screens = []
+    for _ in range(count):
+        beacon, marine = random.randint(4, screen_size - 4, size=(2, 2))
+        screens.append((move_to_beacon_screen(screen_size, beacon, marine) == PLAYER_NEUTRAL).astype(np_float32))
+    return np_stack(screens)
+
+
+def measure(engine, arguments, results):
+    """
+    Startup, memory and batch-size-1 latency of one engine, measured in a
+    fresh interpreter.
+    """
+    start_time = time()
+    if engine == 'numpy':
+        policy = NumpyPolicy.load(arguments['output'])
+    elif arguments['source'] == 'deepq':
+        from baselines.deepq.simple import load
+        policy = load(arguments['model'])
+    else:
+        exported = NumpyPolicy.load(arguments['output'])
+        policy = TensorFlowPolicy(exported.spec, exported.weights, exported.input_shape)
+    startup = time() - start_time
+    screens = sample_screens(100, arguments['screen_size'])
+    policy(screens[:1])
+    start_time = time()
+    for screen in screens:
+        policy(screen[None])
+    latency = (time() - start_time) / len(screens)
+    results.put({'engine': engine, 'startup_seconds': startup,
+                 'resident_mb': resident_set_size() / 2 ** 20, 'latency_ms': 1000 * latency})
+
+
+def main(argv):
+    if FLAGS.list_variables:
+        if FLAGS.source == 'deepq':
+            variables = load_deepq(FLAGS.model)[1]
+        else:
+            import tensorflow as tf
+            reader = tf.train.NewCheckpointReader(FLAGS.model)
+            variables = [(name, reader.get_tensor(name)) for name in sorted(reader.get_variable_to_shape_map())]
+        for name, value in variables:
+            print(name, value.shape)
+        return
+    if FLAGS.spec is None or FLAGS.output is None:
+        raise app.UsageError("--spec and --output are required to export a policy")
+    with open(FLAGS.spec) as file:
+        spec = json_load(file)
+    input_shape = (FLAGS.screen_size, FLAGS.screen_size)
+    act = None
+    if FLAGS.source == 'deepq':
+        act, variables = load_deepq(FLAGS.model)
+    else:
+        if FLAGS.variables is None:
+            raise app.UsageError("--variables is required for checkpoints, see --list_variables")
+        with open(FLAGS.variables) as file:
+            variables = load_checkpoint(FLAGS.model, json_load(file))
+    policy = NumpyPolicy(spec, pair_weights(spec, input_shape, variables), input_shape)
+
+    screens = sample_screens(FLAGS.samples, FLAGS.screen_size)
+    if FLAGS.q_values_tensor:
+        if act is not None:
+            import tensorflow as tf
+            reference = model_q_values(tf.get_default_graph(), tf.get_default_session(), screens)
+        else:
+            reference = checkpoint_q_values(FLAGS.model, screens)
+        error = float(np_abs(policy.q_values(screens) - reference.reshape(len(screens), -1)).max())
+        print("Largest difference from {}: {:.3g}".format(FLAGS.q_values_tensor, error))
+        if error > FLAGS.tolerance:
+            raise ValueError("The exported policy differs from {} by {:.3g} > {:.3g}".format(
+                FLAGS.q_values_tensor, error, FLAGS.tolerance))
+    elif act is not None:
+        agreement = float(np_mean(policy(screens) == act(screens, stochastic=False)))
+        print("Greedy action agreement with the saved act function: {:.4f}".format(agreement))
+        if agreement < FLAGS.min_agreement:
+            raise ValueError("The exported policy agrees with the act function on {:.4f} < {:.4f} of the actions".format(
+                agreement, FLAGS.min_agreement))
+    else:
+        raise app.UsageError("--q_values_tensor is required to check a checkpoint export")
+    policy.save(FLAGS.output)
+    print("Saved {}".format(FLAGS.output))
+
+    if FLAGS.compare:
+        context = get_context('spawn')
+        results = context.Queue()
+        arguments = {'model': FLAGS.model, 'output': FLAGS.output, 'screen_size': FLAGS.screen_size,
+                     'source': FLAGS.source}
+        for engine in ('numpy', 'tensorflow'):
+            process = context.Process(target=measure, args=(engine, arguments, results))
+            process.start()
+            process.join()
+            if process.exitcode == 0:
+                print(json_dumps(results.get(), sort_keys=True))
+            else:
+                print("Measuring {} failed with exit code {}".format(engine, process.exitcode))
+
+if __name__ == '__main__':
+    app.run(main)
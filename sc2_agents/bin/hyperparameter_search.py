@@ -0,0 +1,135 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Successive-halving hyperparameter search for the PPO and DQN trainers.
+
+Each trial runs one of the trainers in its own process. TensorForce trials
+resume from their last checkpoint at every rung; the baselines trainers
+cannot resume, so their trials are retrained with the larger budget.
+
+python -m sc2_agents.bin.hyperparameter_search --trainer baselines --algorithm ppo --search_space ppo_space.json --output_dir ./search/ppo
+
+where ppo_space.json holds e.g.
+
+{"timesteps_per_actorbatch": [512, 1024, 2048],
+ "optim_batchsize": [64, 128, 256],
+ "optim_stepsize": {"log_uniform": [1e-5, 1e-3]}}
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from json import load
+from logging import basicConfig as logging_basicConfig
+from logging import getLogger
+from logging import INFO
+from os import makedirs
+from os import path
+from sc2_agents.lib.successive_halving import sample_configs
+from sc2_agents.lib.successive_halving import SuccessiveHalving
+from subprocess import call
+from sys import executable
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('algorithm', 'deepq', "baselines algorithm (deepq or ppo)")
+flags.DEFINE_string('env_pool', None, "Have the trials take their environments from the pool at host:port")
+flags.DEFINE_integer('eta', 3, "Keep the best 1/eta of the trials at each rung")
+flags.DEFINE_string('map_name', 'MoveToBeacon', "Name of the minigame")
+flags.DEFINE_integer('max_budget', 81000, "Timesteps of the last rung")
+flags.DEFINE_integer('min_budget', 1000, "Timesteps of the first rung")
+flags.DEFINE_integer('num_configs', 27, "Configurations sampled from the search space")
+flags.DEFINE_string('output_dir', None, "Directory for the trials and search.json")
+flags.DEFINE_string('search_space', None, "JSON file describing the search space")
+flags.DEFINE_integer('seed', None, "Seed for sampling configurations")
+flags.DEFINE_string('trainer', 'tensorforce', "Trainer to search over (tensorforce or baselines)")
+flags.DEFINE_integer('window', 100, "Episodes in the rolling reward")
+flags.DEFINE_integer('workers', 4, "Trials run in parallel")
+flags.mark_flag_as_required('output_dir')
+flags.mark_flag_as_required('search_space')
+
+
+def config_flags(config):
+    arguments = []
+    for name in sorted(config):
+        value = config[name]
+        if isinstance(value, (list, tuple)):
+            value = ','.join(str(v) for v in value)
+        arguments.append('--{}={}'.format(name, value))
+    return arguments
+
+
+def trial_command(trial, budget):
+    if FLAGS.trainer == 'tensorforce':
+        command = [executable, '-m', 'sc2_agents.bin.tensorforce.train_agent',
+                   '--gym_id={}-bbueno5000-v0'.format(FLAGS.map_name),
+                   '--num_episodes=0',
+                   '--save={}'.format(path.join(trial.directory, 'agent')),
+                   '--timesteps={}'.format(budget - trial.budget)]
+        if trial.budget:
+            command.append('--load={}'.format(trial.directory + path.sep))
+    elif FLAGS.trainer == 'baselines':
+        command = [executable, '-m', 'sc2_agents.bin.baselines.train_agent',
+                   '--algorithm={}'.format(FLAGS.algorithm),
+                   '--map_name={}'.format(FLAGS.map_name),
+                   '--save_dir={}'.format(trial.directory),
+                   '--timesteps={}'.format(budget)]
+    else:
+        raise ValueError("Unknown trainer: {}".format(FLAGS.trainer))
+    if FLAGS.env_pool:
+        command.append('--env_pool={}'.format(FLAGS.env_pool))
+    return command + config_flags(trial.config)
+
+
+def run_trial(trial, budget):
+    if not path.isdir(trial.directory):
+        makedirs(trial.directory)
+    with open(path.join(trial.directory, 'trial.log'), 'a') as log_file:
+        return call(trial_command(trial, budget), stdout=log_file, stderr=log_file) == 0
+
+
+def main(argv):
+    logging_basicConfig(level=INFO)
+    logger = getLogger(__file__)
+    logger.setLevel(INFO)
+
+    with open(FLAGS.search_space, 'r') as fp:
+        search_space = load(fp=fp)
+    configs = sample_configs(search_space, FLAGS.num_configs, seed=FLAGS.seed)
+    search = SuccessiveHalving(configs,
+                               run_trial,
+                               FLAGS.output_dir,
+                               min_budget=FLAGS.min_budget,
+                               max_budget=FLAGS.max_budget,
+                               eta=FLAGS.eta,
+                               workers=FLAGS.workers,
+                               window=FLAGS.window)
+    best = search.run()
+    if best is None:
+        logger.info("All trials failed")
+        return
+    logger.info("Best trial {} with rolling reward {:0.2f}: {}".format(best.trial_id, best.score, best.config))
+
+if __name__ == '__main__':
+    app.run(main)
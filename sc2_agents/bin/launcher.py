@@ -0,0 +1,101 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Launch trainers, environment workers and evaluators on one host, each
+pinned to its own set of CPUs with matching TensorFlow and BLAS thread
+limits, and report the steps per second each of them achieved.
+
+python -m sc2_agents.bin.launcher --jobs jobs.json
+
+where jobs.json lists the processes to start, e.g.
+
+[{"name": "ppo-1", "role": "trainer", "cpus": 2, "run_dir": "./runs/ppo-1",
+  "command": ["python", "-m", "sc2_agents.bin.tensorforce.train_agent", "--save", "./runs/ppo-1/agent"]},
+ {"name": "eval-1", "role": "evaluator", "cpus": 1,
+  "command": ["python", "-m", "sc2_agents.bin.tensorforce.train_agent", "--test", "--load", "./runs/ppo-0/"]}]
+
+A job with a "run_dir" is expected to leave a run_log.json there, which is
+where its steps per second are read from.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from functools import partial
+from json import load
+from logging import basicConfig as logging_basicConfig
+from logging import getLogger
+from logging import INFO
+from sc2_agents.lib.cpu_affinity import CoreScheduler
+from sc2_agents.lib.cpu_affinity import pin_process
+from sc2_agents.lib.cpu_affinity import thread_environment
+from sc2_agents.lib.run_log import RunLog
+from subprocess import Popen
+from time import time
+
+FLAGS = flags.FLAGS
+flags.DEFINE_list('cpus', None, "CPUs to schedule on (default: all CPUs available to this process)")
+flags.DEFINE_string('jobs', None, "JSON file listing the jobs to launch")
+flags.mark_flag_as_required('jobs')
+
+
+def main(argv):
+    logging_basicConfig(level=INFO)
+    logger = getLogger(__file__)
+    logger.setLevel(INFO)
+
+    with open(FLAGS.jobs, 'r') as fp:
+        jobs = load(fp=fp)
+    scheduler = CoreScheduler([int(cpu) for cpu in FLAGS.cpus] if FLAGS.cpus else None)
+    processes = []
+    for job in jobs:
+        cpus = scheduler.allocate(job.get('cpus', 1))
+        threads = job.get('threads', len(cpus))
+        logger.info("Starting {} ({}) on CPUs {} with {} threads".format(
+            job['name'], job.get('role', 'trainer'), cpus, threads))
+        process = Popen(job['command'],
+                        env=thread_environment(threads),
+                        preexec_fn=partial(pin_process, cpus))
+        processes.append((job, cpus, threads, process, time()))
+
+    rows = []
+    for job, cpus, threads, process, start_time in processes:
+        returncode = process.wait()
+        seconds = time() - start_time
+        steps_per_second = None
+        if job.get('run_dir'):
+            run_log = RunLog(job['run_dir'])
+            steps_per_second = run_log.steps_per_second()
+        rows.append((job['name'], job.get('role', 'trainer'), cpus, threads, returncode, seconds, steps_per_second))
+
+    logger.info("{:<20} {:<12} {:<16} {:>7} {:>5} {:>10} {:>10}".format(
+        'name', 'role', 'cpus', 'threads', 'exit', 'seconds', 'steps/s'))
+    for name, role, cpus, threads, returncode, seconds, steps_per_second in rows:
+        logger.info("{:<20} {:<12} {:<16} {:>7d} {:>5d} {:>10.1f} {:>10}".format(
+            name, role, ','.join(str(cpu) for cpu in cpus), threads, returncode, seconds,
+            '-' if steps_per_second is None else '{:0.2f}'.format(steps_per_second)))
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,97 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Play a minigame in real time with an agent held to a per-step latency
+budget, then report its deadline-miss rate and decision latencies.
+
+python -m sc2_agents.bin.play_real_time --map_name MoveToBeacon --agent sc2_agents.agents.move_to_beacon.MoveToBeaconAgent002
+
+With --checkpoint_dir the agent is built with the act_x/act_y .npz
+policies of that directory and picks up new ones written there (for
+example by train_dqn --checkpoint_freq) while it plays. With --skip_decisions the
+agent's held decisions are repeated without stepping it, and the report
+gains the CPU time this saved.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from json import dumps as json_dumps
+from pysc2.env import run_loop
+from sc2_agents.lib.agent_wrapper import agent_class
+from sc2_agents.lib.decision_skipping import DecisionSkippingAgent
+from sc2_agents.lib.environments import make_env
+from sc2_agents.lib.game_time import step_budget
+from sc2_agents.lib.hot_reload import CheckpointWatcher
+from sc2_agents.lib.hot_reload import HotReloadAgent
+from sc2_agents.lib.metrics import MetricsServer
+from sc2_agents.lib.metrics import REGISTRY
+from sc2_agents.lib.real_time import RealTimeAgent
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('agent', 'sc2_agents.agents.move_to_beacon.MoveToBeaconAgent001', "Agent to play")
+flags.DEFINE_string('agent_race', 'terran', "Agent's race")
+flags.DEFINE_string('checkpoint_dir', None, "Load the agent's act_x/act_y .npz policies from here and reload them when they change")
+flags.DEFINE_float('checkpoint_poll_seconds', 1.0, "Seconds between checks of --checkpoint_dir")
+flags.DEFINE_float('latency_budget', None, "Seconds the agent may take per step, defaults to one agent step of game time")
+flags.DEFINE_string('map_name', 'MoveToBeacon', "Name of the minigame")
+flags.DEFINE_integer('max_episodes', 10, "Number of episodes to play")
+flags.DEFINE_integer('metrics_port', None, "Serve the real-time metrics on this port")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_bool('skip_decisions', False, "Repeat the agent's held decisions instead of stepping it while they are valid")
+flags.DEFINE_integer('step_mul', 8, "Game steps per agent step")
+
+def main(argv):
+    watcher = None
+    if FLAGS.checkpoint_dir:
+        watcher = CheckpointWatcher(FLAGS.checkpoint_dir, poll_seconds=FLAGS.checkpoint_poll_seconds, registry=REGISTRY)
+        agent = HotReloadAgent(agent_class(FLAGS.agent)(*watcher.load()), watcher.start())
+    else:
+        agent = agent_class(FLAGS.agent)()
+    skipping_agent = DecisionSkippingAgent(agent) if FLAGS.skip_decisions else None
+    budget = FLAGS.latency_budget or getattr(agent, 'latency_budget', None) or step_budget(FLAGS.step_mul)
+    real_time_agent = RealTimeAgent(skipping_agent or agent, budget_seconds=budget, registry=REGISTRY)
+    if FLAGS.metrics_port is not None:
+        MetricsServer(REGISTRY, port=FLAGS.metrics_port).start()
+    try:
+        with make_env(FLAGS.map_name,
+                      agent_race=FLAGS.agent_race,
+                      screen_size=FLAGS.screen_size,
+                      step_mul=FLAGS.step_mul,
+                      realtime=True) as env:
+            run_loop.run_loop([real_time_agent], env, max_episodes=FLAGS.max_episodes)
+    finally:
+        real_time_agent.close()
+        if watcher is not None:
+            watcher.stop()
+    report = real_time_agent.report()
+    if watcher is not None:
+        report['hot_reload'] = agent.report()
+    if skipping_agent is not None:
+        report['decision_skipping'] = skipping_agent.report()
+    print(json_dumps(report, indent=2, sort_keys=True))
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,154 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Profile candidate network specs at the training screen size and pick the
+largest one that fits a per-step latency budget.
+
+Each spec (TensorForce network JSON, see bin/tensorforce/network_configs)
+gets a linear output layer of --num_actions and is timed with the NumPy
+networks used by train_dqn and the exported policies: per-step act
+latency, forward/backward latency and training throughput for a batch,
+and parameter, optimizer and activation memory.
+
+The chosen spec is passed on to train_agent as --network, where it runs
+as a TensorForce graph, so when tensorforce imports the act latency and
+parameter count come from that agent (--agent_config, PPO by default)
+instead, and the choice is made on them. Otherwise it is a NumPy
+estimate; the output names the backend either way. Specs with layers
+the chosen backend cannot build are listed as skipped.
+
+python -m sc2_agents.bin.profile_networks --screen_size 64 --step_mul 8
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from glob import glob
+from json import dump as json_dump
+from json import load as json_load
+from os import path
+from sc2_agents.lib.game_time import step_budget
+from sc2_agents.lib.network_profile import load_network_spec
+from sc2_agents.lib.network_profile import profile_network
+from sc2_agents.lib.network_profile import profile_tensorforce
+from sc2_agents.lib.network_profile import select_network
+from sc2_agents.lib.network_profile import tensorforce_available
+from sc2_agents.lib.network_profile import unsupported_layers
+
+NETWORK_CONFIGS = path.join(path.dirname(path.abspath(__file__)), 'tensorforce', 'network_configs')
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('agent_config', None, "TensorForce agent configuration file (default: PPO)")
+flags.DEFINE_enum('backend', 'auto', ['auto', 'tensorforce', 'numpy'],
+                  "Where to time act latency (auto: TensorForce when it imports, else NumPy)")
+flags.DEFINE_integer('batch_size', 32, "Minibatch size for the update and throughput measurements")
+flags.DEFINE_integer('channels', 1, "Observation channels, e.g. the frame stack")
+flags.DEFINE_float('latency_budget', None, "Seconds the agent may take per step, defaults to one agent step of game time")
+flags.DEFINE_list('networks', None, "Network spec files to compare (default: the *_network.json configs)")
+flags.DEFINE_integer('num_actions', None, "Outputs of the action layer (default: --screen_size, one per coordinate)")
+flags.DEFINE_string('output', None, "Write the profiles and the choice to this JSON file")
+flags.DEFINE_integer('repeats', 50, "Timed forward passes per network")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_integer('step_mul', 8, "Game steps per agent step, for the default latency budget")
+
+
+def candidate_files():
+    if FLAGS.networks:
+        return FLAGS.networks
+    return sorted(glob(path.join(NETWORK_CONFIGS, '*_network*.json')))
+
+
+def profile_file(file_path, backend, input_shape, num_actions, agent_config):
+    """
+    The profile of one spec file, or the reason it was skipped.
+    """
+    spec = load_network_spec(file_path)
+    unsupported = unsupported_layers(spec)
+    if unsupported and backend == 'numpy':
+        return None, "unsupported layers: {}".format(', '.join(unsupported))
+    try:
+        result = {} if unsupported else profile_network(spec, input_shape, num_actions,
+                                                         batch_size=FLAGS.batch_size, repeats=FLAGS.repeats)
+        if backend == 'tensorforce':
+            result.update(profile_tensorforce(spec, input_shape, num_actions, repeats=FLAGS.repeats,
+                                              agent_config=agent_config))
+    except MemoryError:
+        return None, "out of memory"
+    except Exception as error:    # pylint: disable=W0703
+        if backend != 'tensorforce':
+            raise
+        return None, "TensorForce could not build it: {}".format(error)
+    result['latency_backend'] = backend
+    return result, None
+
+
+def main(argv):
+    budget = FLAGS.latency_budget or step_budget(FLAGS.step_mul)
+    backend = FLAGS.backend
+    if backend == 'auto':
+        backend = 'tensorforce' if tensorforce_available() else 'numpy'
+    agent_config = None
+    if FLAGS.agent_config:
+        with open(FLAGS.agent_config) as file:
+            agent_config = json_load(file)
+    input_shape = (FLAGS.screen_size, FLAGS.screen_size, FLAGS.channels)
+    num_actions = FLAGS.num_actions or FLAGS.screen_size
+    profiles, skipped = {}, {}
+    for file_path in candidate_files():
+        result, reason = profile_file(file_path, backend, input_shape, num_actions, agent_config)
+        if result is None:
+            skipped[file_path] = reason
+        else:
+            profiles[file_path] = result
+    choice = select_network(profiles, budget)
+    label = 'TensorForce latency' if backend == 'tensorforce' else 'NumPy latency estimate'
+    print("{:<32} {:>10} {:>9} {:>9} {:>10} {:>12} {:>10}".format(
+        'network', 'params', 'act_p50', 'act_p99', 'update', 'samples/s', 'memory_kb'))
+    for file_path, profile in sorted(profiles.items(), key=lambda item: item[1]['parameters']):
+        if 'update_ms_p50' in profile:
+            memory = profile['parameter_bytes'] + profile['optimizer_bytes'] + profile['activation_bytes']
+            numpy_columns = "{:>8.1f}ms {:>12.1f} {:>10.1f}".format(
+                profile['update_ms_p50'], profile['train_samples_per_second'], memory / 1024)
+        else:
+            numpy_columns = "{:>10} {:>12} {:>10}".format('-', '-', '-')
+        print("{:<32} {:>10d} {:>7.2f}ms {:>7.2f}ms {}{}".format(
+            path.basename(file_path), profile['parameters'], profile['act_ms_p50'], profile['act_ms_p99'],
+            numpy_columns, ' *' if file_path == choice else ''))
+    for file_path, reason in sorted(skipped.items()):
+        print("{:<32} skipped, {}".format(path.basename(file_path), reason))
+    if choice is None:
+        print("No network acts within the {:.1f}ms budget ({})".format(1000 * budget, label))
+    else:
+        print("Largest network within the {:.1f}ms budget ({}): {}".format(1000 * budget, label, choice))
+    if FLAGS.output:
+        with open(FLAGS.output, 'w') as file:
+            json_dump({'budget_seconds': budget,
+                       'choice': choice,
+                       'latency_backend': backend,
+                       'profiles': profiles,
+                       'skipped': skipped}, file, indent=2, sort_keys=True)
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,158 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Quantize a pair of exported act_x/act_y coordinate policies to int8 and
+report how the int8 policies compare with float32 on action agreement,
+episode reward and per-step latency.
+
+Calibration and agreement use screens from recorded demonstrations
+(see record_demonstrations) when --demonstrations is given and screens
+from the stand-in minigame otherwise. Episode rewards are measured on
+the stand-in minigame. The int8 policies are only written when their
+per-step latency beats float32 by --min_speedup; otherwise only the
+report is.
+
+python -m sc2_agents.bin.quantize_policy --act_x act_x.npz --act_y act_y.npz --demonstrations ./demonstrations/move_to_beacon --output_dir ./quantized
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from json import dump as json_dump
+from numpy import concatenate as np_concatenate
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import mean as np_mean
+from numpy import percentile as np_percentile
+from numpy.random import RandomState
+from os import makedirs
+from os import path
+from sc2_agents.lib.demonstrations import DemonstrationLoader
+from sc2_agents.lib.numpy_policy import NumpyPolicy
+from sc2_agents.lib.quantization import QuantizedPolicy
+from sc2_agents.lib.standin_env import coordinate_episodes
+from sc2_agents.lib.standin_env import StandInMinigame
+from timeit import default_timer
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('act_x', None, "Exported float32 policy for the x coordinate")
+flags.DEFINE_string('act_y', None, "Exported float32 policy for the y coordinate")
+flags.DEFINE_integer('calibration_samples', 1024, "Screens used to calibrate the input scales")
+flags.DEFINE_string('demonstrations', None, "Directory of recorded demonstrations")
+flags.DEFINE_integer('episodes', 10, "Stand-in episodes played by each policy pair")
+flags.DEFINE_integer('evaluation_samples', 2048, "Held-out screens used to measure action agreement")
+flags.DEFINE_string('map_name', 'MoveToBeacon', "Stand-in minigame used for episode rewards")
+flags.DEFINE_float('min_speedup', 1.0, "Step latency speedup over float32 the int8 policies need to be saved")
+flags.DEFINE_string('output_dir', None, "Directory for the int8 policies and the report")
+flags.DEFINE_float('percentile', 99.99, "Percentile of the input magnitudes mapped to 127")
+flags.DEFINE_integer('player_neutral', 3, "player_relative value of the beacon/minerals")
+flags.DEFINE_integer('seed', 0, "Seed for the stand-in minigame")
+flags.mark_flag_as_required('act_x')
+flags.mark_flag_as_required('act_y')
+flags.mark_flag_as_required('output_dir')
+
+
+def demonstration_screens(count):
+    loader = DemonstrationLoader(FLAGS.demonstrations, batch_size=256, seed=FLAGS.seed)
+    layer = loader.layer_index('player_relative')
+    screens, total = [], 0
+    for batch in loader:
+        screens.append((batch['screens'][:, layer] == FLAGS.player_neutral).astype(np_float32))
+        total += len(screens[-1])
+        if total >= count:
+            break
+    return np_concatenate(screens)[:count]
+
+
+def standin_screens(count, screen_size):
+    random = RandomState(FLAGS.seed)
+    env = StandInMinigame(FLAGS.map_name, screen_size=screen_size, seed=FLAGS.seed + 1)
+    screens = []
+    timestep = env.reset()[0]
+    while len(screens) < count:
+        screens.append((timestep.observation.feature_screen.player_relative == FLAGS.player_neutral).astype(np_float32))
+        timestep = env.step(random.randint(0, screen_size, size=2))[0]
+        if timestep.last():
+            timestep = env.reset()[0]
+    return np_concatenate([screen[None] for screen in screens])
+
+
+def step_latencies(act_x, act_y, screens):
+    latencies = []
+    for screen in screens:
+        start_time = default_timer()
+        act_x(screen[None])
+        act_y(screen[None])
+        latencies.append(default_timer() - start_time)
+    return latencies
+
+
+def main(argv):
+    policies = {'x': NumpyPolicy.load(FLAGS.act_x), 'y': NumpyPolicy.load(FLAGS.act_y)}
+    screen_size = policies['x'].input_shape[0] if policies['x'].input_shape else 64
+    count = FLAGS.calibration_samples + FLAGS.evaluation_samples
+    screens = demonstration_screens(count) if FLAGS.demonstrations else standin_screens(count, screen_size)
+    calibration = screens[:FLAGS.calibration_samples]
+    evaluation = screens[FLAGS.calibration_samples:]
+
+    if not path.isdir(FLAGS.output_dir):
+        makedirs(FLAGS.output_dir)
+    quantized = {axis: QuantizedPolicy.from_policy(policy, calibration, percentile=FLAGS.percentile)
+                 for axis, policy in policies.items()}
+
+    report = {'calibration_samples': len(calibration),
+              'evaluation_samples': len(evaluation),
+              'map_name': FLAGS.map_name,
+              'screens': 'demonstrations' if FLAGS.demonstrations else 'stand-in'}
+    for axis in sorted(policies):
+        report['agreement_' + axis] = float(np_mean(policies[axis](evaluation) == quantized[axis](evaluation)))
+        report['float32_bytes_' + axis] = sum(k.nbytes + b.nbytes for k, b in policies[axis].weights)
+        report['int8_bytes_' + axis] = quantized[axis].stored_bytes()
+    for name, pair in (('float32', policies), ('int8', quantized)):
+        latencies = step_latencies(pair['x'], pair['y'], evaluation[:500])
+        rewards = coordinate_episodes(pair['x'], pair['y'],
+                                      StandInMinigame(FLAGS.map_name, screen_size=screen_size, seed=FLAGS.seed),
+                                      FLAGS.episodes, FLAGS.player_neutral)
+        report[name] = {'mean_reward': float(np_mean(rewards)),
+                        'step_ms_p50': 1000 * float(np_percentile(latencies, 50)),
+                        'step_ms_p99': 1000 * float(np_percentile(latencies, 99))}
+    report['speedup'] = report['float32']['step_ms_p50'] / report['int8']['step_ms_p50']
+    report['saved'] = report['speedup'] >= FLAGS.min_speedup
+    if report['saved']:
+        for axis in sorted(quantized):
+            quantized[axis].save(path.join(FLAGS.output_dir, 'act_{}.int8.npz'.format(axis)))
+
+    with open(path.join(FLAGS.output_dir, 'quantization_report.json'), 'w') as file:
+        json_dump(report, file, indent=2, sort_keys=True)
+    print("{:>8} {:>12} {:>12} {:>12}".format('', 'reward', 'step_p50_ms', 'step_p99_ms'))
+    for name in ('float32', 'int8'):
+        print("{:>8} {:>12.2f} {:>12.3f} {:>12.3f}".format(
+            name, report[name]['mean_reward'], report[name]['step_ms_p50'], report[name]['step_ms_p99']))
+    print("agreement x {:.4f}, y {:.4f}; speedup {:.2f}x".format(
+        report['agreement_x'], report['agreement_y'], report['speedup']))
+    if not report['saved']:
+        print("Not saving the int8 policies: they are not {:.2f}x faster than float32".format(FLAGS.min_speedup))
+
+if __name__ == '__main__':
+    app.run(main)
@@ -0,0 +1,63 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Record demonstrations of a scripted agent into a sharded dataset.
+
+python -m sc2_agents.bin.record_demonstrations --map_name MoveToBeacon --agent sc2_agents.agents.move_to_beacon.MoveToBeaconAgent001 --output_dir ./demonstrations/move_to_beacon
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from pysc2.env import run_loop
+from sc2_agents.lib.agent_wrapper import agent_class
+from sc2_agents.lib.demonstrations import DemonstrationRecorder
+from sc2_agents.lib.environments import make_env
+from sc2_agents.lib.frame_store import memory_report
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('agent', 'sc2_agents.agents.move_to_beacon.MoveToBeaconAgent001', "Scripted agent to record")
+flags.DEFINE_string('agent_race', 'terran', "Agent's race")
+flags.DEFINE_string('map_name', 'MoveToBeacon', "Name of the minigame")
+flags.DEFINE_integer('max_episodes', 100, "Number of episodes to record")
+flags.DEFINE_string('output_dir', None, "Directory for the dataset shards")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_integer('shard_size', 10000, "Samples per shard")
+flags.DEFINE_integer('step_mul', 8, "Game steps per agent step")
+flags.mark_flag_as_required('output_dir')
+
+def main(argv):
+    recorder = DemonstrationRecorder(agent_class(FLAGS.agent)(), FLAGS.output_dir, shard_size=FLAGS.shard_size,
+                                     map_name=FLAGS.map_name)
+    with make_env(FLAGS.map_name,
+                  agent_race=FLAGS.agent_race,
+                  screen_size=FLAGS.screen_size,
+                  step_mul=FLAGS.step_mul) as env:
+        run_loop.run_loop([recorder], env, max_episodes=FLAGS.max_episodes)
+    recorder.close()
+    memory_report([recorder])
+
+if __name__ == '__main__':
+    app.run(main)
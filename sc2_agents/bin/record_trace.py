@@ -0,0 +1,89 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Record the timesteps an agent sees into an observation trace, for
+replaying with replay_trace on machines without StarCraft II.
+
+python -m sc2_agents.bin.record_trace --map_name MoveToBeacon --agent sc2_agents.agents.move_to_beacon.MoveToBeaconAgent001 --output ./traces/move_to_beacon.npz
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from numpy.random import seed as np_seed
+from random import seed as random_seed
+from sc2_agents.lib.agent_wrapper import agent_class
+from sc2_agents.lib.trace import TraceRecorder
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('agent', 'sc2_agents.agents.move_to_beacon.MoveToBeaconAgent001', "Agent to record")
+flags.DEFINE_string('agent_race', 'terran', "Agent's race")
+flags.DEFINE_enum('env', 'sc2', ['standin', 'sc2'], "Record from StarCraft II or from the stand-in minigame")
+flags.DEFINE_list('fields', None, "Observation fields to record (default: all)")
+flags.DEFINE_string('map_name', 'MoveToBeacon', "Name of the minigame")
+flags.DEFINE_integer('max_episodes', 1, "Number of episodes to record")
+flags.DEFINE_string('output', None, "Trace file to write")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_integer('seed', None, "Seed for the environment, `random` and `numpy.random`")
+flags.DEFINE_integer('step_mul', 8, "Game steps per agent step")
+flags.mark_flag_as_required('output')
+
+
+def make_env():
+    if FLAGS.env == 'standin':
+        from sc2_agents.lib.standin_env import StandInMinigame
+        return StandInMinigame(FLAGS.map_name, screen_size=FLAGS.screen_size, seed=FLAGS.seed)
+    from sc2_agents.lib.environments import make_env as make_sc2_env
+    return make_sc2_env(FLAGS.map_name,
+                        agent_race=FLAGS.agent_race,
+                        screen_size=FLAGS.screen_size,
+                        step_mul=FLAGS.step_mul,
+                        random_seed=FLAGS.seed)
+
+
+def first_spec(spec):
+    # SC2Env returns one spec per player, the stand-in a single one
+    return spec[0] if isinstance(spec, (list, tuple)) else spec
+
+
+def main(argv):
+    if FLAGS.seed is not None:
+        random_seed(FLAGS.seed)
+        np_seed(FLAGS.seed)
+    recorder = TraceRecorder(agent_class(FLAGS.agent)(), FLAGS.output, fields=FLAGS.fields)
+    with make_env() as env:
+        recorder.setup(first_spec(env.observation_spec()), first_spec(env.action_spec()))
+        for _ in range(FLAGS.max_episodes):
+            timesteps = env.reset()
+            recorder.reset()
+            while True:
+                timesteps = env.step([recorder.step(timesteps[0])])
+                if timesteps[0].last():
+                    recorder.step(timesteps[0])
+                    break
+    recorder.close()
+
+if __name__ == '__main__':
+    app.run(main)
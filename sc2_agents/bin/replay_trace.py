@@ -0,0 +1,66 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Replay an observation trace to an agent at full speed, without
+StarCraft II: reports per-step latency and throughput, and whether the
+agent still takes the recorded decisions. Exits with status 1 on any
+mismatch, so it can gate CI.
+
+python -m sc2_agents.bin.replay_trace --trace ./traces/move_to_beacon.npz --agent sc2_agents.agents.move_to_beacon.MoveToBeaconAgent001 --repeat 10
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from json import dump as json_dump
+from json import dumps as json_dumps
+from sc2_agents.lib.agent_wrapper import agent_class
+from sc2_agents.lib.trace import replay
+from sc2_agents.lib.trace import Trace
+from sys import exit
+
+FLAGS = flags.FLAGS
+flags.DEFINE_string('agent', 'sc2_agents.agents.move_to_beacon.MoveToBeaconAgent001', "Agent to replay the trace to")
+flags.DEFINE_bool('compare', True, "Check the agent's actions against the recorded ones")
+flags.DEFINE_string('output', None, "Write the report to this JSON file")
+flags.DEFINE_integer('repeat', 1, "Passes over the trace")
+flags.DEFINE_integer('seed', None, "Seed for `random` and `numpy.random` before each pass (use the recording seed)")
+flags.DEFINE_string('trace', None, "Trace file written by record_trace")
+flags.mark_flag_as_required('trace')
+
+def main(argv):
+    trace = Trace(FLAGS.trace)
+    report = replay(agent_class(FLAGS.agent)(), trace, repeat=FLAGS.repeat, seed=FLAGS.seed, compare=FLAGS.compare)
+    report['agent'] = FLAGS.agent
+    report['trace'] = FLAGS.trace
+    print(json_dumps(report, indent=2, sort_keys=True))
+    if FLAGS.output:
+        with open(FLAGS.output, 'w') as file:
+            json_dump(report, file, indent=2, sort_keys=True)
+    if report.get('mismatches'):
+        exit(1)
+
+if __name__ == '__main__':
+    app.run(main)
@@ -22,8 +22,6 @@
 
 from absl import app
 from absl import flags
-from dqn_agent import train_agent
-from pysc2.bin.agent import run_thread
 from tkinter import Button
 from tkinter import Entry
 from tkinter import Label
@@ -32,6 +30,40 @@ from tkinter import OptionMenu
 from tkinter import Tk
 
 FLAGS = flags.FLAGS
+flags.DEFINE_integer('pipeline_envs', 1, "RunAgent: environments stepped by a PipelinedRunner, "
+                     "1 runs the agent with pysc2's single-environment loop")
+flags.DEFINE_integer('pipeline_groups', 2, "RunAgent: groups of environments that take turns simulating")
+
+
+def run_pipelined(argv):
+    """
+    Run one agent per environment through a PipelinedRunner, so that the
+    agents choose actions for one group of environments while the others
+    simulate, until --num_episodes episodes have ended.
+    """
+    from sc2_agents.lib.agent_wrapper import agent_class
+    from sc2_agents.lib.environments import make_env
+    from sc2_agents.lib.pipelined_runner import agent_actor
+    from sc2_agents.lib.pipelined_runner import PipelinedRunner
+    agent_cls = agent_class(FLAGS.agent_name)
+    envs = [make_env(FLAGS.map_name, step_mul=FLAGS.step_mul, visualize=FLAGS.visualize and index == 0)
+            for index in range(FLAGS.pipeline_envs)]
+    agents = [agent_cls() for _ in envs]
+    for agent, env in zip(agents, envs):
+        agent.setup(env.observation_spec(), env.action_spec())
+    runner = PipelinedRunner(envs, agent_actor(agents), groups=min(FLAGS.pipeline_groups, len(envs)))
+    try:
+        runner.run_episodes(FLAGS.num_episodes)
+        if FLAGS.save_replay:
+            for env in envs:
+                env.save_replay(agent_cls.__name__)
+    finally:
+        runner.close()
+    report = runner.report()
+    print("{} episodes in {:.1f}s: {:.1f} steps/s, agents busy {:.1%}, environments busy {:.1%}".format(
+        report['episodes'], report['wall_seconds'], report['steps_per_second'],
+        report['act_utilization'], report['env_utilization']))
+
 
 class _UserInterface:
 
@@ -52,22 +84,22 @@ class _UserInterface:
         self._visualize()
         self._button()
 
-    def __button_pressed(self):
+    def _button_pressed(self):
         self.master.destroy()
 
     def __set_map(self, map_name):
         self.map_name = map_name
 
     def __set_save_replay(self, save_replay):
-        self.save_replay = save_replay
+        self.save_replay = save_replay == "True"
 
     def __set_visualize(self, visualize):
-        self.visualize = visualize
+        self.visualize = visualize == "True"
 
     def _button(self):
         button = Button(self.master,
                         text="Enter",
-                        command=self.__button_pressed,
+                        command=self._button_pressed,
                         width=self.width)
         button.grid(columnspan=2, pady=20, row=11)
 
@@ -91,7 +123,7 @@ class _UserInterface:
 
     def _num_episodes(self):
         self.num_episodes = 10
-        string_var = StringVar(self.master, self.num_episodes)
+        string_var = self.num_episodes_var = StringVar(self.master, self.num_episodes)
         label = Label(self.master, text="num_episodes", width=self.width)
         entry = Entry(self.master,
                       justify='center',
@@ -114,7 +146,7 @@ class _UserInterface:
 
     def _step_mul(self):
         self.step_mul = 8
-        string_var = StringVar(self.master, self.step_mul)
+        string_var = self.step_mul_var = StringVar(self.master, self.step_mul)
         label = Label(self.master, text="step_mul", width=self.width)
         entry = Entry(self.master,
                       justify='center',
@@ -145,21 +177,24 @@ class RunAgent(_UserInterface):
         super(RunAgent, self).__init__()
         self.master.title("DeepQ Training")
         self._experiment_num()
+        self._pipeline_envs()
 
-    def __button_pressed(self):
-        super(RunAgent, self).__init__()
+    def _button_pressed(self):
+        super(RunAgent, self)._button_pressed()
+        from pysc2.bin.agent import run_thread
         FLAGS.agent_name = self.agent_names[self.map_names.index(self.map_name)]
-        FLAGS.experiment_num = self.experiment_num
+        FLAGS.experiment_num = int(self.experiment_num_var.get())
         FLAGS.map_name = self.map_name
-        FLAGS.num_episodes = self.num_episodes
+        FLAGS.num_episodes = int(self.num_episodes_var.get())
+        FLAGS.pipeline_envs = int(self.pipeline_envs_var.get())
         FLAGS.save_replay = self.save_replay
-        FLAGS.step_mul = self.step_mul
+        FLAGS.step_mul = int(self.step_mul_var.get())
         FLAGS.visualize = self.visualize
-        app.run(run_thread)
+        app.run(run_pipelined if FLAGS.pipeline_envs > 1 else run_thread)
 
     def _experiment_num(self):
         self.experiment_num = 1
-        string_var = StringVar(self.master, self.experiment_num)
+        string_var = self.experiment_num_var = StringVar(self.master, self.experiment_num)
         label = Label(self.master, text="experiment_num", width=self.width)
         entry = Entry(self.master,
                       justify='center',
@@ -169,10 +204,23 @@ class RunAgent(_UserInterface):
         label.grid(column=0, row=2)
         entry.grid(column=0, pady=self.pady, row=3)
 
+    def _pipeline_envs(self):
+        self.pipeline_envs = 1
+        string_var = self.pipeline_envs_var = StringVar(self.master, self.pipeline_envs)
+        label = Label(self.master, text="pipeline_envs", width=self.width)
+        entry = Entry(self.master,
+                      justify='center',
+                      text=string_var.get(),
+                      textvariable=string_var,
+                      width=self.width)
+        label.grid(column=1, row=0)
+        entry.grid(column=1, pady=self.pady, row=1)
+
 class TrainAgent(_UserInterface):
 
     """
-    GUI for selecting from the various options when training a DeepQ agent.
+    GUI for selecting from the various options when training a DeepQ agent
+    with sc2_agents.bin.train_dqn.
     """
 
     def __init__(self):
@@ -183,29 +231,30 @@ class TrainAgent(_UserInterface):
         self._dueling()
         self._prioritized_replay()
 
-    def __button_pressed(self):
-        super(TrainAgent, self).__init__()
-        FLAGS.agent_name = self.agent_names[self.map_names.index(self.map_name)]
-        FLAGS.convs = self.convs
+    def _button_pressed(self):
+        super(TrainAgent, self)._button_pressed()
+        from sc2_agents.bin.train_dqn import train_agent
+        FLAGS.convs = self.convs_var.get()
         FLAGS.dueling = self.dueling
-        FLAGS.hiddens = self.hiddens
+        FLAGS.env = 'sc2'
+        FLAGS.hiddens = self.hiddens_var.get()
         FLAGS.map_name = self.map_name
-        FLAGS.num_episodes = self.num_episodes
+        FLAGS.num_episodes = int(self.num_episodes_var.get())
         FLAGS.prioritized_replay = self.prioritized_replay
         FLAGS.save_replay = self.save_replay
-        FLAGS.step_mul = self.step_mul
+        FLAGS.step_mul = int(self.step_mul_var.get())
         FLAGS.visualize = self.visualize
         app.run(train_agent)
 
     def __set_dueling(self, dueling):
-        self.dueling = dueling
+        self.dueling = dueling == "True"
 
     def __set_prioritized_replay(self, prioritized_replay):
-        self.prioritized_replay = prioritized_replay
+        self.prioritized_replay = prioritized_replay == "True"
 
     def _convs(self):
-        self.convs = ((8, 16, 4), (4, 32, 2))
-        string_var = StringVar(self.master, self.convs)
+        self.convs = ((16, 8, 4), (32, 4, 2))
+        string_var = self.convs_var = StringVar(self.master, str(self.convs))
         label = Label(self.master, text="convs", width=self.width)
         entry = Entry(self.master,
                       justify='center',
@@ -228,7 +277,7 @@ class TrainAgent(_UserInterface):
 
     def _hiddens(self):
         self.hiddens = (125)
-        string_var = StringVar(self.master, self.hiddens)
+        string_var = self.hiddens_var = StringVar(self.master, str(self.hiddens))
         label = Label(self.master, text="hiddens", width=self.width)
         entry = Entry(self.master,
                       justify='center',
@@ -22,6 +22,11 @@
 
 """
 OpenAI gym execution of TensorForce.
+
+With --save the run can be resumed: SIGTERM stops it mid-episode and
+saves the model and training state, and --resume trains on for what is
+left of --timesteps and --num_episodes. As in train_dqn, the episode
+that was interrupted is logged as it stood.
 """
 
 from __future__ import absolute_import
@@ -35,26 +40,52 @@ from logging import getLogger
 from logging import INFO
 from os import mkdir
 from os import path
+from gym.wrappers import Monitor
 from gym_sc2 import envs
+from sc2_agents.lib.cpu_affinity import configured_threads
+from sc2_agents.lib.cpu_affinity import session_config
+from sc2_agents.lib.env_pool import pooled_gym_id
+from sc2_agents.lib.frame_stack import stack_frames
+from sc2_agents.lib.memory_telemetry import MemoryMonitor
+from sc2_agents.lib.metrics import MetricsServer
+from sc2_agents.lib.metrics import REGISTRY
+from sc2_agents.lib.metrics import TrainingMetrics
+from sc2_agents.lib.network_profile import load_network_spec
+from sc2_agents.lib.preprocessing import preprocess_env
+from sc2_agents.lib.run_log import RunLog
+from sc2_agents.lib.training_state import GlobalRandomState
+from sc2_agents.lib.training_state import TrainingState
+from signal import signal
+from signal import SIGTERM
 from tensorforce import TensorForceError
-from tensorforce.agents import PPOAgent
+from tensorforce.agents import Agent
 from tensorforce.execution import Runner
 from tensorforce.contrib.openai_gym import OpenAIGym
 from time import time
 
 FLAGS = flags.FLAGS
-flags.DEFINE_string('agent_config', None, "Agent configuration file")
+flags.DEFINE_string('agent_config', None, "Agent configuration file (default: PPO with TensorForce's defaults)")
+flags.DEFINE_list('crop', None, "Crop the screen to x0,y0,x1,y1 before downsampling")
 flags.DEFINE_bool('debug', False, "Show debug outputs")
 flags.DEFINE_bool('deterministic', False, "Choose actions deterministically")
-flags.DEFINE_integer('num_episodes', 10, "Number of episodes")
-flags.DEFINE_string('gym_id', None, "Id of the Gym environment")
+flags.DEFINE_integer('downsample', 1, "Reduce the screen by this factor in each direction")
+flags.DEFINE_enum('downsample_mode', 'max', ['max', 'stride'], "Max-pool blocks or keep every n-th pixel")
+flags.DEFINE_string('env_pool', None, "Take the environment from the pool at host:port (see bin/env_pool)")
+flags.DEFINE_integer('frame_stack', 1, "Observe the last k frames")
+flags.DEFINE_integer('num_episodes', 10, "Number of episodes (0 = no limit)")
+flags.DEFINE_string('gym_id', 'MoveToBeacon-bbueno5000-v0', "Id of the Gym environment")
 flags.DEFINE_string('job', None, "For distributed mode: The job type of this agent.")
 flags.DEFINE_string('load', None, "Load agent from this dir")
 flags.DEFINE_integer('max_episode_timesteps', None, "Maximum number of timesteps per episode")
+flags.DEFINE_integer('memory_snapshot_episodes', 0, "Diff tracemalloc snapshots every x episodes (0 = disabled)")
+flags.DEFINE_string('metrics_host', '127.0.0.1', "Interface to serve metrics on")
+flags.DEFINE_integer('metrics_port', 0, "Serve Prometheus metrics on this port (0 = disabled)")
 flags.DEFINE_string('monitor', None, "Save results to this directory")
 flags.DEFINE_bool('monitor_safe', False, "Do not overwrite previous results")
 flags.DEFINE_integer('monitor_video', 0, "Save video every x steps (0 = disabled)")
-flags.DEFINE_string('network', None, "Network specification file")
+flags.DEFINE_string('network', None, "Network specification file (see bin/profile_networks)")
+flags.DEFINE_integer('num_threads', None, "TensorFlow threads (default: set by the launcher, else all cores)")
+flags.DEFINE_bool('resume', False, "Continue the run saved to --save: model, run log and RNG state")
 flags.DEFINE_string('save', None, "Save agent to this dir")
 flags.DEFINE_integer('save_episodes', 100, "Save agent every x episodes")
 flags.DEFINE_float('sleep', None, "Slow down simulation by sleeping for x seconds (fractions allowed).")
@@ -63,44 +94,81 @@ flags.DEFINE_bool('test', False, "Test agent without learning.")
 flags.DEFINE_integer('timesteps', None, "Number of timesteps")
 flags.DEFINE_bool('visualize', False, "Enable OpenAI Gym's visualization")
 
+
+class Preempted(Exception):
+    """
+    Raised from the environment to stop the Runner mid-episode on SIGTERM.
+    """
+
+
+class WrappedOpenAIGym(OpenAIGym):
+    """
+    OpenAIGym over a gym wrapped by `wrap` (preprocessing, frame stacking)
+    before it is monitored, so that the agent's states and actions are
+    read from the wrapped spaces and the monitor still sees its episodes
+    end on reset.
+    """
+
+    def __init__(self, gym_id, wrap, monitor=None, monitor_safe=False, monitor_video=0, visualize=False):
+        super(WrappedOpenAIGym, self).__init__(gym_id, visualize=visualize)
+        self.gym = wrap(self.gym)
+        if monitor:
+            video_callable = (lambda x: x % monitor_video == 0) if monitor_video else False
+            self.gym = Monitor(self.gym, monitor, force=not monitor_safe, video_callable=video_callable)
+
+    @property
+    def states(self):
+        return OpenAIGym.state_from_space(space=self.gym.observation_space)
+
+    @property
+    def actions(self):
+        return OpenAIGym.action_from_space(space=self.gym.action_space)
+
+
+def wrap_gym(env):
+    env = preprocess_env(env, crop=FLAGS.crop, factor=FLAGS.downsample, mode=FLAGS.downsample_mode)
+    return stack_frames(env, FLAGS.frame_stack)
+
+
 def main(argv):
     logging_basicConfig(level=INFO)
     logger = getLogger(__file__)
     logger.setLevel(INFO)
 
-    environment = OpenAIGym(
-        gym_id='MoveToBeacon-bbueno5000-v0',
+    environment = WrappedOpenAIGym(
+        gym_id=pooled_gym_id(FLAGS.gym_id, FLAGS.env_pool) if FLAGS.env_pool else FLAGS.gym_id,
+        wrap=wrap_gym,
         monitor=FLAGS.monitor,
         monitor_safe=FLAGS.monitor_safe,
         monitor_video=FLAGS.monitor_video,
         visualize=FLAGS.visualize)
 
-    # if FLAGS.agent_config is not None:
-    #     with open(FLAGS.agent_config, 'r') as fp:
-    #         agent_config = json.load(fp=fp)
-    # else:
-    #     raise TensorForceError(
-    #         "No agent configuration provided.")
-
-    # if FLAGS.network is not None:
-    #     with open(FLAGS.network, 'r') as fp:
-    #         network = json.load(fp=fp)
-    # else:
-    #     network = None
-    #     logger.info(
-    #         "No network configuration provided.")
-
-    network_spec = [
-        dict(type='flatten'),
-        dict(type='dense', size=32),
-        dict(type='dense', size=32)
-        ]
-
-    agent = PPOAgent(
-        states=environment.states,
-        actions=environment.actions,
-        network=network_spec
-        )
+    if FLAGS.agent_config is not None:
+        with open(FLAGS.agent_config, 'r') as fp:
+            agent_config = load(fp=fp)
+    else:
+        agent_config = dict(type='ppo_agent')
+
+    if FLAGS.network is not None:
+        network_spec = load_network_spec(FLAGS.network)
+    else:
+        network_spec = [
+            dict(type='flatten'),
+            dict(type='dense', size=32),
+            dict(type='dense', size=32)
+            ]
+
+    num_threads = FLAGS.num_threads or configured_threads()
+    if num_threads:
+        agent_config['execution'] = dict(
+            type='single', session_config=session_config(num_threads), distributed_spec=None)
+
+    agent = Agent.from_spec(
+        spec=agent_config,
+        kwargs=dict(
+            states=environment.states,
+            actions=environment.actions,
+            network=network_spec))
 
     if FLAGS.load:
         load_dir = path.dirname(FLAGS.load)
@@ -117,12 +185,76 @@ def main(argv):
             except OSError:
                 raise OSError(
                     "Cannot save agent to dir {} ()".format(save_dir))
+        run_log = RunLog(save_dir, resume=bool(FLAGS.load or FLAGS.resume))
+        training_state = TrainingState(path.join(save_dir, 'training_state'))
+        state_components = {'run_log': run_log, 'random': GlobalRandomState()}
+    else:
+        run_log = None
+        training_state = None
+
+    num_timesteps, num_episodes = FLAGS.timesteps, FLAGS.num_episodes or None
+    if FLAGS.resume:
+        if training_state is None:
+            raise TensorForceError("--resume needs the --save location of the run")
+        scalars = training_state.load(state_components)
+        if scalars is None:
+            logger.info("No training state in {}, starting from scratch".format(save_dir))
+        else:
+            # the TensorFlow checkpoint holds the network, the optimizer and the agent's counters
+            agent.restore_model(save_dir)
+            logger.info("Resumed at episode {} after {} timesteps".format(agent.episode, agent.timestep))
+            if scalars.get('episode_length'):
+                # the environment cannot continue the episode, so it ends where it was interrupted
+                run_log.episode(scalars['episode_reward'], scalars['episode_length'])
+                logger.info("Logged the interrupted episode: reward {:.2f} in {} timesteps".format(
+                    scalars['episode_reward'], scalars['episode_length']))
+            # Runner.run counts its limits from the restored counters, so it gets what is left
+            if num_timesteps is not None:
+                num_timesteps -= agent.timestep
+            if num_episodes is not None:
+                num_episodes -= len(run_log.episode_rewards)
+
+    if FLAGS.memory_snapshot_episodes:
+        memory_monitor = MemoryMonitor(
+            path.dirname(FLAGS.save) if FLAGS.save else '.',
+            snapshot_episodes=FLAGS.memory_snapshot_episodes).start()
+    else:
+        memory_monitor = None
 
     if FLAGS.debug:
         logger.info("-" * 16)
         logger.info("Configuration:")
         logger.info(agent)
 
+    REGISTRY.labels.update(trainer='tensorforce', gym_id=FLAGS.gym_id)
+    training_metrics = TrainingMetrics(REGISTRY)
+    if FLAGS.metrics_port:
+        metrics_server = MetricsServer(REGISTRY, port=FLAGS.metrics_port, host=FLAGS.metrics_host).start()
+        logger.info("Serving metrics on port {}".format(metrics_server.port))
+
+    stop = []
+    signal(SIGTERM, lambda signum, frame: stop.append(signum))
+    episode = {'reward': 0.0, 'length': 0}
+
+    def state_scalars(agent):
+        return {'episode': agent.episode,
+                'timestep': agent.timestep,
+                'episode_reward': episode['reward'],
+                'episode_length': episode['length']}
+
+    execute = environment.execute
+
+    def timed_execute(*args, **kwargs):
+        with training_metrics.step_seconds.time():
+            state, terminal, reward = execute(*args, **kwargs)
+        episode['reward'] += reward
+        episode['length'] += 1
+        if stop and not terminal:
+            raise Preempted()
+        return state, terminal, reward
+
+    environment.execute = timed_execute
+
     runner = Runner(
         agent=agent,
         environment=environment,
@@ -138,6 +270,12 @@ def main(argv):
             agent=agent, env=environment))
 
     def episode_finished(r, id_):
+        episode.update(reward=0.0, length=0)
+        training_metrics.episode(r.episode_rewards[-1], r.episode_timestep)
+        if run_log is not None:
+            run_log.episode(r.episode_rewards[-1], r.episode_timestep)
+        if memory_monitor is not None:
+            memory_monitor.episode_finished()
         if r.episode % report_episodes == 0:
             steps_per_second = r.timestep / (time() - r.start_time)
             logger.info("Finished episode {:d} after {:d} timesteps. Steps Per Second {:0.2f}".format(
@@ -149,19 +287,38 @@ def main(argv):
                 sum(r.episode_rewards[-100:]) / min(100, len(r.episode_rewards))))
         if FLAGS.save and FLAGS.save_episodes is not None and not r.episode % FLAGS.save_episodes:
             logger.info("Saving agent to {}".format(FLAGS.save))
-            r.agent.save_model(FLAGS.save)
-        return True
-
-    runner.run(
-        num_timesteps=FLAGS.timesteps,
-        num_episodes=FLAGS.num_episodes,
-        max_episode_timesteps=FLAGS.max_episode_timesteps,
-        deterministic=FLAGS.deterministic,
-        episode_finished=episode_finished,
-        testing=FLAGS.test,
-        sleep=FLAGS.sleep)
+            with training_metrics.checkpoint_seconds.time():
+                r.agent.save_model(FLAGS.save)
+                training_state.save(state_components, state_scalars(r.agent))
+            run_log.save()
+        return not stop
 
+    if (num_timesteps is not None and num_timesteps <= 0) or (num_episodes is not None and num_episodes <= 0):
+        logger.info("The run already reached --timesteps or --num_episodes")
+    else:
+        try:
+            runner.run(
+                num_timesteps=num_timesteps,
+                num_episodes=num_episodes,
+                max_episode_timesteps=FLAGS.max_episode_timesteps,
+                deterministic=FLAGS.deterministic,
+                episode_finished=episode_finished,
+                testing=FLAGS.test,
+                sleep=FLAGS.sleep)
+        except Preempted:
+            logger.info("Stopped by SIGTERM after {} timesteps of episode {}".format(
+                episode['length'], agent.episode))
+
+    if FLAGS.save:
+        logger.info("Saving agent to {}".format(FLAGS.save))
+        with training_metrics.checkpoint_seconds.time():
+            runner.agent.save_model(FLAGS.save)
+            training_state.save(state_components, state_scalars(runner.agent))
     runner.close()
+    if run_log is not None:
+        run_log.save()
+    if memory_monitor is not None:
+        memory_monitor.stop()
 
     logger.info("Learning completed.")
     logger.info("Total episodes: {ep}".format(ep=runner.agent.episode))
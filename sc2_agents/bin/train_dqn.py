@@ -0,0 +1,260 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Train act_x/act_y coordinate policies with the NumPy DQN learner, on a
+minigame or on its stand-in, and report the updates per second it
+sustained.
+
+The complete training state (both heads with their targets and Adam
+moments, the replay buffer, the run log, counters and RNGs) is saved to
+--save_dir/training_state every --state_freq timesteps, at the end and
+on SIGTERM; --resume continues from it with a new episode. The episode
+that was interrupted is logged as it stood, so the run log still
+accounts for every timestep, and the reported seconds cover all runs.
+
+--init_from starts both heads from pretrained policies instead, e.g.
+pretrain_agent's act functions exported to .npz with export_policy and
+a spec matching --convs/--hiddens/--dueling. compare_runs --target_reward
+then reports how much sooner such a run reaches a reward than one
+trained from scratch.
+
+On StarCraft II a step taken while Move_screen is unavailable selects
+the army instead of moving to the chosen target; it is not stored in
+the replay, which continues from the next screen as from a new start.
+
+python -m sc2_agents.bin.train_dqn --map_name MoveToBeacon --env standin --dueling --prioritized_replay
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from absl import app
+from absl import flags
+from ast import literal_eval
+from json import dump as json_dump
+from os import path
+from sc2_agents.lib.dqn import CoordinateDQN
+from sc2_agents.lib.dqn import linear_schedule
+from sc2_agents.lib.dqn import PrioritizedFrameStackReplay
+from sc2_agents.lib.frame_stack import FrameStackReplay
+from sc2_agents.lib.metrics import REGISTRY
+from sc2_agents.lib.metrics import TrainingMetrics
+from sc2_agents.lib.run_log import RunLog
+from sc2_agents.lib.standin_env import StandInMinigame
+from sc2_agents.lib.training_state import GlobalRandomState
+from sc2_agents.lib.training_state import TrainingState
+from signal import signal
+from signal import SIGTERM
+from timeit import default_timer
+
+FLAGS = flags.FLAGS
+flags.DEFINE_integer('batch_size', 32, "Minibatch size")
+flags.DEFINE_integer('buffer_size', 50000, "Replay buffer size")
+flags.DEFINE_integer('checkpoint_freq', 0, "Timesteps between saving the policies to --save_dir (0 = only at the end)")
+flags.DEFINE_string('convs', '((16, 8, 4), (32, 4, 2))', "(outputs, kernel size, stride) of each conv layer")
+flags.DEFINE_bool('double', True, "Use double q-learning targets")
+flags.DEFINE_bool('dueling', False, "Use a dueling network")
+flags.DEFINE_enum('env', 'standin', ['standin', 'sc2'], "Train on the stand-in minigame or on StarCraft II")
+flags.DEFINE_float('exploration_fraction', 0.1, "Fraction of training spent annealing epsilon")
+flags.DEFINE_float('final_eps', 0.02, "Final value of epsilon")
+flags.DEFINE_integer('frame_stack', 1, "Observe the last k frames")
+flags.DEFINE_float('gamma', 0.99, "Discount factor")
+flags.DEFINE_float('grad_norm_clipping', 10.0, "Clip gradients to this global norm")
+flags.DEFINE_string('hiddens', '(256,)', "Units of each dense layer")
+flags.DEFINE_string('init_from', None, "Directory of act_x.npz/act_y.npz policies to start training from")
+flags.DEFINE_integer('learning_starts', 1000, "Timesteps before the first update")
+flags.DEFINE_float('lr', 5e-4, "Learning rate")
+flags.DEFINE_string('map_name', 'MoveToBeacon', "Name of the minigame")
+flags.DEFINE_integer('num_episodes', 0, "Stop after this many episodes (0 = no limit)")
+flags.DEFINE_integer('player_neutral', 3, "player_relative value of the beacon/minerals")
+flags.DEFINE_bool('prioritized_replay', False, "Use prioritized replay")
+flags.DEFINE_float('prioritized_replay_alpha', 0.6, "Prioritization exponent")
+flags.DEFINE_float('prioritized_replay_beta0', 0.4, "Initial importance weight exponent, annealed to 1")
+flags.DEFINE_float('prioritized_replay_eps', 1e-6, "Added to the TD errors to form priorities")
+flags.DEFINE_bool('resume', False, "Continue from the training state in --save_dir")
+flags.DEFINE_bool('save_replay', False, "Save a StarCraft II replay at the end of training")
+flags.DEFINE_string('save_dir', None, "Directory for the policies and run log")
+flags.DEFINE_integer('screen_size', 64, "Resolution of the feature screen")
+flags.DEFINE_integer('seed', None, "Seed for the learner and the stand-in minigame")
+flags.DEFINE_integer('state_freq', 0, "Timesteps between training-state snapshots (0 = only at the end)")
+flags.DEFINE_integer('step_mul', 8, "Game steps per agent step")
+flags.DEFINE_integer('target_network_update_freq', 500, "Timesteps between target network updates")
+flags.DEFINE_integer('timesteps', 100000, "Number of timesteps to train for")
+flags.DEFINE_integer('train_freq', 1, "Timesteps between updates")
+flags.DEFINE_bool('visualize', False, "Show the StarCraft II feature layers")
+
+
+def layer_sizes(value):
+    """
+    Read a layer list given as a string, as the settings interface does.
+    """
+    value = literal_eval(value) if isinstance(value, str) else value
+    return tuple(value) if isinstance(value, (list, tuple)) else (value,)
+
+
+def screen_env():
+    """
+    The environment and a function from (observation, x, y) to its action
+    and whether that action moves to (x, y).
+    """
+    if FLAGS.env == 'standin':
+        env = StandInMinigame(FLAGS.map_name, screen_size=FLAGS.screen_size, seed=FLAGS.seed)
+        return env, lambda observation, x, y: ((x, y), True)
+    from pysc2.lib import actions
+    from sc2_agents.lib.environments import make_env
+
+    def screen_action(observation, x, y):
+        if actions.FUNCTIONS.Move_screen.id in observation.available_actions:
+            return actions.FUNCTIONS.Move_screen('now', (x, y)), True
+        return actions.FUNCTIONS.select_army('select'), False
+
+    env = make_env(FLAGS.map_name, screen_size=FLAGS.screen_size, step_mul=FLAGS.step_mul,
+                   random_seed=FLAGS.seed, visualize=FLAGS.visualize)
+    return env, screen_action
+
+
+def screen(timestep):
+    return (timestep.observation.feature_screen.player_relative == FLAGS.player_neutral).astype('uint8')
+
+
+def train_agent(argv):
+    if FLAGS.save_dir is None:
+        FLAGS.save_dir = './{}-{}-{}'.format(FLAGS.map_name, 'numpy_dqn', 1)
+    run_log = RunLog(FLAGS.save_dir, resume=False)
+    REGISTRY.labels.update(trainer='numpy', algorithm='dqn', map_name=FLAGS.map_name)
+    training_metrics = TrainingMetrics(REGISTRY)
+    learner = CoordinateDQN(FLAGS.screen_size,
+                            k=FLAGS.frame_stack,
+                            convs=layer_sizes(FLAGS.convs),
+                            hiddens=layer_sizes(FLAGS.hiddens),
+                            dueling=FLAGS.dueling,
+                            double=FLAGS.double,
+                            lr=FLAGS.lr,
+                            gamma=FLAGS.gamma,
+                            grad_norm_clipping=FLAGS.grad_norm_clipping,
+                            seed=FLAGS.seed)
+    frame_shape = (FLAGS.screen_size, FLAGS.screen_size)
+    if FLAGS.prioritized_replay:
+        replay = PrioritizedFrameStackReplay(FLAGS.buffer_size, frame_shape, k=FLAGS.frame_stack, action_shape=(2,),
+                                             alpha=FLAGS.prioritized_replay_alpha, seed=FLAGS.seed)
+    else:
+        replay = FrameStackReplay(FLAGS.buffer_size, frame_shape, k=FLAGS.frame_stack, action_shape=(2,), seed=FLAGS.seed)
+    training_state = TrainingState(path.join(FLAGS.save_dir, 'training_state'))
+    components = {'learner': learner, 'replay': replay, 'run_log': run_log, 'random': GlobalRandomState()}
+    first_timestep, previous_seconds, update_seconds = 0, 0.0, 0.0
+    if FLAGS.resume:
+        scalars = training_state.load(components)
+        if scalars is None:
+            print("No training state in {}, starting from scratch".format(FLAGS.save_dir))
+        else:
+            first_timestep, update_seconds = scalars['timestep'], scalars['update_seconds']
+            previous_seconds = scalars.get('seconds', 0.0)
+            if scalars.get('episode_length'):
+                # the environment cannot continue the episode, so it ends where it was interrupted
+                run_log.episode(scalars['episode_reward'], scalars['episode_length'])
+                print("Logged the interrupted episode: reward {:.2f} in {} timesteps".format(
+                    scalars['episode_reward'], scalars['episode_length']))
+    if FLAGS.init_from and not first_timestep:
+        learner.load_weights(FLAGS.init_from)
+    stop = []
+    signal(SIGTERM, lambda signum, frame: stop.append(signum))
+    env, screen_action = screen_env()
+    exploration_steps = int(FLAGS.exploration_fraction * FLAGS.timesteps)
+    start_time = default_timer()
+
+    def run_scalars(timestep_count):
+        return {'timestep': timestep_count,
+                'seconds': previous_seconds + default_timer() - start_time,
+                'update_seconds': update_seconds,
+                'episode_reward': episode_reward,
+                'episode_length': episode_length}
+
+    timestep = env.reset()[0]
+    stack = replay.reset(screen(timestep))
+    episode_reward, episode_length = 0.0, 0
+    t = first_timestep - 1
+    for t in range(first_timestep, FLAGS.timesteps):
+        x, y = learner.act(stack, linear_schedule(t, exploration_steps, 1.0, FLAGS.final_eps))
+        step_time = default_timer()
+        action, targeted = screen_action(timestep.observation, x, y)
+        timestep = env.step([action])[0]
+        training_metrics.step_seconds.observe(default_timer() - step_time)
+        episode_reward += timestep.reward
+        episode_length += 1
+        if targeted:
+            stack = replay.step((x, y), timestep.reward, screen(timestep), timestep.last())
+        else:
+            stack = replay.reset(screen(timestep))
+        if timestep.last():
+            run_log.episode(episode_reward, episode_length)
+            training_metrics.episode(episode_reward, episode_length)
+            episode_reward, episode_length = 0.0, 0
+            if FLAGS.num_episodes and len(run_log.episode_rewards) >= FLAGS.num_episodes:
+                break
+            timestep = env.reset()[0]
+            stack = replay.reset(screen(timestep))
+        if t >= FLAGS.learning_starts and t % FLAGS.train_freq == 0:
+            update_time = default_timer()
+            if FLAGS.prioritized_replay:
+                beta = linear_schedule(t, FLAGS.timesteps, FLAGS.prioritized_replay_beta0, 1.0)
+                states, actions, rewards, next_states, dones, weights, positions = replay.sample(FLAGS.batch_size, beta)
+                errors = learner.update(states, actions, rewards, next_states, dones, weights)
+                replay.update_priorities(positions, errors + FLAGS.prioritized_replay_eps)
+            else:
+                learner.update(*replay.sample(FLAGS.batch_size))
+            update_seconds += default_timer() - update_time
+        if t >= FLAGS.learning_starts and t % FLAGS.target_network_update_freq == 0:
+            learner.update_targets()
+        if FLAGS.checkpoint_freq and t > 0 and t % FLAGS.checkpoint_freq == 0:
+            with training_metrics.checkpoint_seconds.time():
+                learner.save(FLAGS.save_dir)
+        if FLAGS.state_freq and t > first_timestep and t % FLAGS.state_freq == 0:
+            with training_metrics.checkpoint_seconds.time():
+                training_state.save(components, run_scalars(t + 1))
+        if stop:
+            break
+    session_seconds = default_timer() - start_time
+    seconds = previous_seconds + session_seconds
+    with training_metrics.checkpoint_seconds.time():
+        learner.save(FLAGS.save_dir)
+        training_state.save(components, run_scalars(t + 1))
+    run_log.save()
+    if FLAGS.save_replay and FLAGS.env == 'sc2':
+        env.save_replay(path.abspath(FLAGS.save_dir))
+    env.close()
+    report = {'episodes': len(run_log.episode_rewards),
+              'first_timestep': first_timestep,
+              'mean_reward_100': run_log.rolling_reward(),
+              'seconds': seconds,
+              'session_seconds': session_seconds,
+              'timesteps': t + 1,
+              'update_seconds': update_seconds,
+              'updates': learner.updates,
+              'updates_per_second': learner.updates / update_seconds if update_seconds else 0.0}
+    with open(path.join(FLAGS.save_dir, 'dqn_report.json'), 'w') as file:
+        json_dump(report, file, indent=2, sort_keys=True)
+    print("{} updates in {:.1f}s of {:.1f}s: {:.1f} updates/s, mean reward {:.2f}".format(
+        report['updates'], update_seconds, seconds, report['updates_per_second'], report['mean_reward_100']))
+
+if __name__ == '__main__':
+    app.run(train_agent)
@@ -0,0 +1,77 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Base class for wrappers around pysc2 agents.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from importlib import import_module
+
+
+def agent_class(name):
+    """
+    Resolve a dotted name such as
+    'sc2_agents.agents.move_to_beacon.MoveToBeaconAgent001'
+    to the agent class it refers to.
+    """
+    module_name, class_name = name.rsplit('.', 1)
+    return getattr(import_module(module_name), class_name)
+
+
+class AgentWrapper(object):
+    """
+    Wraps a pysc2 agent so that a run loop can use the wrapper in its place.
+
+    `setup`, `reset` and `step` are forwarded to the wrapped agent and any
+    other attribute (`results`, `steps`, `reward`, ...) is looked up on it.
+    The BaseAgent counters are also written through, so that a wrapper
+    adjusting `self.agent.reward` updates the agent itself even when it
+    wraps another wrapper.
+    """
+
+    COUNTERS = ('episodes', 'reward', 'steps')
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    def __getattr__(self, name):
+        if name == 'agent':
+            raise AttributeError(name)
+        return getattr(self.agent, name)
+
+    def __setattr__(self, name, value):
+        if name in self.COUNTERS and 'agent' in self.__dict__:
+            setattr(self.agent, name, value)
+        else:
+            super(AgentWrapper, self).__setattr__(name, value)
+
+    def setup(self, obs_spec, action_spec):
+        self.agent.setup(obs_spec, action_spec)
+
+    def reset(self):
+        self.agent.reset()
+
+    def step(self, timestep):
+        return self.agent.step(timestep)
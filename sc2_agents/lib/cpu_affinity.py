@@ -0,0 +1,114 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+CPU pinning and thread-count limits for co-located training processes.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from logging import getLogger
+from multiprocessing import cpu_count
+from os import environ
+try:
+    from os import sched_getaffinity
+    from os import sched_setaffinity
+except ImportError:    # not available on macOS or Windows
+    sched_getaffinity = sched_setaffinity = None
+
+LOGGER = getLogger(__name__)
+
+NUM_THREADS_VARIABLE = 'SC2_AGENTS_NUM_THREADS'
+THREAD_VARIABLES = ['MKL_NUM_THREADS',
+                    'NUMEXPR_NUM_THREADS',
+                    'OMP_NUM_THREADS',
+                    'OPENBLAS_NUM_THREADS',
+                    'RCALL_NUM_CPU',    # read by baselines' make_session
+                    'VECLIB_MAXIMUM_THREADS',
+                    NUM_THREADS_VARIABLE]
+
+
+def available_cpus():
+    if sched_getaffinity is None:
+        return list(range(cpu_count()))
+    return sorted(sched_getaffinity(0))
+
+
+def configured_threads():
+    """
+    The thread count a launcher assigned to this process, or None.
+    """
+    value = environ.get(NUM_THREADS_VARIABLE)
+    return int(value) if value else None
+
+
+def pin_process(cpus, pid=0):
+    if sched_setaffinity is None:
+        LOGGER.warning("CPU pinning is not supported on this platform")
+        return
+    sched_setaffinity(pid, cpus)
+
+
+def session_config(num_threads):
+    """
+    A TensorFlow ConfigProto whose op pools fit in `num_threads` cores
+    together: the inter-op threads are taken out of the intra-op ones.
+    """
+    import tensorflow as tf
+    inter_op_threads = 1 if num_threads < 4 else 2
+    return tf.ConfigProto(allow_soft_placement=True,
+                          inter_op_parallelism_threads=inter_op_threads,
+                          intra_op_parallelism_threads=max(num_threads - inter_op_threads, 1))
+
+
+def thread_environment(num_threads, base=None):
+    """
+    A copy of the environment with TensorFlow, BLAS and OpenMP
+    limited to `num_threads` threads.
+    """
+    env = dict(environ if base is None else base)
+    for variable in THREAD_VARIABLES:
+        env[variable] = str(num_threads)
+    return env
+
+
+class CoreScheduler(object):
+    """
+    Hands out disjoint sets of CPUs so that processes sharing a host do
+    not oversubscribe it. Sets are allocated first-fit from the lowest
+    free CPU, which keeps each set on neighbouring cores.
+    """
+
+    def __init__(self, cpus=None):
+        self.cpus = list(cpus) if cpus is not None else available_cpus()
+        self.free = list(self.cpus)
+
+    def allocate(self, num_cpus):
+        if num_cpus > len(self.free):
+            raise RuntimeError("Cannot allocate {} CPUs, {} of {} are free".format(
+                num_cpus, len(self.free), len(self.cpus)))
+        cpus, self.free = self.free[:num_cpus], self.free[num_cpus:]
+        return cpus
+
+    def release(self, cpus):
+        self.free = sorted(set(self.free) | set(cpus))
@@ -0,0 +1,162 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Reuse of an agent's decision while the observation it was based on is unchanged.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from numpy import ascontiguousarray as np_ascontiguousarray
+from sc2_agents.lib.agent_wrapper import AgentWrapper
+from time import process_time
+from zlib import crc32
+
+
+def bounding_region(ys, xs, margin=0):
+    """
+    The (y0, y1, x0, x1) box around a set of screen coordinates.
+    """
+    return (max(int(ys.min()) - margin, 0), int(ys.max()) + margin + 1,
+            max(int(xs.min()) - margin, 0), int(xs.max()) + margin + 1)
+
+
+def layer_digest(layer, region=None):
+    """
+    A cheap checksum of a feature layer, or of the (y0, y1, x0, x1)
+    region of it, used to tell whether it changed between steps.
+    """
+    if region is not None:
+        y0, y1, x0, x1 = region
+        layer = layer[y0:y1, x0:x1]
+    return crc32(np_ascontiguousarray(layer).data)
+
+
+class HeldDecision(object):
+    """
+    An action an agent declares valid for `steps` more steps (None for no
+    limit) or until one of the watched feature-screen layers changes.
+    `watch` lists (layer_name, region) pairs, where a region of None
+    watches the whole layer. The decision is also dropped as soon as its
+    function is no longer available.
+    """
+
+    def __init__(self, action, timestep, steps=None, watch=()):
+        feature_screen = timestep.observation.feature_screen
+        self.action = action
+        self.remaining = steps
+        self.watch = [(layer, region, layer_digest(getattr(feature_screen, layer), region))
+                      for layer, region in watch]
+
+    def valid(self, timestep):
+        if self.remaining is not None and self.remaining <= 0:
+            return False
+        if self.action.function not in timestep.observation.available_actions:
+            return False
+        feature_screen = timestep.observation.feature_screen
+        for layer, region, digest in self.watch:
+            if layer_digest(getattr(feature_screen, layer), region) != digest:
+                return False
+        return True
+
+    def consume(self):
+        if self.remaining is not None:
+            self.remaining -= 1
+
+
+class DecisionSkippingAgent(AgentWrapper):
+    """
+    Skips the wrapped agent's `step` while the decision it last held is
+    still valid and repeats the held action instead.
+
+    Agents opt in by setting `self.held_decision` to a HeldDecision before
+    returning an action; agents that never set it are stepped as usual.
+    Every step is counted in the agent's step and reward counters once,
+    whether it was skipped or computed by an agent that does not count
+    its own steps. The CPU time spent on computed and skipped steps is
+    accumulated separately so the report can estimate the saving.
+    """
+
+    def __init__(self, agent):
+        super(DecisionSkippingAgent, self).__init__(agent)
+        self.decider = agent
+        while isinstance(self.decider, AgentWrapper):
+            self.decider = self.decider.agent
+        self.decider.held_decision = None
+        self.computed_cpu_seconds = 0.0
+        self.computed_steps = 0
+        self.cpu_seconds = 0.0
+        self.episode_cpu_seconds = []
+        self.skipped_cpu_seconds = 0.0
+        self.skipped_steps = 0
+
+    def reset(self):
+        if self.computed_steps or self.skipped_steps:
+            self.episode_cpu_seconds.append(self.cpu_seconds)
+        self.cpu_seconds = 0.0
+        self.decider.held_decision = None
+        super(DecisionSkippingAgent, self).reset()
+
+    def step(self, timestep):
+        start_time = process_time()
+        steps = self.agent.steps
+        decision = self.decider.held_decision
+        if decision is not None and not timestep.first() and decision.valid(timestep):
+            decision.consume()
+            action = decision.action
+            skipped = True
+        else:
+            self.decider.held_decision = None
+            action = self.agent.step(timestep)
+            skipped = False
+        if self.agent.steps == steps:
+            self.agent.steps += 1
+            self.agent.reward += timestep.reward
+        seconds = process_time() - start_time
+        self.cpu_seconds += seconds
+        if skipped:
+            self.skipped_steps += 1
+            self.skipped_cpu_seconds += seconds
+        else:
+            self.computed_steps += 1
+            self.computed_cpu_seconds += seconds
+        return action
+
+    def report(self):
+        """
+        Step counts, CPU time per episode and the CPU reduction against
+        computing every step at the mean cost of a computed step.
+        """
+        steps = self.computed_steps + self.skipped_steps
+        computed_cost = self.computed_cpu_seconds / self.computed_steps if self.computed_steps else 0.0
+        unskipped_seconds = computed_cost * steps
+        return {'computed_steps': self.computed_steps,
+                'cpu_reduction': (1.0 - (self.computed_cpu_seconds + self.skipped_cpu_seconds) / unskipped_seconds
+                                  if unskipped_seconds else 0.0),
+                'cpu_seconds_per_computed_step': computed_cost,
+                'cpu_seconds_per_episode': (sum(self.episode_cpu_seconds) / len(self.episode_cpu_seconds)
+                                            if self.episode_cpu_seconds else self.cpu_seconds),
+                'cpu_seconds_per_skipped_step': (self.skipped_cpu_seconds / self.skipped_steps
+                                                 if self.skipped_steps else 0.0),
+                'skip_rate': self.skipped_steps / steps if steps else 0.0,
+                'skipped_steps': self.skipped_steps}
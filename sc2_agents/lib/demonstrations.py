@@ -0,0 +1,206 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Recording of scripted-agent demonstrations into sharded datasets,
+and streaming of shuffled minibatches back out of them.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from concurrent.futures import ThreadPoolExecutor
+from json import dump as json_dump
+from json import load as json_load
+from logging import getLogger
+from numpy import array as np_array
+from numpy import concatenate as np_concatenate
+from numpy import int16 as np_int16    # pylint: disable=E0611
+from numpy import int32 as np_int32    # pylint: disable=E0611
+from numpy import load as np_load
+from numpy import savez_compressed as np_savez_compressed
+from numpy import stack as np_stack
+from numpy import uint16 as np_uint16    # pylint: disable=E0611
+from numpy.random import RandomState
+from os import makedirs
+from os import path
+from sc2_agents.lib.agent_wrapper import AgentWrapper
+from sc2_agents.lib.frame_store import FrameStore
+
+LOGGER = getLogger(__name__)
+MANIFEST = 'manifest.json'
+
+
+def spatial_target(action):
+    """
+    Return the [x, y] screen argument of a FunctionCall, or None.
+    """
+    for argument in reversed(action.arguments):
+        if len(argument) == 2:
+            return [int(argument[0]), int(argument[1])]
+    return None
+
+
+class DemonstrationRecorder(AgentWrapper):
+    """
+    Records the (observation, action) pairs of the wrapped agent.
+
+    Every step the chosen feature-screen layers and the action's function
+    id and screen coordinates are buffered, and every `shard_size` samples
+    the buffer is written to `directory` as a compressed shard. A manifest
+    listing the shards is kept up to date so a loader can stream them.
+
+    Buffered screens are held in a FrameStore, so the repeated and nearly
+    identical frames of a scripted agent's episodes take little memory
+    until they are written out.
+    """
+
+    def __init__(self, agent, directory, shard_size=10000, layers=('player_relative',), map_name=None):
+        super(DemonstrationRecorder, self).__init__(agent)
+        self.buffered_frames = 0
+        self.buffered_stored_bytes = 0
+        self.directory = directory
+        self.episode = -1
+        self.frame_store = FrameStore()
+        self.layers = list(layers)
+        self.map_name = map_name
+        self.samples = 0
+        self.shard_size = shard_size
+        self.shards = []
+        self._clear()
+        if not path.isdir(directory):
+            makedirs(directory)
+
+    def _clear(self):
+        self.buffer = {'screens': [], 'function_ids': [], 'x': [], 'y': [], 'episodes': []}
+
+    def reset(self):
+        super(DemonstrationRecorder, self).reset()
+        self.episode += 1
+
+    def step(self, timestep):
+        action = super(DemonstrationRecorder, self).step(timestep)
+        feature_screen = timestep.observation.feature_screen
+        target = spatial_target(action) or [-1, -1]
+        screen = np_stack([getattr(feature_screen, layer) for layer in self.layers]).astype(np_uint16)
+        self.buffer['screens'].append(self.frame_store.put(screen))
+        self.buffer['function_ids'].append(int(action.function))
+        self.buffer['x'].append(target[0])
+        self.buffer['y'].append(target[1])
+        self.buffer['episodes'].append(self.episode)
+        if len(self.buffer['function_ids']) >= self.shard_size:
+            self.flush()
+        return action
+
+    def flush(self):
+        if not self.buffer['function_ids']:
+            return
+        name = 'shard_{:05d}.npz'.format(len(self.shards))
+        # what the buffer held at its fullest, for the memory report
+        self.buffered_frames += len(set(self.buffer['screens']))
+        self.buffered_stored_bytes += self.frame_store.stored_bytes()
+        self.samples += len(self.buffer['screens'])
+        screens = self.frame_store.get_batch(self.buffer['screens'])
+        for frame_id in self.buffer['screens']:
+            self.frame_store.release(frame_id)
+        np_savez_compressed(path.join(self.directory, name),
+                            screens=screens,
+                            function_ids=np_array(self.buffer['function_ids'], dtype=np_int32),
+                            x=np_array(self.buffer['x'], dtype=np_int16),
+                            y=np_array(self.buffer['y'], dtype=np_int16),
+                            episodes=np_array(self.buffer['episodes'], dtype=np_int32))
+        self.shards.append({'name': name, 'samples': len(self.buffer['function_ids'])})
+        with open(path.join(self.directory, MANIFEST), 'w') as file:
+            json_dump({'agent_id': self.agent.__class__.__name__,
+                       'layers': self.layers,
+                       'shards': self.shards}, file, indent=4)
+        LOGGER.info("Wrote {} samples to {}".format(self.shards[-1]['samples'], name))
+        self._clear()
+
+    def close(self):
+        self.flush()
+
+    def report(self):
+        """
+        Memory the buffered screens took in the FrameStore against holding
+        every screen, summed over the shards written, in the form
+        frame_store.memory_report expects.
+        """
+        return {'map_name': self.map_name or self.agent.__class__.__name__,
+                'transitions': self.samples,
+                'unique_frames': self.buffered_frames,
+                'raw_bytes': self.frame_store.raw_bytes,
+                'stored_bytes': self.buffered_stored_bytes,
+                'saved_bytes': self.frame_store.raw_bytes - self.buffered_stored_bytes}
+
+
+class DemonstrationLoader(object):
+    """
+    Streams shuffled minibatches from a recorded dataset.
+
+    Only `shards_in_memory` shards are held at once: each epoch visits the
+    shards in random order, shuffles the samples of each group of shards
+    together and yields them as minibatches while the next group is read
+    in the background. With `spatial_only` samples whose action has no
+    screen coordinates (select_army, no_op, ...) are skipped.
+    """
+
+    def __init__(self, directory, batch_size=32, shards_in_memory=4, spatial_only=True, seed=None):
+        with open(path.join(directory, MANIFEST)) as file:
+            self.manifest = json_load(file)
+        self.batch_size = batch_size
+        self.directory = directory
+        self.random = RandomState(seed)
+        self.shards_in_memory = shards_in_memory
+        self.spatial_only = spatial_only
+
+    def __len__(self):
+        return sum(shard['samples'] for shard in self.manifest['shards'])
+
+    def layer_index(self, layer):
+        return self.manifest['layers'].index(layer)
+
+    def _load_group(self, names):
+        group = []
+        for name in names:
+            with np_load(path.join(self.directory, name)) as shard:
+                group.append({key: shard[key] for key in shard.files})
+        samples = {key: np_concatenate([shard[key] for shard in group]) for key in group[0]}
+        if self.spatial_only:
+            keep = samples['x'] >= 0
+            samples = {key: value[keep] for key, value in samples.items()}
+        return samples
+
+    def __iter__(self):
+        names = [shard['name'] for shard in self.manifest['shards']]
+        order = [names[i] for i in self.random.permutation(len(names))]
+        groups = [order[i:i + self.shards_in_memory] for i in range(0, len(order), self.shards_in_memory)]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(self._load_group, groups[0]) if groups else None
+            for index in range(len(groups)):
+                samples = pending.result()
+                if index + 1 < len(groups):
+                    pending = executor.submit(self._load_group, groups[index + 1])
+                permutation = self.random.permutation(len(samples['x']))
+                for start in range(0, len(permutation), self.batch_size):
+                    batch = permutation[start:start + self.batch_size]
+                    yield {key: value[batch] for key, value in samples.items()}
@@ -0,0 +1,539 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+A NumPy DQN learner for the act_x/act_y coordinate heads, with the
+double, dueling and prioritized replay variants of baselines' deepq.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from numpy import abs as np_abs
+from numpy import arange as np_arange
+from numpy import asarray as np_asarray
+from numpy import clip as np_clip
+from numpy import copyto as np_copyto
+from numpy import divide as np_divide
+from numpy import empty as np_empty
+from numpy import empty_like as np_empty_like
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import float64 as np_float64    # pylint: disable=E0611
+from numpy import int64 as np_int64    # pylint: disable=E0611
+from numpy import moveaxis as np_moveaxis
+from numpy import multiply as np_multiply
+from numpy import ones as np_ones
+from numpy import sqrt as np_sqrt
+from numpy import uint8 as np_uint8    # pylint: disable=E0611
+from numpy import zeros as np_zeros
+from numpy import zeros_like as np_zeros_like
+from numpy.random import RandomState
+from os import makedirs
+from os import path
+from os import replace
+from sc2_agents.lib.frame_stack import FrameStackReplay
+from sc2_agents.lib.numpy_policy import _padding
+from sc2_agents.lib.numpy_policy import ACTIVATIONS
+from sc2_agents.lib.numpy_policy import DEFAULT_ACTIVATIONS
+from sc2_agents.lib.numpy_policy import image_patches
+from sc2_agents.lib.numpy_policy import NumpyPolicy
+from sc2_agents.lib.numpy_policy import parameter_count
+from sc2_agents.lib.numpy_policy import parameter_shapes
+from sc2_agents.lib.training_state import random_state
+from sc2_agents.lib.training_state import set_random_state
+
+HEADS = ('x', 'y')
+
+
+def network_spec(num_actions, convs=((16, 8, 4), (32, 4, 2)), hiddens=(256,), dueling=False):
+    """
+    The layer spec of baselines' cnn_to_mlp q-function: `convs` holds
+    (outputs, kernel size, stride) triples and `hiddens` the sizes of the
+    dense layers, which a dueling network repeats in its value stream.
+    """
+    spec = [{'type': 'conv2d', 'size': outputs, 'window': window, 'stride': stride}
+            for outputs, window, stride in convs]
+    spec.append({'type': 'flatten'})
+    advantage = [{'type': 'dense', 'size': size} for size in hiddens]
+    advantage.append({'type': 'dense', 'size': num_actions, 'activation': 'linear'})
+    if not dueling:
+        return spec + advantage
+    value = [{'type': 'dense', 'size': size} for size in hiddens]
+    value.append({'type': 'dense', 'size': 1, 'activation': 'linear'})
+    spec.append({'type': 'dueling', 'advantage': advantage, 'value': value})
+    return spec
+
+
+def glorot_weights(spec, input_shape, random):
+    weights = []
+    for kernel_shape, bias_shape in parameter_shapes(spec, input_shape):
+        receptive = int(np_asarray(kernel_shape[:-2]).prod()) if len(kernel_shape) > 2 else 1
+        limit = np_sqrt(6.0 / (receptive * (kernel_shape[-2] + kernel_shape[-1])))
+        weights.append((random.uniform(-limit, limit, size=kernel_shape).astype(np_float32),
+                        np_zeros(bias_shape, dtype=np_float32)))
+    return weights
+
+
+def image_patches_transpose(patches, input_shape, window, stride=1, padding='SAME'):
+    """
+    The gradient of image_patches: sums each patch gradient back into the
+    input pixels it was read from.
+    """
+    batch, height, width, channels = input_shape
+    pad_h = _padding(height, window, stride, padding)
+    pad_w = _padding(width, window, stride, padding)
+    out_h, out_w = patches.shape[1:3]
+    patches = patches.reshape(batch, out_h, out_w, window, window, channels)
+    padded = np_zeros((batch, height + sum(pad_h), width + sum(pad_w), channels), dtype=patches.dtype)
+    for row in range(window):
+        for column in range(window):
+            padded[:, row:row + stride * (out_h - 1) + 1:stride,
+                   column:column + stride * (out_w - 1) + 1:stride] += patches[:, :, :, row, column]
+    return padded[:, pad_h[0]:pad_h[0] + height, pad_w[0]:pad_w[0] + width]
+
+
+class QNetwork(NumpyPolicy):
+    """
+    A NumpyPolicy that can be trained: `forward` keeps what `backward`
+    needs to return the gradient of every kernel and bias.
+
+    The kernels and biases are views of one flat `parameters` array, and
+    gradients come back in the same layout, so the optimizer, gradient
+    clipping and target updates each work on a single vector.
+    Saved networks load as plain NumpyPolicies.
+    """
+
+    def __init__(self, spec, weights=None, input_shape=None, seed=None):
+        if weights is None:
+            weights = glorot_weights(spec, input_shape, RandomState(seed))
+        super(QNetwork, self).__init__(spec, weights, input_shape)
+        self.parameters = np_empty(sum(kernel.size + bias.size for kernel, bias in self.weights), dtype=np_float32)
+        views = self._views(self.parameters)
+        for (kernel, bias), (kernel_view, bias_view) in zip(self.weights, views):
+            kernel_view[...] = kernel
+            bias_view[...] = bias
+        self.weights = views
+
+    def _views(self, flat):
+        views, offset = [], 0
+        for kernel, bias in self.weights:
+            views.append((flat[offset:offset + kernel.size].reshape(kernel.shape),
+                          flat[offset + kernel.size:offset + kernel.size + bias.size]))
+            offset += kernel.size + bias.size
+        return views
+
+    def copy(self):
+        return QNetwork(self.spec, self.weights, self.input_shape)
+
+    def assign(self, other):
+        np_copyto(self.parameters, other.parameters)
+
+    def _trace(self, layers, outputs, indices, tape, first):
+        for layer in layers:
+            kind = layer['type']
+            if kind == 'flatten':
+                tape.append(('flatten', outputs.shape))
+                outputs = outputs.reshape(len(outputs), -1)
+            elif kind in ('conv2d', 'dense'):
+                index = next(indices)
+                kernel, bias = self.weights[index]
+                input_shape = outputs.shape
+                activation = layer.get('activation', DEFAULT_ACTIVATIONS[kind])
+                if kind == 'conv2d':
+                    if outputs.ndim == 3:
+                        outputs = outputs[..., None]
+                    stride, padding = layer.get('stride', 1), layer.get('padding', 'SAME')
+                    inputs = image_patches(outputs, kernel.shape[0], stride, padding)
+                    outputs = inputs.reshape(-1, inputs.shape[-1]).dot(kernel.reshape(-1, kernel.shape[-1])) + bias
+                    outputs = outputs.reshape(inputs.shape[:3] + (kernel.shape[-1],))
+                    tape.append((kind, index, inputs, input_shape,
+                                 ACTIVATIONS[activation](outputs), activation, first, stride, padding))
+                else:
+                    inputs = outputs.reshape(len(outputs), -1)
+                    tape.append((kind, index, inputs, input_shape,
+                                 ACTIVATIONS[activation](inputs.dot(kernel) + bias), activation, first, None, None))
+                outputs = tape[-1][4]
+                first = False
+            elif kind == 'dueling':
+                advantage_tape, value_tape = [], []
+                advantages = self._trace(layer['advantage'], outputs, indices, advantage_tape, first)
+                values = self._trace(layer['value'], outputs, indices, value_tape, first)
+                tape.append(('dueling', advantage_tape, value_tape))
+                outputs = values + advantages - advantages.mean(axis=1, keepdims=True)
+            else:
+                raise ValueError("Unsupported layer type {}".format(kind))
+        return outputs
+
+    def forward(self, observations):
+        """
+        The q-values of a batch of observations and the tape to pass to
+        `backward`.
+        """
+        tape = []
+        outputs = self._trace(self.spec, np_asarray(observations, dtype=np_float32),
+                              iter(range(parameter_count(self.spec))), tape, True)
+        return outputs, tape
+
+    def backward(self, tape, output_gradients):
+        """
+        The gradient of every parameter, laid out like `parameters`, given
+        the gradient of the loss with respect to the q-values.
+        """
+        gradients = np_empty_like(self.parameters)
+        self._backward(tape, output_gradients, self._views(gradients))
+        return gradients
+
+    def _backward(self, tape, gradient, gradients):
+        for entry in reversed(tape):
+            kind = entry[0]
+            if kind == 'flatten':
+                gradient = gradient.reshape(entry[1])
+            elif kind == 'dueling':
+                advantage = self._backward(entry[1], gradient - gradient.mean(axis=1, keepdims=True), gradients)
+                value = self._backward(entry[2], gradient.sum(axis=1, keepdims=True), gradients)
+                gradient = None if advantage is None else advantage + value
+            else:
+                _, index, inputs, input_shape, outputs, activation, first, stride, padding = entry
+                if activation == 'relu':
+                    gradient = gradient * (outputs > 0)
+                elif activation == 'tanh':
+                    gradient = gradient * (1 - outputs * outputs)
+                kernel, _ = self.weights[index]
+                if kind == 'conv2d':
+                    flat = gradient.reshape(-1, gradient.shape[-1])
+                    gradients[index][0][...] = inputs.reshape(len(flat), -1).T.dot(flat).reshape(kernel.shape)
+                    gradients[index][1][...] = flat.sum(axis=0)
+                    if first:
+                        return None
+                    patches = flat.dot(kernel.reshape(-1, kernel.shape[-1]).T).reshape(gradient.shape[:3] + (-1,))
+                    shape = (len(gradient),) + tuple(input_shape[1:3]) + (kernel.shape[2],)
+                    gradient = image_patches_transpose(patches, shape, kernel.shape[0], stride, padding)
+                else:
+                    gradients[index][0][...] = inputs.T.dot(gradient)
+                    gradients[index][1][...] = gradient.sum(axis=0)
+                    if first:
+                        return None
+                    gradient = gradient.dot(kernel.T)
+                gradient = gradient.reshape(input_shape)
+        return gradient
+
+
+class Adam(object):
+    """
+    Adam updates applied in place to a flat parameter array.
+    """
+
+    def __init__(self, parameters, lr=5e-4, beta1=0.9, beta2=0.999, epsilon=1e-8):
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.lr = lr
+        self.parameters = parameters
+        self.mean = np_zeros_like(parameters)
+        self.variance = np_zeros_like(parameters)
+        self.scratch = np_empty_like(parameters)
+        self.steps = 0
+
+    def step(self, gradients):
+        self.steps += 1
+        lr = self.lr * np_sqrt(1 - self.beta2 ** self.steps) / (1 - self.beta1 ** self.steps)
+        scratch = self.scratch
+        self.mean *= self.beta1
+        np_multiply(gradients, 1 - self.beta1, out=scratch)
+        self.mean += scratch
+        self.variance *= self.beta2
+        np_multiply(gradients, gradients, out=scratch)
+        scratch *= 1 - self.beta2
+        self.variance += scratch
+        np_sqrt(self.variance, out=scratch)
+        scratch += self.epsilon
+        np_divide(self.mean, scratch, out=scratch)
+        scratch *= lr
+        self.parameters -= scratch
+
+
+def clip_by_global_norm(gradients, clip_norm):
+    """
+    Scale a flat gradient in place so that its norm is at most
+    `clip_norm`, and return the norm before clipping.
+    """
+    norm = float(np_sqrt(gradients.dot(gradients)))
+    if clip_norm is not None and norm > clip_norm:
+        gradients *= clip_norm / norm
+    return norm
+
+
+class SumTree(object):
+    """
+    Priorities in a binary tree of partial sums, updated and sampled a
+    whole batch at a time: each tree level is one vectorized step.
+    """
+
+    def __init__(self, capacity):
+        self.depth = max(int(capacity - 1).bit_length(), 1)
+        self.size = 1 << self.depth
+        self.tree = np_zeros(2 * self.size, dtype=np_float64)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def __getitem__(self, positions):
+        return self.tree[self.size + np_asarray(positions)]
+
+    def update(self, positions, priorities):
+        nodes = np_asarray(positions, dtype=np_int64) + self.size
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes //= 2
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """
+        The positions whose cumulative priority interval holds each value.
+        """
+        values = np_asarray(values, dtype=np_float64).copy()
+        nodes = np_ones(len(values), dtype=np_int64)
+        for _ in range(self.depth):
+            left = self.tree[2 * nodes]
+            # rounding can leave a value past the left sum of a node whose right side is empty
+            right = (values > left) & (self.tree[2 * nodes + 1] > 0)
+            values -= left * right
+            nodes = 2 * nodes + right
+        return nodes - self.size
+
+
+class PrioritizedFrameStackReplay(FrameStackReplay):
+    """
+    A FrameStackReplay sampled in proportion to priority ** alpha, with
+    importance weights for an exponent `beta`. New transitions get the
+    largest priority seen so far; transitions whose frames are
+    overwritten drop out of the tree.
+    """
+
+    def __init__(self, capacity, frame_shape, k=4, dtype=np_uint8, action_shape=(), alpha=0.6, seed=None):
+        self.tree = SumTree(capacity)
+        self.alpha = alpha
+        self.max_priority = 1.0
+        super(PrioritizedFrameStackReplay, self).__init__(capacity, frame_shape, k, dtype, action_shape, seed)
+
+    def _invalidate(self, positions):
+        super(PrioritizedFrameStackReplay, self)._invalidate(positions)
+        self.tree.update(positions, 0.0)
+
+    def _validate(self, position):
+        super(PrioritizedFrameStackReplay, self)._validate(position)
+        self.tree.update([position], self.max_priority ** self.alpha)
+
+    def sample_positions(self, batch_size, beta=0.4):
+        """
+        Stratified positions and their importance weights, normalized so
+        that the largest weight in the batch is 1.
+        """
+        if not self.tree.total > 0:
+            raise ValueError("The replay buffer holds no transitions")
+        values = (np_arange(batch_size) + self.random.uniform(size=batch_size)) * (self.tree.total / batch_size)
+        positions = self.tree.find(values)
+        weights = (len(self) * self.tree[positions] / self.tree.total) ** -beta
+        return positions, (weights / weights.max()).astype(np_float32)
+
+    def sample(self, batch_size, beta=0.4):
+        """
+        (states, actions, rewards, next_states, dones, weights, positions)
+        of a prioritized sample.
+        """
+        positions, weights = self.sample_positions(batch_size, beta)
+        return self.batch(positions) + (weights, positions)
+
+    def update_priorities(self, positions, priorities):
+        priorities = np_asarray(priorities, dtype=np_float64)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(positions, (priorities ** self.alpha) * self.valid[positions])
+
+    def get_state(self):
+        scalars, arrays = super(PrioritizedFrameStackReplay, self).get_state()
+        scalars['max_priority'] = self.max_priority
+        arrays['tree'] = self.tree.tree
+        return scalars, arrays
+
+    def set_state(self, scalars, arrays):
+        super(PrioritizedFrameStackReplay, self).set_state(scalars, arrays)
+        self.max_priority = scalars['max_priority']
+        self.tree.tree = arrays['tree']
+
+
+class CoordinateDQN(object):
+    """
+    Trains one q-network per screen coordinate, like the act_x and act_y
+    deepq models MoveToBeaconAgent002 plays with: both heads see the same
+    stacked screens and reward, and each learns its own coordinate.
+
+    `update` computes the TD targets of a whole batch at once, with the
+    online network choosing the next action and the target network
+    scoring it when `double` is set, and minimizes the Huber loss.
+    """
+
+    def __init__(self, screen_size, k=1, convs=((16, 8, 4), (32, 4, 2)), hiddens=(256,), dueling=False,
+                 double=True, lr=5e-4, gamma=0.99, grad_norm_clipping=10.0, seed=None):
+        self.double = double
+        self.gamma = gamma
+        self.grad_norm_clipping = grad_norm_clipping
+        self.random = RandomState(seed)
+        self.screen_size = screen_size
+        spec = network_spec(screen_size, convs, hiddens, dueling)
+        input_shape = (screen_size, screen_size, k)
+        self.networks = dict((head, QNetwork(spec, input_shape=input_shape, seed=self.random.randint(2 ** 31)))
+                             for head in HEADS)
+        self.targets = dict((head, network.copy()) for head, network in self.networks.items())
+        self.optimizers = dict((head, Adam(network.parameters, lr)) for head, network in self.networks.items())
+        self.updates = 0
+
+    @staticmethod
+    def observations(stacks):
+        """
+        Network inputs for a batch of (k, height, width) frame stacks.
+        """
+        return np_moveaxis(np_asarray(stacks), 1, -1).astype(np_float32)
+
+    def act(self, stack, epsilon=0.0):
+        """
+        The (x, y) target for one frame stack, random with probability
+        epsilon on each coordinate.
+        """
+        observations = self.observations(stack[None])
+        action = []
+        for head in HEADS:
+            if self.random.uniform() < epsilon:
+                action.append(self.random.randint(self.screen_size))
+            else:
+                action.append(int(self.networks[head](observations)[0]))
+        return action
+
+    def update(self, states, actions, rewards, next_states, dones, weights=None):
+        """
+        One gradient step of both heads on a batch of transitions. Returns
+        the absolute TD error of each transition, averaged over the heads.
+        """
+        states = self.observations(states)
+        next_states = self.observations(next_states)
+        rewards = np_asarray(rewards, dtype=np_float32)
+        not_done = 1 - np_asarray(dones, dtype=np_float32)
+        rows = np_arange(len(states))
+        errors = np_zeros(len(states), dtype=np_float32)
+        for column, head in enumerate(HEADS):
+            network, target = self.networks[head], self.targets[head]
+            next_values = target.q_values(next_states)
+            if self.double:
+                next_values = next_values[rows, network.q_values(next_states).argmax(axis=1)]
+            else:
+                next_values = next_values.max(axis=1)
+            q_values, tape = network.forward(states)
+            chosen = actions[:, column]
+            td_errors = q_values[rows, chosen] - (rewards + self.gamma * not_done * next_values)
+            # the gradient of the Huber loss is the TD error clipped to [-1, 1]
+            gradient = np_clip(td_errors, -1, 1)
+            if weights is not None:
+                gradient = gradient * weights
+            output_gradients = np_zeros_like(q_values)
+            output_gradients[rows, chosen] = gradient / len(states)
+            gradients = network.backward(tape, output_gradients)
+            clip_by_global_norm(gradients, self.grad_norm_clipping)
+            self.optimizers[head].step(gradients)
+            errors += np_abs(td_errors) / len(HEADS)
+        self.updates += 1
+        return errors
+
+    def load_weights(self, directory):
+        """
+        Start both heads and their targets from the act_x.npz/act_y.npz
+        policies of `directory`, such as pretrain_agent's behavior-cloned
+        act functions exported with export_policy. Their layers must have
+        the shapes of this learner's network.
+        """
+        for head in HEADS:
+            policy = NumpyPolicy.load(path.join(directory, 'act_{}.npz'.format(head)))
+            network = self.networks[head]
+            shapes = [(kernel.shape, bias.shape) for kernel, bias in policy.weights]
+            expected = [(kernel.shape, bias.shape) for kernel, bias in network.weights]
+            if shapes != expected:
+                raise ValueError("act_{}.npz has layers {} but the network needs {}".format(head, shapes, expected))
+            for (kernel, bias), (kernel_view, bias_view) in zip(policy.weights, network.weights):
+                kernel_view[...] = kernel
+                bias_view[...] = bias
+            self.targets[head].assign(network)
+
+    def update_targets(self):
+        for head in HEADS:
+            self.targets[head].assign(self.networks[head])
+
+    def get_state(self):
+        """
+        Both heads with their target networks and Adam moments, the update
+        count and the exploration RNG, as (scalars, arrays).
+        """
+        random_scalars, random_arrays = random_state(self.random)
+        scalars = {'updates': self.updates, 'random': random_scalars}
+        arrays = {'random_keys': random_arrays['keys']}
+        for head in HEADS:
+            optimizer = self.optimizers[head]
+            scalars['adam_steps_' + head] = optimizer.steps
+            arrays['parameters_' + head] = self.networks[head].parameters
+            arrays['target_' + head] = self.targets[head].parameters
+            arrays['adam_mean_' + head] = optimizer.mean
+            arrays['adam_variance_' + head] = optimizer.variance
+        return scalars, arrays
+
+    def set_state(self, scalars, arrays):
+        for head in HEADS:
+            if arrays['parameters_' + head].shape != self.networks[head].parameters.shape:
+                raise ValueError("Saved {} head has {} parameters, the network {}".format(
+                    head, arrays['parameters_' + head].size, self.networks[head].parameters.size))
+            # the weights and the optimizer work on views of these arrays, so copy into them
+            np_copyto(self.networks[head].parameters, arrays['parameters_' + head])
+            np_copyto(self.targets[head].parameters, arrays['target_' + head])
+            np_copyto(self.optimizers[head].mean, arrays['adam_mean_' + head])
+            np_copyto(self.optimizers[head].variance, arrays['adam_variance_' + head])
+            self.optimizers[head].steps = scalars['adam_steps_' + head]
+        self.updates = scalars['updates']
+        set_random_state(scalars['random'], {'keys': arrays['random_keys']}, self.random)
+
+    def save(self, directory):
+        """
+        Save the heads as act_x.npz and act_y.npz, loadable with
+        numpy_policy.load_policy. Each file is written aside and renamed
+        into place, so a process reloading the checkpoint never reads a
+        partial file.
+        """
+        if not path.isdir(directory):
+            makedirs(directory)
+        paths = []
+        for head in HEADS:
+            paths.append(path.join(directory, 'act_{}.npz'.format(head)))
+            with open(paths[-1] + '.tmp', 'wb') as file:
+                self.networks[head].save(file)
+            replace(paths[-1] + '.tmp', paths[-1])
+        return paths
+
+
+def linear_schedule(step, schedule_steps, initial=1.0, final=0.02):
+    fraction = min(float(step) / max(schedule_steps, 1), 1.0)
+    return initial + fraction * (final - initial)
@@ -0,0 +1,629 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+A pool of warm environment processes shared by training jobs.
+
+Each pooled environment lives in its own worker process and serves one
+job at a time over a local socket. When a job closes it, the worker
+resets the environment in the background and goes back to the pool, so
+the next job asking for the same gym id skips the game launch and map
+load, and its first reset returns at once.
+
+Workers and the server run whatever a connection asks of them, so every
+connection must know the pool's authkey. It is SC2_AGENTS_ENV_POOL_AUTHKEY
+when that is set and a random key for each pool otherwise, which an
+EnvPoolServer writes to a file only its user can read, for jobs of the
+same user to pick up by port.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from importlib import import_module
+from itertools import count
+from logging import getLogger
+from multiprocessing import AuthenticationError
+from multiprocessing import get_context
+from multiprocessing.connection import Client
+from multiprocessing.connection import Listener
+from os import chmod
+from os import close as os_close
+from os import environ
+from os import makedirs
+from os import O_CREAT
+from os import O_EXCL
+from os import O_WRONLY
+from os import open as os_open
+from os import path
+from os import remove
+from os import urandom
+from os import write as os_write
+from sc2_agents.lib.shared_memory_transport import SharedSlots
+from threading import Condition
+from threading import Event
+from threading import Thread
+from timeit import default_timer
+
+LOGGER = getLogger(__name__)
+
+AUTHKEY_VARIABLE = 'SC2_AGENTS_ENV_POOL_AUTHKEY'
+AUTHKEY_DIRECTORY = path.join(path.expanduser('~'), '.sc2_agents', 'env_pool')
+
+
+def pool_authkey():
+    """
+    The authkey for a new pool: SC2_AGENTS_ENV_POOL_AUTHKEY if set,
+    otherwise a random one.
+    """
+    if environ.get(AUTHKEY_VARIABLE):
+        return environ[AUTHKEY_VARIABLE].encode()
+    return urandom(32)
+
+
+def authkey_path(port):
+    return path.join(AUTHKEY_DIRECTORY, '{}.authkey'.format(port))
+
+
+def write_authkey(port, authkey):
+    """
+    Publish a pool server's authkey for the jobs of this user, readable by
+    this user only. Returns the file's path.
+    """
+    if not path.isdir(AUTHKEY_DIRECTORY):
+        makedirs(AUTHKEY_DIRECTORY)
+    chmod(AUTHKEY_DIRECTORY, 0o700)
+    key_path = authkey_path(port)
+    if path.exists(key_path):
+        # left behind by a server that did not stop cleanly
+        remove(key_path)
+    descriptor = os_open(key_path, O_WRONLY | O_CREAT | O_EXCL, 0o600)
+    try:
+        os_write(descriptor, authkey)
+    finally:
+        os_close(descriptor)
+    return key_path
+
+
+def read_authkey(port):
+    """
+    The authkey of the pool server on `port`: SC2_AGENTS_ENV_POOL_AUTHKEY
+    if set, otherwise the key the server wrote for its user.
+    """
+    if environ.get(AUTHKEY_VARIABLE):
+        return environ[AUTHKEY_VARIABLE].encode()
+    try:
+        with open(authkey_path(port), 'rb') as file:
+            return file.read()
+    except (IOError, OSError):
+        raise RuntimeError("No authkey for the environment pool on port {}: set {} or run the pool as "
+                           "this user".format(port, AUTHKEY_VARIABLE))
+
+
+def make_gym_env(gym_id):
+    from gym import make
+    from gym_sc2 import envs    # pylint: disable=W0611
+    return make(gym_id)
+
+
+def factory_function(name):
+    module_name, function_name = name.rsplit('.', 1)
+    return getattr(import_module(module_name), function_name)
+
+
+def parse_address(address):
+    """
+    ('host', port) from 'host:port' or ':port'.
+    """
+    host, port = address.rsplit(':', 1)
+    return host or '127.0.0.1', int(port)
+
+
+def _reply(connection, call, *args):
+    try:
+        connection.send((True, call(*args)))
+    except Exception as error:    # pylint: disable=W0703
+        LOGGER.exception("Environment request failed")
+        connection.send((False, repr(error)))
+
+
+class _SharedObservations(object):
+    """
+    The worker's side of a connection's observations: once the client
+    asks to `share`, each observation is written to a SharedSlots slot
+    and only (slot, generation) is sent. The client copies it out before
+    its next request, so one slot is enough.
+    """
+
+    def __init__(self):
+        self.slots = None
+
+    def share(self, space):
+        if self.slots is None:
+            if not hasattr(space, 'low'):
+                return None
+            self.slots = SharedSlots(1, space.shape, space.low.dtype)
+        return self.slots.name, self.slots.shape, self.slots.dtype.str
+
+    def encode(self, observation):
+        if self.slots is None:
+            return observation
+        return 0, self.slots.write(0, observation)
+
+    def encode_step(self, result):
+        observation, reward, done, info = result
+        return self.encode(observation), reward, done, info
+
+    def close(self):
+        if self.slots is not None:
+            self.slots.close()
+            self.slots = None
+
+
+def _env_worker(gym_id, factory, authkey, pipe):
+    """
+    Create one environment and serve it to one client at a time,
+    resetting it in the background between clients.
+    """
+    start_time = default_timer()
+    env = factory_function(factory)(gym_id)
+    prepared = env.reset()
+    listener = Listener(('127.0.0.1', 0), authkey=authkey)
+    pipe.send(('started', listener.address, default_timer() - start_time))
+    closing = Event()
+
+    def wait_for_close():
+        try:
+            pipe.recv()
+        except EOFError:
+            pass
+        closing.set()
+        # closing the listener does not wake a thread blocked in accept(), connecting to it does
+        try:
+            Client(listener.address, authkey=authkey).close()
+        except OSError:
+            pass
+    closer = Thread(target=wait_for_close, name='env-worker-close')
+    closer.daemon = True
+    closer.start()
+
+    while not closing.is_set():
+        try:
+            connection = listener.accept()
+        except AuthenticationError:
+            LOGGER.warning("Refused a connection to the %s worker without the pool's authkey", gym_id)
+            continue
+        except OSError:
+            break
+        if closing.is_set():
+            connection.close()
+            break
+        shared = _SharedObservations()
+        with connection:
+            while True:
+                try:
+                    request = connection.recv()
+                except EOFError:
+                    break
+                command = request[0]
+                if command == 'release':
+                    connection.send((True, None))
+                    break
+                elif command == 'reset':
+                    if prepared is not None and not request[1]:
+                        _reply(connection, shared.encode, prepared)
+                    else:
+                        _reply(connection, lambda kwargs: shared.encode(env.reset(**kwargs)), request[1])
+                    prepared = None
+                elif command == 'step':
+                    _reply(connection, lambda action: shared.encode_step(env.step(action)), request[1])
+                elif command == 'share':
+                    _reply(connection, shared.share, env.observation_space)
+                elif command == 'spaces':
+                    _reply(connection, lambda: (env.observation_space, env.action_space,
+                                                getattr(env, 'reward_range', None), getattr(env, 'metadata', {})))
+                elif command == 'getattr':
+                    _reply(connection, getattr, env, request[1])
+                elif command == 'call':
+                    _reply(connection, lambda name, args, kwargs: getattr(env, name)(*args, **kwargs), *request[1:])
+                else:
+                    connection.send((False, "Unknown command {}".format(command)))
+        shared.close()
+        if closing.is_set():
+            break
+        pipe.send(('released',))
+        start_time = default_timer()
+        try:
+            prepared = env.reset()
+        except Exception:    # pylint: disable=W0703
+            LOGGER.exception("Background reset of %s failed", gym_id)
+            prepared = None
+        pipe.send(('ready', default_timer() - start_time))
+    listener.close()
+    env.close()
+
+
+class EnvPool(object):
+    """
+    Hands out warm environments by gym id.
+
+    `acquire` returns the address of an idle worker for the gym id when
+    there is one (a hit), waits for one that is resetting in the
+    background, and launches a new worker otherwise (a miss). At most
+    `max_workers` workers are kept; the least recently used idle worker
+    of another gym id is closed to make room, and while every worker is
+    busy `acquire` waits for one to be handed back. A closed worker that
+    has not exited after `stop_seconds` is terminated.
+    """
+
+    def __init__(self, factory='sc2_agents.lib.env_pool.make_gym_env', max_workers=8, authkey=None,
+                 stop_seconds=10.0):
+        self.authkey = authkey or pool_authkey()
+        self.condition = Condition()
+        self.context = get_context('spawn')
+        self.factory = factory
+        self.ids = count()
+        self.max_workers = max_workers
+        self.stop_seconds = stop_seconds
+        self.stats = {}
+        self.workers = {}
+
+    def _stats(self, gym_id):
+        return self.stats.setdefault(gym_id, {'hits': 0,
+                                              'misses': 0,
+                                              'background_reset_seconds': 0.0,
+                                              'saved_seconds': 0.0,
+                                              'startup_seconds': 0.0})
+
+    def _watch(self, worker_id, pipe):
+        while True:
+            try:
+                message = pipe.recv()
+            except (EOFError, OSError):
+                message = ('exited',)
+            with self.condition:
+                worker = self.workers.get(worker_id)
+                if worker is None:
+                    # closed by the pool, which leaves the pipe to this thread
+                    if message[0] == 'exited':
+                        pipe.close()
+                        return
+                    continue
+                if message[0] == 'started':
+                    worker.update(address=message[1], startup_seconds=message[2],
+                                  state='busy' if worker['reserved'] else 'idle')
+                    self._stats(worker['gym_id'])['startup_seconds'] += message[2]
+                elif message[0] == 'released':
+                    worker['state'] = 'resetting'
+                elif message[0] == 'ready':
+                    worker.update(state='idle', last_used=default_timer())
+                    self._stats(worker['gym_id'])['background_reset_seconds'] += message[1]
+                elif message[0] == 'exited':
+                    LOGGER.warning("Environment worker %d for %s exited", worker_id, worker['gym_id'])
+                    del self.workers[worker_id]
+                self.condition.notify_all()
+                if message[0] == 'exited':
+                    pipe.close()
+                    return
+
+    def _launch(self, gym_id, reserved=True):
+        pipe, child_pipe = self.context.Pipe()
+        process = self.context.Process(target=_env_worker, args=(gym_id, self.factory, self.authkey, child_pipe),
+                                       name='env-worker-{}'.format(gym_id))
+        process.daemon = True
+        process.start()
+        worker_id = next(self.ids)
+        self.workers[worker_id] = {'gym_id': gym_id, 'pipe': pipe, 'process': process, 'state': 'starting',
+                                   'reserved': reserved, 'address': None, 'startup_seconds': 0.0,
+                                   'last_used': default_timer()}
+        watcher = Thread(target=self._watch, args=(worker_id, pipe), name='env-pool-watch')
+        watcher.daemon = True
+        watcher.start()
+        return worker_id
+
+    def _evict(self, gym_id):
+        """
+        Close the least recently used idle worker of another gym id and
+        return its process, or None when there is none.
+        """
+        idle = [(worker['last_used'], worker_id) for worker_id, worker in self.workers.items()
+                if worker['state'] == 'idle' and worker['gym_id'] != gym_id]
+        if idle:
+            return self._close(min(idle)[1])
+        return None
+
+    def _close(self, worker_id):
+        """
+        Ask a worker to shut down and return its process, to be stopped
+        without holding the condition.
+        """
+        worker = self.workers.pop(worker_id)
+        try:
+            worker['pipe'].send('close')
+        except OSError:
+            pass
+        return worker['process']
+
+    def _stop(self, process):
+        process.join(self.stop_seconds)
+        if process.is_alive():
+            LOGGER.warning("Terminating environment worker %s, it did not exit in %.0fs",
+                           process.name, self.stop_seconds)
+            process.terminate()
+            process.join()
+
+    def _stop_in_background(self, process):
+        stopper = Thread(target=self._stop, args=(process,), name='env-pool-stop')
+        stopper.daemon = True
+        stopper.start()
+
+    def acquire(self, gym_id):
+        """
+        Reserve an environment and return (worker id, address).
+        """
+        start_time = default_timer()
+        with self.condition:
+            stats = self._stats(gym_id)
+            while True:
+                candidates = [worker_id for worker_id, worker in self.workers.items() if worker['gym_id'] == gym_id]
+                idle = [worker_id for worker_id in candidates if self.workers[worker_id]['state'] == 'idle']
+                pending = [worker_id for worker_id in candidates
+                           if self.workers[worker_id]['state'] == 'resetting'
+                           or self.workers[worker_id]['state'] == 'starting' and not self.workers[worker_id]['reserved']]
+                if idle:
+                    worker = self.workers[idle[0]]
+                    worker['state'] = 'busy'
+                    stats['hits'] += 1
+                    # a job that waited for a worker to finish starting saved only the rest
+                    stats['saved_seconds'] += max(worker['startup_seconds'] - (default_timer() - start_time), 0.0)
+                    return idle[0], worker['address']
+                if not pending:
+                    if len(self.workers) < self.max_workers:
+                        break
+                    evicted = self._evict(gym_id)
+                    if evicted is not None:
+                        self._stop_in_background(evicted)
+                        break
+                # the worker is resetting or starting, or every worker is busy
+                self.condition.wait()
+            worker_id = self._launch(gym_id)
+            stats['misses'] += 1
+            while worker_id in self.workers and self.workers[worker_id]['address'] is None:
+                self.condition.wait()
+            if worker_id not in self.workers:
+                raise RuntimeError("The environment worker for {} failed to start".format(gym_id))
+            return worker_id, self.workers[worker_id]['address']
+
+    def prestart(self, gym_id, count=1):
+        """
+        Launch `count` workers for a gym id ahead of the jobs that need them.
+        """
+        with self.condition:
+            for _ in range(count):
+                self._launch(gym_id, reserved=False)
+
+    def close(self):
+        with self.condition:
+            processes = [self._close(worker_id) for worker_id in list(self.workers)]
+        for process in processes:
+            self._stop(process)
+
+    def report(self):
+        with self.condition:
+            report = {'gym_ids': dict((gym_id, dict(stats)) for gym_id, stats in self.stats.items()),
+                      'workers': dict((state, sum(1 for worker in self.workers.values() if worker['state'] == state))
+                                      for state in ('starting', 'busy', 'resetting', 'idle'))}
+        hits = sum(stats['hits'] for stats in self.stats.values())
+        misses = sum(stats['misses'] for stats in self.stats.values())
+        report.update(hits=hits,
+                      misses=misses,
+                      hit_rate=hits / (hits + misses) if hits + misses else 0.0,
+                      saved_seconds=sum(stats['saved_seconds'] for stats in self.stats.values()),
+                      startup_seconds=sum(stats['startup_seconds'] for stats in self.stats.values()))
+        return report
+
+
+class EnvPoolServer(object):
+    """
+    Serves an EnvPool to jobs in other processes over a local socket,
+    with the pool's authkey. Unless the key comes from
+    SC2_AGENTS_ENV_POOL_AUTHKEY, `start` writes it to a file only this
+    user can read, which `stop` removes.
+    """
+
+    def __init__(self, pool, address=('127.0.0.1', 0)):
+        self.authkey = pool.authkey
+        self.authkey_path = None
+        self.listener = Listener(address, authkey=self.authkey)
+        self.pool = pool
+        self.thread = Thread(target=self._accept, name='env-pool-server')
+        self.thread.daemon = True
+
+    @property
+    def address(self):
+        return self.listener.address
+
+    def start(self):
+        if self.authkey != environ.get(AUTHKEY_VARIABLE, '').encode():
+            self.authkey_path = write_authkey(self.address[1], self.authkey)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.listener.close()
+        if self.authkey_path is not None:
+            remove(self.authkey_path)
+            self.authkey_path = None
+
+    def _accept(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except AuthenticationError:
+                LOGGER.warning("Refused a connection to the environment pool without its authkey")
+                continue
+            except OSError:
+                return
+            thread = Thread(target=self._serve, args=(connection,), name='env-pool-client')
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, connection):
+        with connection:
+            while True:
+                try:
+                    request = connection.recv()
+                except EOFError:
+                    return
+                if request[0] == 'acquire':
+                    _reply(connection, self.pool.acquire, request[1])
+                elif request[0] == 'report':
+                    _reply(connection, self.pool.report)
+                else:
+                    connection.send((False, "Unknown command {}".format(request[0])))
+
+
+class EnvPoolClient(object):
+    """
+    A connection to an EnvPoolServer, with the authkey the server
+    published for its port unless one is given.
+    """
+
+    def __init__(self, address, authkey=None):
+        self.authkey = authkey or read_authkey(address[1])
+        self.connection = Client(address, authkey=self.authkey)
+
+    def _call(self, *request):
+        self.connection.send(request)
+        ok, result = self.connection.recv()
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def acquire(self, gym_id):
+        """
+        A PooledEnv for the gym id, connected straight to its worker.
+        """
+        start_time = default_timer()
+        _, address = self._call('acquire', gym_id)
+        env = PooledEnv(address, self.authkey)
+        env.acquire_seconds = default_timer() - start_time
+        return env
+
+    def report(self):
+        return self._call('report')
+
+    def close(self):
+        self.connection.close()
+
+
+class PooledEnv(object):
+    """
+    A gym environment running in a pool worker. `close` hands it back to
+    the pool instead of shutting it down. With `shared` (the default) the
+    worker returns observations through shared memory, which the pool's
+    loopback-only workers can always offer.
+    """
+
+    def __init__(self, address, authkey, shared=True):
+        self.connection = Client(address, authkey=authkey)
+        self.acquire_seconds = 0.0
+        self.observation_space, self.action_space, self.reward_range, self.metadata = self._call('spaces')
+        self.slots = None
+        if shared:
+            share = self._call('share')
+            if share is not None:
+                name, shape, dtype = share
+                self.slots = SharedSlots(1, shape, dtype, name=name)
+
+    def __getattr__(self, name):
+        if name in ('connection', 'slots') or name.startswith('__'):
+            raise AttributeError(name)
+        return self._call('getattr', name)
+
+    def _call(self, *request):
+        self.connection.send(request)
+        ok, result = self.connection.recv()
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def _observation(self, observation):
+        if self.slots is None:
+            return observation
+        slot, generation = observation
+        return self.slots.view(slot, generation).copy()
+
+    def reset(self, **kwargs):
+        return self._observation(self._call('reset', kwargs))
+
+    def step(self, action):
+        observation, reward, done, info = self._call('step', action)
+        return self._observation(observation), reward, done, info
+
+    def render(self, *args, **kwargs):
+        return self._call('call', 'render', args, kwargs)
+
+    def seed(self, seed=None):
+        return self._call('call', 'seed', (seed,), {})
+
+    @property
+    def unwrapped(self):
+        return self
+
+    def close(self):
+        if self.slots is not None:
+            self.slots.close()
+            self.slots = None
+        if self.connection is not None:
+            self._call('release')
+            self.connection.close()
+            self.connection = None
+
+
+def pooled_env(gym_id, address, authkey=None):
+    """
+    Acquire a PooledEnv from the pool server at 'host:port'. Registered as
+    a gym entry point by `pooled_gym_id`.
+    """
+    client = EnvPoolClient(parse_address(address), authkey)
+    try:
+        env = client.acquire(gym_id)
+    finally:
+        client.close()
+    LOGGER.info("Acquired %s from the environment pool in %.2fs", gym_id, env.acquire_seconds)
+    return env
+
+
+def pooled_gym_id(gym_id, address):
+    """
+    Register a gym id whose environments come from the pool at
+    'host:port', for code that can only be given a gym id.
+    """
+    from gym.envs.registration import register
+    from gym.envs.registration import registry
+    name, version = gym_id.rsplit('-v', 1)
+    pooled_id = '{}-pooled-v{}'.format(name, version)
+    if pooled_id not in getattr(registry, 'env_specs', registry):
+        register(id=pooled_id, entry_point='sc2_agents.lib.env_pool:pooled_env',
+                 kwargs={'gym_id': gym_id, 'address': address})
+    return pooled_id
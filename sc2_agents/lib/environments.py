@@ -0,0 +1,47 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Construction of the pysc2 environments used by the agents.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from pysc2.env import sc2_env
+from pysc2.lib import features
+
+
+def make_env(map_name, agent_race='terran', screen_size=64, minimap_size=64,
+             step_mul=8, random_seed=None, visualize=False, realtime=False):
+    """
+    Create a single-player SC2Env for a minigame.
+    """
+    return sc2_env.SC2Env(
+        map_name=map_name,
+        players=[sc2_env.Agent(sc2_env.Race[agent_race])],
+        agent_interface_format=features.AgentInterfaceFormat(
+            feature_dimensions=features.Dimensions(screen=screen_size, minimap=minimap_size)),
+        step_mul=step_mul,
+        random_seed=random_seed,
+        visualize=visualize,
+        realtime=realtime)
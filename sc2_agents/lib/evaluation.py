@@ -0,0 +1,232 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Parallel, resumable evaluation of checkpoints and scripted agents over
+seeded episodes.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from hashlib import blake2b
+from logging import getLogger
+from math import sqrt
+from multiprocessing import get_context
+from numpy.random import seed as np_seed
+from os import listdir
+from os import path
+from random import seed as random_seed
+from sc2_agents.lib.agent_wrapper import agent_class
+from sqlite3 import connect
+from time import time
+from timeit import default_timer
+
+LOGGER = getLogger(__name__)
+
+CHECKPOINT_AGENT = 'sc2_agents.agents.move_to_beacon.MoveToBeaconAgent002'
+
+# two-sided 95% quantiles of Student's t distribution for 1 to 30 degrees of freedom
+T_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def policy_paths(directory):
+    """
+    The act_x and act_y policies of a checkpoint directory, as written by
+    export_policy, train_dqn or quantize_policy.
+    """
+    names = listdir(directory)
+    paths = []
+    for axis in ('x', 'y'):
+        for name in ('act_{}.npz'.format(axis), 'act_{}.int8.npz'.format(axis), 'act_{}.pkl'.format(axis)):
+            if name in names:
+                paths.append(path.join(directory, name))
+                break
+        else:
+            raise ValueError("{} holds no act_{} policy".format(directory, axis))
+    return paths
+
+
+def candidate_digest(candidate, checkpoint_agent=CHECKPOINT_AGENT, screen_size=64, step_mul=8):
+    """
+    Identify a candidate by its contents and the settings it is played
+    with: a checkpoint directory by a hash of its policy files and the
+    agent running them, so that a retrained checkpoint is scored again,
+    and an agent class by its name. The screen size and step_mul are part
+    of both, as episodes played with other settings are not comparable.
+    """
+    settings = '{}px:step_mul={}'.format(screen_size, step_mul)
+    if not path.isdir(candidate):
+        return '{}:{}'.format(candidate, settings)
+    hasher = blake2b(digest_size=16)
+    hasher.update('{}:{}'.format(checkpoint_agent, settings).encode())
+    for policy_path in policy_paths(candidate):
+        with open(policy_path, 'rb') as file:
+            hasher.update(file.read())
+    return hasher.hexdigest()
+
+
+def make_agent(candidate, checkpoint_agent=CHECKPOINT_AGENT):
+    if path.isdir(candidate):
+        from sc2_agents.lib.numpy_policy import load_policy
+        act_x, act_y = [load_policy(policy_path) for policy_path in policy_paths(candidate)]
+        return agent_class(checkpoint_agent)(act_x, act_y)
+    return agent_class(candidate)()
+
+
+def make_evaluation_env(env, map_name, seed, screen_size=64, step_mul=8):
+    if env == 'standin':
+        from sc2_agents.lib.standin_env import StandInMinigame
+        return StandInMinigame(map_name, screen_size=screen_size, seed=seed)
+    from sc2_agents.lib.environments import make_env
+    return make_env(map_name, screen_size=screen_size, step_mul=step_mul, random_seed=seed)
+
+
+def evaluate_episode(task):
+    """
+    Play one episode of a candidate with every source of randomness seeded
+    by the task's seed, and return the task with its reward and length.
+    """
+    random_seed(task['seed'])
+    np_seed(task['seed'])
+    start_time = default_timer()
+    agent = make_agent(task['candidate'], task['checkpoint_agent'])
+    env = make_evaluation_env(task['env'], task['map_name'], task['seed'], task['screen_size'], task['step_mul'])
+    try:
+        agent.setup(env.observation_spec(), env.action_spec())
+        agent.reset()
+        timestep = env.reset()[0]
+        reward, steps = 0.0, 0
+        while not timestep.last():
+            timestep = env.step([agent.step(timestep)])[0]
+            reward += timestep.reward
+            steps += 1
+    finally:
+        env.close()
+    result = dict(task)
+    result.update(reward=reward, steps=steps, seconds=default_timer() - start_time)
+    return result
+
+
+def mean_confidence_interval(values):
+    """
+    The mean of `values` and the half-width of its 95% confidence interval.
+    """
+    count = len(values)
+    mean = sum(values) / count
+    if count < 2:
+        return mean, float('inf')
+    variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+    t = T_95[count - 2] if count - 1 <= len(T_95) else 1.960
+    return mean, t * sqrt(variance / count)
+
+
+class EvaluationStore(object):
+    """
+    Per-episode results in an SQLite database, one row per candidate
+    digest (which covers the agent settings), environment, map and seed.
+    """
+
+    def __init__(self, database):
+        self.connection = connect(database)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS episodes ("
+            "digest TEXT NOT NULL, candidate TEXT NOT NULL, env TEXT NOT NULL, map_name TEXT NOT NULL, "
+            "seed INTEGER NOT NULL, reward REAL NOT NULL, steps INTEGER NOT NULL, seconds REAL NOT NULL, "
+            "finished REAL NOT NULL, PRIMARY KEY (digest, env, map_name, seed))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS episodes_candidate ON episodes (candidate)")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def scored_seeds(self, digest, env, map_name):
+        rows = self.connection.execute(
+            "SELECT seed FROM episodes WHERE digest = ? AND env = ? AND map_name = ?", (digest, env, map_name))
+        return set(row[0] for row in rows)
+
+    def add(self, result):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (result['digest'], result['candidate'], result['env'], result['map_name'], result['seed'],
+             result['reward'], result['steps'], result['seconds'], time()))
+        self.connection.commit()
+
+    def rewards(self, digest, env, map_name, seeds=None):
+        rows = self.connection.execute(
+            "SELECT seed, reward FROM episodes WHERE digest = ? AND env = ? AND map_name = ? ORDER BY seed",
+            (digest, env, map_name))
+        return [reward for seed, reward in rows if seeds is None or seed in seeds]
+
+
+def evaluate(candidates, seeds, store, map_name='MoveToBeacon', env='sc2', workers=4,
+             checkpoint_agent=CHECKPOINT_AGENT, screen_size=64, step_mul=8):
+    """
+    Score every candidate on every seed across a process pool, skipping
+    the (candidate, seed) pairs the store already holds. Results are
+    written to the store as each episode finishes. Returns one summary
+    per candidate with the mean reward over `seeds` and its 95%
+    confidence interval, best first.
+    """
+    digests = dict((candidate, candidate_digest(candidate, checkpoint_agent, screen_size, step_mul))
+                   for candidate in candidates)
+    tasks = []
+    for candidate in candidates:
+        scored = store.scored_seeds(digests[candidate], env, map_name)
+        for seed in seeds:
+            if seed not in scored:
+                tasks.append({'candidate': candidate,
+                              'checkpoint_agent': checkpoint_agent,
+                              'digest': digests[candidate],
+                              'env': env,
+                              'map_name': map_name,
+                              'screen_size': screen_size,
+                              'seed': seed,
+                              'step_mul': step_mul})
+    skipped = len(candidates) * len(seeds) - len(tasks)
+    LOGGER.info("Evaluating %d episodes, %d already scored", len(tasks), skipped)
+    if tasks:
+        # a fresh interpreter per worker keeps game and TensorFlow state out of the pool
+        pool = get_context('spawn').Pool(min(workers, len(tasks)))
+        try:
+            for done, result in enumerate(pool.imap_unordered(evaluate_episode, tasks), 1):
+                store.add(result)
+                LOGGER.info("[%d/%d] %s seed %d: reward %.1f in %d steps",
+                            done, len(tasks), result['candidate'], result['seed'], result['reward'], result['steps'])
+        finally:
+            pool.close()
+            pool.join()
+    summaries = []
+    seed_set = set(seeds)
+    for candidate in candidates:
+        rewards = store.rewards(digests[candidate], env, map_name, seed_set)
+        mean, half_width = mean_confidence_interval(rewards)
+        summaries.append({'candidate': candidate,
+                          'digest': digests[candidate],
+                          'episodes': len(rewards),
+                          'mean_reward': mean,
+                          'ci_low': mean - half_width,
+                          'ci_high': mean + half_width})
+    summaries.sort(key=lambda summary: summary['mean_reward'], reverse=True)
+    return {'evaluated': len(tasks), 'skipped': skipped, 'summaries': summaries}
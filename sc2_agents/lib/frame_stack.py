@@ -0,0 +1,333 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Frame stacking over a ring buffer of frames, with stacked views that are
+never copied and a replay buffer that shares the same frame storage, and
+lazily stacked observations for the gym trainers.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from collections import deque
+from numpy import arange as np_arange
+from numpy import array as np_array
+from numpy import asarray as np_asarray
+from numpy import empty as np_empty
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import int64 as np_int64    # pylint: disable=E0611
+from numpy import moveaxis as np_moveaxis
+from numpy import stack as np_stack
+from numpy import take as np_take
+from numpy import uint8 as np_uint8    # pylint: disable=E0611
+from numpy import zeros as np_zeros
+from numpy.random import RandomState
+from sc2_agents.lib.training_state import random_state
+from sc2_agents.lib.training_state import set_random_state
+
+
+class FrameStack(object):
+    """
+    The last `capacity` frames in a ring whose k-frame windows are always
+    contiguous.
+
+    The ring has k - 1 slots in front of it that mirror its last k - 1
+    positions, so the window ending at any position is a plain slice of
+    the storage: reading a stack is a view, and appending a frame is one
+    copy (two for the last k - 1 positions). Frames are addressed by the
+    absolute index `append` returns.
+    """
+
+    def __init__(self, capacity, frame_shape, k=4, dtype=np_uint8):
+        if not 1 <= k <= capacity:
+            raise ValueError("k must be between 1 and the capacity")
+        self.capacity = capacity
+        self.count = 0
+        self.frames = np_zeros((capacity + k - 1,) + tuple(frame_shape), dtype=dtype)
+        self.k = k
+        self.window = np_arange(k)
+
+    def append(self, frame):
+        position = self.count % self.capacity
+        self.frames[position + self.k - 1] = frame
+        if position > self.capacity - self.k:
+            self.frames[position - (self.capacity - self.k + 1)] = frame
+        self.count += 1
+        return self.count - 1
+
+    def reset(self, frame):
+        """
+        Start an episode: the first stack repeats its first frame k times,
+        so that no window reaches into the previous episode.
+        """
+        for _ in range(self.k):
+            index = self.append(frame)
+        return index
+
+    def available(self, index):
+        return self.count - self.capacity + self.k - 1 <= index < self.count
+
+    def stacked(self, index=None):
+        """
+        A (k,) + frame_shape view of the k frames ending at `index`,
+        the newest frame by default.
+        """
+        index = self.count - 1 if index is None else index
+        if not self.available(index):
+            raise IndexError("Frame {} is no longer in the ring".format(index))
+        position = index % self.capacity
+        return self.frames[position:position + self.k]
+
+    def gather(self, indices, out):
+        """
+        Copy the stacks ending at each of `indices` into `out`, a
+        preallocated (len(indices), k) + frame_shape array.
+        """
+        starts = np_asarray(indices) % self.capacity
+        return np_take(self.frames, starts[:, None] + self.window, axis=0, out=out)
+
+    def get_state(self):
+        return {'count': self.count}, {'frames': self.frames}
+
+    def set_state(self, scalars, arrays):
+        if arrays['frames'].shape != self.frames.shape or arrays['frames'].dtype != self.frames.dtype:
+            raise ValueError("Saved frames are {} {}, the ring holds {} {}".format(
+                arrays['frames'].shape, arrays['frames'].dtype, self.frames.shape, self.frames.dtype))
+        self.frames = arrays['frames']
+        self.count = scalars['count']
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes
+
+
+class FrameStackReplay(object):
+    """
+    A replay buffer of transitions between frame stacks that stores every
+    frame once, in the FrameStack the agent acts from.
+
+    A transition is kept at the ring position of its first frame and
+    points at the stacks ending there and one frame later, so it holds
+    only its action, reward and done flag. Transitions disappear as the
+    ring overwrites their frames. Sampling gathers the stacks into
+    buffers allocated once per batch size.
+    """
+
+    def __init__(self, capacity, frame_shape, k=4, dtype=np_uint8, action_shape=(), seed=None):
+        self.frame_stack = FrameStack(capacity, frame_shape, k, dtype)
+        self.actions = np_zeros((capacity,) + tuple(action_shape), dtype=np_int64)
+        self.batches = {}
+        self.dones = np_zeros(capacity, dtype=np_uint8)
+        self.indices = np_zeros(capacity, dtype=np_int64)
+        self.random = RandomState(seed)
+        self.rewards = np_zeros(capacity, dtype=np_float32)
+        self.valid = np_zeros(capacity, dtype=bool)
+        self.current = None
+
+    def __len__(self):
+        return int(self.valid.sum())
+
+    def _invalidate(self, positions):
+        self.valid[positions] = False
+
+    def _validate(self, position):
+        self.valid[position] = True
+
+    def _append(self, frame, reset=False):
+        stack = self.frame_stack
+        first = stack.count
+        self.current = stack.reset(frame) if reset else stack.append(frame)
+        # a new frame ends the transitions whose stacks held the frame it replaced
+        self._invalidate(np_arange(first, self.current + stack.k) % stack.capacity)
+        return stack.stacked(self.current)
+
+    def reset(self, frame):
+        """
+        Add the first frame of an episode and return the stack to act on.
+        """
+        return self._append(frame, reset=True)
+
+    def step(self, action, reward, next_frame, done):
+        """
+        Record the transition from the current stack and return the next
+        stack to act on.
+        """
+        position = self.current % self.frame_stack.capacity
+        self.actions[position] = action
+        self.rewards[position] = reward
+        self.dones[position] = done
+        self.indices[position] = self.current
+        next_stack = self._append(next_frame)
+        self._validate(position)
+        return next_stack
+
+    def _batch(self, batch_size):
+        batch = self.batches.get(batch_size)
+        if batch is None:
+            stack_shape = (batch_size, self.frame_stack.k) + self.frame_stack.frames.shape[1:]
+            batch = self.batches[batch_size] = (np_empty(stack_shape, dtype=self.frame_stack.frames.dtype),
+                                                np_empty(stack_shape, dtype=self.frame_stack.frames.dtype))
+        return batch
+
+    def sample_indices(self, batch_size):
+        stack = self.frame_stack
+        low = max(stack.count - stack.capacity + stack.k - 1, 0)
+        if not self.valid.any():
+            raise ValueError("The replay buffer holds no transitions")
+        indices = []
+        while len(indices) < batch_size:
+            candidates = self.random.randint(low, stack.count - 1, size=2 * batch_size)
+            indices.extend(candidates[self.valid[candidates % stack.capacity]][:batch_size - len(indices)])
+        return np_asarray(indices)
+
+    def sample(self, batch_size):
+        """
+        (states, actions, rewards, next_states, dones) of a uniform sample.
+        The state arrays are reused by the next sample of the same size.
+        """
+        return self.batch(self.sample_indices(batch_size) % self.frame_stack.capacity)
+
+    def batch(self, positions):
+        states, next_states = self._batch(len(positions))
+        indices = self.indices[positions]
+        self.frame_stack.gather(indices, states)
+        self.frame_stack.gather(indices + 1, next_states)
+        return states, self.actions[positions], self.rewards[positions], next_states, self.dones[positions]
+
+    def get_state(self):
+        """
+        The buffer as (scalars, arrays), for a TrainingState.
+        """
+        scalars, arrays = self.frame_stack.get_state()
+        random_scalars, random_arrays = random_state(self.random)
+        scalars.update(current=self.current, random=random_scalars)
+        arrays.update(actions=self.actions, dones=self.dones, indices=self.indices, rewards=self.rewards,
+                      valid=self.valid, random_keys=random_arrays['keys'])
+        return scalars, arrays
+
+    def set_state(self, scalars, arrays):
+        self.frame_stack.set_state(scalars, arrays)
+        self.actions = arrays['actions']
+        self.dones = arrays['dones']
+        self.indices = arrays['indices']
+        self.rewards = arrays['rewards']
+        self.valid = arrays['valid']
+        self.current = scalars['current']
+        set_random_state(scalars['random'], {'keys': arrays['random_keys']}, self.random)
+
+    @property
+    def nbytes(self):
+        return (self.frame_stack.nbytes + self.actions.nbytes + self.rewards.nbytes
+                + self.dones.nbytes + self.indices.nbytes + self.valid.nbytes)
+
+
+class LazyStack(object):
+    """
+    k frames that are stacked only when converted to an array, like the
+    LazyFrames of the baselines atari wrappers. Consecutive observations,
+    and the observation and next observation of every transition a
+    replay buffer keeps, share the same read-only frames instead of each
+    holding a copy of all k of them.
+    """
+
+    __slots__ = ('channels_last', 'frames')
+
+    def __init__(self, frames, channels_last=False):
+        self.channels_last = channels_last
+        self.frames = frames
+
+    def __array__(self, dtype=None, copy=None):
+        stacked = np_stack(self.frames, axis=-1 if self.channels_last else 0)
+        return stacked if dtype is None else stacked.astype(dtype, copy=False)
+
+    def __len__(self):
+        return len(self.frames[0]) if self.channels_last else len(self.frames)
+
+    @property
+    def shape(self):
+        frame_shape = self.frames[0].shape
+        return frame_shape + (len(self.frames),) if self.channels_last else (len(self.frames),) + frame_shape
+
+
+class FrameStackWrapper(object):
+    """
+    Gives a gym environment of screens observations of its last k frames
+    as LazyStacks. `channels_last` moves the frame axis last, the layout
+    convolutions expect.
+
+    The trainers behind this wrapper (deepq.learn, ppo1, TensorForce) own
+    their replay buffers, so the frames cannot live in a FrameStack ring
+    the way FrameStackReplay keeps them for train_dqn. Each frame is
+    copied once when it arrives and then shared by the k observations
+    and the transitions that hold it.
+    """
+
+    def __init__(self, env, k=4, channels_last=False):
+        from gym import spaces
+        self.channels_last = channels_last
+        self.env = env
+        self.frames = deque(maxlen=k)
+        self.k = k
+        space = env.observation_space
+        low = np_asarray([space.low] * k)
+        high = np_asarray([space.high] * k)
+        if channels_last:
+            low, high = np_moveaxis(low, 0, -1), np_moveaxis(high, 0, -1)
+        self.observation_space = spaces.Box(low=low, high=high)
+
+    def __getattr__(self, name):
+        if name == 'env':
+            raise AttributeError(name)
+        return getattr(self.env, name)
+
+    def _observation(self):
+        return LazyStack(tuple(self.frames), self.channels_last)
+
+    @staticmethod
+    def _frame(observation):
+        # the environment may reuse its observation array
+        frame = np_array(observation)
+        frame.flags.writeable = False
+        return frame
+
+    def reset(self, **kwargs):
+        self.frames.extend([self._frame(self.env.reset(**kwargs))] * self.k)
+        return self._observation()
+
+    def step(self, action):
+        observation, reward, done, info = self.env.step(action)
+        self.frames.append(self._frame(observation))
+        return self._observation(), reward, done, info
+
+    def close(self):
+        return self.env.close()
+
+
+def stack_frames(env, k=1, channels_last=False):
+    """
+    Wrap a gym environment of screens in a FrameStackWrapper, or return it
+    unchanged for k = 1.
+    """
+    if k <= 1:
+        return env
+    return FrameStackWrapper(env, k, channels_last=channels_last)
@@ -0,0 +1,271 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Content-addressed storage for feature-layer frames and the trajectories
+built on top of it.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from hashlib import blake2b
+from logging import getLogger
+from numpy import array as np_array
+from numpy import ascontiguousarray as np_ascontiguousarray
+from numpy import empty as np_empty
+from numpy import flatnonzero as np_flatnonzero
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import uint16 as np_uint16    # pylint: disable=E0611
+from numpy import uint32 as np_uint32    # pylint: disable=E0611
+from numpy import uint8 as np_uint8    # pylint: disable=E0611
+from numpy.random import RandomState
+
+LOGGER = getLogger(__name__)
+
+
+class FrameStore(object):
+    """
+    Stores each unique frame once, keyed by a hash of its contents.
+
+    A new frame that differs from the current keyframe in at most
+    `max_delta_fraction` of its pixels is stored as a sparse delta
+    (flat indices and values) against that keyframe. A fresh keyframe
+    is taken when the difference is larger, or after `keyframe_interval`
+    consecutive deltas so that decoding never walks a long chain.
+
+    Frames are reference counted: `put` adds a reference, `release`
+    drops one, and a frame is freed once nothing refers to it.
+    """
+
+    def __init__(self, max_delta_fraction=0.05, keyframe_interval=64):
+        self.keyframe_interval = keyframe_interval
+        self.max_delta_fraction = max_delta_fraction
+        self.entries = {}
+        self.index = {}
+        self.keyframe_id = None
+        self.deltas_since_keyframe = 0
+        self.next_id = 0
+        self.frames_added = 0
+        self.raw_bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _digest(self, frame):
+        hasher = blake2b(digest_size=16)
+        hasher.update(str((frame.shape, frame.dtype.str)).encode())
+        hasher.update(frame.data)
+        return hasher.digest()
+
+    def _store(self, entry):
+        frame_id = self.next_id
+        self.next_id += 1
+        self.entries[frame_id] = entry
+        self.index[entry['digest']] = frame_id
+        return frame_id
+
+    def _delta(self, frame):
+        if self.keyframe_id is None or self.deltas_since_keyframe >= self.keyframe_interval:
+            return None
+        keyframe = self.entries[self.keyframe_id]['frame']
+        if keyframe.shape != frame.shape or keyframe.dtype != frame.dtype:
+            return None
+        indices = np_flatnonzero(keyframe.reshape(-1) != frame.reshape(-1))
+        if len(indices) > self.max_delta_fraction * frame.size:
+            return None
+        index_dtype = np_uint16 if frame.size <= 0xFFFF else np_uint32
+        return indices.astype(index_dtype), frame.reshape(-1)[indices]
+
+    def put(self, frame):
+        """
+        Add a frame and return its id.
+        Putting a frame that is already stored returns the existing id.
+        """
+        frame = np_ascontiguousarray(frame)
+        self.frames_added += 1
+        self.raw_bytes += frame.nbytes
+        digest = self._digest(frame)
+        frame_id = self.index.get(digest)
+        if frame_id is not None:
+            self.entries[frame_id]['refs'] += 1
+            return frame_id
+        delta = self._delta(frame)
+        if delta is not None:
+            indices, values = delta
+            self.entries[self.keyframe_id]['refs'] += 1
+            self.deltas_since_keyframe += 1
+            return self._store({'digest': digest,
+                                'keyframe_id': self.keyframe_id,
+                                'indices': indices,
+                                'values': values,
+                                'refs': 1})
+        frame = frame.copy()
+        frame.flags.writeable = False
+        frame_id = self._store({'digest': digest, 'frame': frame, 'refs': 2})
+        if self.keyframe_id is not None:
+            self.release(self.keyframe_id)
+        self.keyframe_id = frame_id
+        self.deltas_since_keyframe = 0
+        return frame_id
+
+    def release(self, frame_id):
+        """
+        Drop one reference to a frame, freeing it when none remain.
+        """
+        entry = self.entries[frame_id]
+        entry['refs'] -= 1
+        if entry['refs'] > 0:
+            return
+        del self.entries[frame_id]
+        del self.index[entry['digest']]
+        if 'keyframe_id' in entry:
+            self.release(entry['keyframe_id'])
+
+    def get(self, frame_id):
+        """
+        Decode a single frame. Keyframes are returned as read-only arrays.
+        """
+        entry = self.entries[frame_id]
+        if 'frame' in entry:
+            return entry['frame']
+        frame = self.entries[entry['keyframe_id']]['frame'].copy()
+        frame.reshape(-1)[entry['indices']] = entry['values']
+        return frame
+
+    def get_batch(self, frame_ids, dtype=None):
+        """
+        Decode several frames into one preallocated array.
+        """
+        first = self.get(frame_ids[0])
+        batch = np_empty((len(frame_ids),) + first.shape, dtype=dtype or first.dtype)
+        for i, frame_id in enumerate(frame_ids):
+            entry = self.entries[frame_id]
+            if 'frame' in entry:
+                batch[i] = entry['frame']
+            else:
+                batch[i] = self.entries[entry['keyframe_id']]['frame']
+                batch[i].reshape(-1)[entry['indices']] = entry['values']
+        return batch
+
+    def stored_bytes(self):
+        total = 0
+        for entry in self.entries.values():
+            if 'frame' in entry:
+                total += entry['frame'].nbytes
+            else:
+                total += entry['indices'].nbytes + entry['values'].nbytes
+        return total
+
+    def report(self):
+        stored_bytes = self.stored_bytes()
+        keyframes = sum(1 for entry in self.entries.values() if 'frame' in entry)
+        return {'frames_added': self.frames_added,
+                'unique_frames': len(self.entries),
+                'keyframes': keyframes,
+                'deltas': len(self.entries) - keyframes,
+                'raw_bytes': self.raw_bytes,
+                'stored_bytes': stored_bytes,
+                'saved_bytes': self.raw_bytes - stored_bytes}
+
+
+class TrajectoryStore(object):
+    """
+    Transition storage for one minigame, backed by a FrameStore.
+
+    Each transition keeps only the ids of its state and next state, so the
+    next state of one transition and the state of the following one share
+    a single stored frame. With a `capacity` the store behaves as a FIFO
+    replay buffer and releases the frames of evicted transitions.
+    """
+
+    def __init__(self, map_name, capacity=None, frame_store=None, seed=None):
+        self.capacity = capacity
+        self.frame_store = frame_store or FrameStore()
+        self.map_name = map_name
+        self.random = RandomState(seed)
+        self.transitions = []
+        self.position = 0
+
+    def __len__(self):
+        return len(self.transitions)
+
+    def add(self, state, action, reward, next_state, done):
+        transition = (self.frame_store.put(state),
+                      action,
+                      reward,
+                      self.frame_store.put(next_state),
+                      done)
+        if self.capacity is None or len(self.transitions) < self.capacity:
+            self.transitions.append(transition)
+            return
+        evicted = self.transitions[self.position]
+        self.frame_store.release(evicted[0])
+        self.frame_store.release(evicted[3])
+        self.transitions[self.position] = transition
+        self.position = (self.position + 1) % self.capacity
+
+    def batch(self, indices):
+        transitions = [self.transitions[i] for i in indices]
+        states = self.frame_store.get_batch([t[0] for t in transitions])
+        next_states = self.frame_store.get_batch([t[3] for t in transitions])
+        return (states,
+                np_array([t[1] for t in transitions]),
+                np_array([t[2] for t in transitions], dtype=np_float32),
+                next_states,
+                np_array([t[4] for t in transitions], dtype=np_uint8))
+
+    def sample(self, batch_size):
+        return self.batch(self.random.randint(0, len(self.transitions), size=batch_size))
+
+    def report(self):
+        report = self.frame_store.report()
+        report['map_name'] = self.map_name
+        report['transitions'] = len(self.transitions)
+        # a naive buffer stores both frames of every transition
+        if self.transitions:
+            frame_bytes = self.frame_store.get(self.transitions[0][0]).nbytes
+            report['raw_bytes'] = 2 * len(self.transitions) * frame_bytes
+            report['saved_bytes'] = report['raw_bytes'] - report['stored_bytes']
+        return report
+
+
+def memory_report(stores):
+    """
+    Log and return the memory saved by each TrajectoryStore or
+    DemonstrationRecorder, one line per minigame.
+    """
+    lines = ["{:<28} {:>12} {:>10} {:>12} {:>12} {:>8}".format(
+        'map_name', 'transitions', 'frames', 'raw_kb', 'stored_kb', 'saved')]
+    for store in stores:
+        report = store.report()
+        saved = report['saved_bytes'] / max(report['raw_bytes'], 1)
+        lines.append("{:<28} {:>12d} {:>10d} {:>12.1f} {:>12.1f} {:>7.1%}".format(
+            report['map_name'],
+            report['transitions'],
+            report['unique_frames'],
+            report['raw_bytes'] / 1024,
+            report['stored_bytes'] / 1024,
+            saved))
+    for line in lines:
+        LOGGER.info(line)
+    return "\n".join(lines)
@@ -0,0 +1,236 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Hot reloading of act_x/act_y checkpoints into running agents.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from logging import getLogger
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import zeros as np_zeros
+from os import stat
+from sc2_agents.lib.agent_wrapper import AgentWrapper
+from sc2_agents.lib.evaluation import policy_paths
+from sc2_agents.lib.metrics import Registry
+from sc2_agents.lib.numpy_policy import load_policy
+from threading import Event
+from threading import Lock
+from threading import Thread
+from time import time
+
+LOGGER = getLogger(__name__)
+
+
+def checkpoint_signature(directory):
+    """
+    The policy files of a checkpoint directory with their sizes and
+    modification times, or None while the directory holds no policies.
+    """
+    try:
+        paths = policy_paths(directory)
+        return tuple((file_path, stat(file_path).st_mtime_ns, stat(file_path).st_size) for file_path in paths)
+    except (OSError, ValueError):
+        return None
+
+
+def check_reloadable(signature):
+    """
+    Refuse pickled baselines act functions: they load into TensorFlow's
+    shared default graph, which is not safe from the watcher's thread
+    while the agent acts with the previous ones.
+    """
+    pickled = [file_path for file_path, _, _ in signature if file_path.endswith('.pkl')]
+    if pickled:
+        raise ValueError("Hot reload only loads .npz policies; export {} with export_policy".format(
+            ", ".join(pickled)))
+
+
+class CheckpointWatcher(object):
+    """
+    Polls a checkpoint directory every `poll_seconds` in the background
+    and loads the policies again when its files change.
+
+    A change is only loaded once the files have looked the same for two
+    consecutive polls, so a checkpoint that is still being written is not
+    picked up half-way. Loading happens on the watcher's thread; the
+    loaded policies wait in `pending` until an agent `take`s them. A load
+    that fails is logged and counted, the previous policies stay in use,
+    and the same files are not tried again until they change. Policies
+    with a known `input_shape` must also act on a blank observation
+    before they are offered.
+
+    Only NumPy (.npz and .int8.npz) policies are reloaded; a checkpoint
+    holding .pkl act functions is refused, on `load` and on every change.
+    """
+
+    def __init__(self, directory, loader=load_policy, poll_seconds=1.0, registry=None):
+        self.directory = directory
+        self.loader = loader
+        self.poll_seconds = poll_seconds
+        self.registry = registry or Registry()
+        self.load_seconds = self.registry.summary(
+            'sc2_agents_checkpoint_load_seconds', "Time to load a changed checkpoint")
+        self.load_failures = self.registry.counter(
+            'sc2_agents_checkpoint_load_failures_total', "Checkpoint loads that failed")
+        self.version = self.registry.gauge(
+            'sc2_agents_checkpoint_version', "Checkpoint version last loaded")
+        self.last_error = None
+        self.pending = None
+        self._attempted = None
+        self._lock = Lock()
+        self._observed = None
+        self._stop = Event()
+        self._thread = None
+
+    def load(self):
+        """
+        Load the current checkpoint on the calling thread and return its
+        policies; later polls only reload it once it changes.
+        """
+        signature = checkpoint_signature(self.directory)
+        if signature is None:
+            raise ValueError("{} holds no act_x/act_y policies".format(self.directory))
+        check_reloadable(signature)
+        self._attempted = self._observed = signature
+        policies = [self.loader(file_path) for file_path, _, _ in signature]
+        self.version.inc()
+        return policies
+
+    def start(self):
+        self._thread = Thread(target=self._poll, name='checkpoint-watcher')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def check(self):
+        """
+        One poll: load the checkpoint if it changed and has settled.
+        Returns True when new policies were loaded.
+        """
+        signature = checkpoint_signature(self.directory)
+        settled = signature is not None and signature == self._observed
+        self._observed = signature
+        if not settled or signature == self._attempted:
+            return False
+        self._attempted = signature
+        detected_at = time()
+        try:
+            check_reloadable(signature)
+            policies = [self.loader(file_path) for file_path, _, _ in signature]
+            for policy in policies:
+                # a policy that cannot act on its own input shape is as bad as one that fails to load
+                input_shape = getattr(policy, 'input_shape', None)
+                if input_shape:
+                    policy(np_zeros((1,) + tuple(input_shape), dtype=np_float32))
+        except Exception as error:    # pylint: disable=W0703
+            self.load_failures.inc()
+            self.last_error = "{}: {}".format(type(error).__name__, error)
+            LOGGER.warning("Keeping the current policies, loading {} failed with {}".format(
+                self.directory, self.last_error))
+            return False
+        loaded_at = time()
+        self.load_seconds.observe(loaded_at - detected_at)
+        with self._lock:
+            self.version.inc()
+            self.pending = {'policies': policies,
+                            'version': int(self.version.value),
+                            'detected_at': detected_at,
+                            'loaded_at': loaded_at}
+        LOGGER.info("Loaded checkpoint version {} from {} in {:.3f}s".format(
+            int(self.version.value), self.directory, loaded_at - detected_at))
+        return True
+
+    def take(self):
+        """
+        The newly loaded policies, or None. Never waits: while the watcher
+        is publishing a load this returns None and the next call gets it.
+        """
+        if self.pending is None or not self._lock.acquire(False):
+            return None
+        try:
+            pending, self.pending = self.pending, None
+        finally:
+            self._lock.release()
+        return pending
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class HotReloadAgent(AgentWrapper):
+    """
+    Swaps the policies a CheckpointWatcher loaded into the wrapped agent.
+
+    The swap happens at the start of `step`, so both heads change together
+    between two decisions and no decision mixes old and new weights. It is
+    two attribute assignments; loading never runs on the step path.
+    """
+
+    def __init__(self, agent, watcher, heads=('act_x', 'act_y')):
+        super(HotReloadAgent, self).__init__(agent)
+        self.heads = heads
+        self.watcher = watcher
+        self.swap_seconds = watcher.registry.summary(
+            'sc2_agents_checkpoint_swap_seconds', "Time to swap loaded policies into the agent")
+        self.staleness_seconds = watcher.registry.summary(
+            'sc2_agents_checkpoint_staleness_seconds', "Time from detecting a checkpoint to acting with it")
+        self.policy_version = int(watcher.version.value)
+        self.swaps = 0
+
+    def swap(self):
+        loaded = self.watcher.take()
+        if loaded is None:
+            return False
+        start_time = time()
+        for head, policy in zip(self.heads, loaded['policies']):
+            setattr(self.agent, head, policy)
+        swapped_at = time()
+        self.swap_seconds.observe(swapped_at - start_time)
+        self.staleness_seconds.observe(swapped_at - loaded['detected_at'])
+        self.policy_version = loaded['version']
+        self.swaps += 1
+        return True
+
+    def step(self, timestep):
+        self.swap()
+        return super(HotReloadAgent, self).step(timestep)
+
+    def report(self):
+        def quantiles(summary):
+            return {'p{:g}'.format(100 * labels['quantile']): value
+                    for name, labels, value in summary.samples() if 'quantile' in labels}
+        return {'policy_version': self.policy_version,
+                'swaps': self.swaps,
+                'load_failures': int(self.watcher.load_failures.value),
+                'last_error': self.watcher.last_error,
+                'load_seconds': quantiles(self.watcher.load_seconds),
+                'swap_seconds': quantiles(self.swap_seconds),
+                'staleness_seconds': quantiles(self.staleness_seconds)}
@@ -0,0 +1,219 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Dynamic batching of policy inference requests from many agents.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from concurrent.futures import Future
+from logging import getLogger
+from multiprocessing.connection import Client
+from multiprocessing.connection import Listener
+from numpy import array as np_array
+from numpy import stack as np_stack
+from queue import Empty
+from queue import Queue
+from threading import Lock
+from threading import Thread
+from time import time
+
+LOGGER = getLogger(__name__)
+
+
+class InferenceService(object):
+    """
+    Gathers single-observation requests from many agents and answers them
+    with one batched forward pass per policy head.
+
+    `heads` maps a head name, such as 'x' or 'y', to a callable taking a
+    batch of observations and returning one output per observation, such
+    as a baselines deepq `act`. The collector thread waits for a first
+    request, then keeps gathering for at most `max_wait` seconds or until
+    `max_batch` requests are pending before running the batch.
+    """
+
+    def __init__(self, heads, max_batch=32, max_wait=0.002):
+        self.heads = heads
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = Queue()
+        self.thread = Thread(target=self._collect, name='inference-service')
+        self.thread.daemon = True
+        self.batches = 0
+        self.requests_served = 0
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.requests.put(None)
+        self.thread.join()
+
+    def submit(self, head, observation):
+        future = Future()
+        self.requests.put((head, observation, future))
+        return future
+
+    def infer(self, head, observation):
+        return self.submit(head, observation).result()
+
+    def policy(self, head):
+        return RemotePolicy(self.infer, head)
+
+    def _collect(self):
+        stopping = False
+        while not stopping:
+            request = self.requests.get()
+            if request is None:
+                break
+            batch = [request]
+            deadline = time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time()
+                try:
+                    request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+                except Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._run(batch)
+
+    def _run(self, batch):
+        by_head = {}
+        for head, observation, future in batch:
+            by_head.setdefault(head, []).append((observation, future))
+        for head, requests in by_head.items():
+            try:
+                outputs = self.heads[head](np_stack([observation for observation, _ in requests]))
+            except Exception as error:    # pylint: disable=W0703
+                for _, future in requests:
+                    future.set_exception(error)
+                continue
+            for (_, future), output in zip(requests, outputs):
+                future.set_result(output)
+        self.batches += 1
+        self.requests_served += len(batch)
+
+    def report(self):
+        return {'batches': self.batches,
+                'mean_batch_size': self.requests_served / self.batches if self.batches else 0.0,
+                'requests': self.requests_served}
+
+
+class RemotePolicy(object):
+    """
+    Stands in for a deepq `act` function in an agent, such as the act_x
+    and act_y of MoveToBeaconAgent002, by sending each observation of the
+    batch it is called with to an inference service.
+    """
+
+    def __init__(self, infer, head):
+        self.head = head
+        self.infer = infer
+
+    def __call__(self, observations):
+        return np_array([self.infer(self.head, observation) for observation in observations])
+
+
+class InferenceServer(object):
+    """
+    Serves an InferenceService to agents in other processes over a local
+    socket, with one thread per connected client.
+    """
+
+    def __init__(self, service, address=('127.0.0.1', 0), authkey=b'sc2_agents'):
+        self.listener = Listener(address, authkey=authkey)
+        self.service = service
+        self.thread = Thread(target=self._accept, name='inference-server')
+        self.thread.daemon = True
+
+    @property
+    def address(self):
+        return self.listener.address
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.listener.close()
+
+    def _accept(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                return
+            thread = Thread(target=self._serve, args=(connection,), name='inference-client')
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, connection):
+        with connection:
+            while True:
+                try:
+                    head, observation = connection.recv()
+                except EOFError:
+                    return
+                try:
+                    connection.send((True, self.service.infer(head, observation)))
+                except Exception as error:    # pylint: disable=W0703
+                    LOGGER.exception("Inference request failed")
+                    connection.send((False, repr(error)))
+
+
+class InferenceClient(object):
+    """
+    A connection to an InferenceServer. Threads sharing a client take
+    turns, so each agent should open its own to have its requests batched
+    with the others'.
+    """
+
+    def __init__(self, address, authkey=b'sc2_agents'):
+        self.connection = Client(address, authkey=authkey)
+        self.lock = Lock()
+
+    def infer(self, head, observation):
+        with self.lock:
+            self.connection.send((head, observation))
+            ok, result = self.connection.recv()
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def policy(self, head):
+        return RemotePolicy(self.infer, head)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,148 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Per-map cache of static layout facts, such as the screen coordinates of
+mineral fields, vespene geysers and command centers on the minigame maps.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from json import dump as json_dump
+from json import load as json_load
+from logging import getLogger
+from numpy import array as np_array
+from numpy import count_nonzero as np_count_nonzero
+from numpy import linspace as np_linspace
+from os import environ
+from os import fdopen
+from os import makedirs
+from os import path
+from os import remove
+from os import replace
+from sc2_agents.lib.sparse_features import screen_coordinates
+from tempfile import mkstemp
+
+LOGGER = getLogger(__name__)
+
+MAP_CACHE_VARIABLE = 'SC2_AGENTS_MAP_CACHE'
+DEFAULT_PATH = path.join(path.expanduser('~'), '.sc2_agents', 'map_cache.json')
+
+
+class StaticMapCache(object):
+    """
+    Coordinates of static units keyed by map, screen size, layer and value.
+
+    An entry is computed by scanning the layer the first time it is asked
+    for and persisted to `path`, so later episodes and processes only do a
+    lookup. Every lookup is checked against the current frame: the layer
+    must hold the value at `samples` of the cached pixels and at as many
+    pixels of their bounding region as the entry has; otherwise the layer
+    is rescanned and the entry replaced. Only the rescan reads the whole
+    screen, so a unit appearing outside the region goes unnoticed until
+    the entry is next invalidated.
+    """
+
+    def __init__(self, cache_path=None, samples=8):
+        self.path = cache_path or environ.get(MAP_CACHE_VARIABLE) or DEFAULT_PATH
+        self.samples = samples
+        self.checks = {}
+        self.entries = None
+        self.hits = 0
+        self.invalidations = 0
+        self.misses = 0
+
+    def _load(self):
+        self.entries = {}
+        if not path.isfile(self.path):
+            return
+        try:
+            with open(self.path) as file:
+                data = json_load(file)
+        except ValueError:
+            LOGGER.warning("Ignoring unreadable map cache %s", self.path)
+            return
+        for key, (ys, xs) in data.items():
+            self.entries[key] = (np_array(ys, dtype=int), np_array(xs, dtype=int))
+
+    def save(self):
+        directory = path.dirname(self.path)
+        if directory and not path.isdir(directory):
+            makedirs(directory)
+        # a file of our own, as other processes may be saving the same cache
+        descriptor, temporary = mkstemp(dir=directory or None, prefix=path.basename(self.path) + '.', suffix='.tmp')
+        try:
+            with fdopen(descriptor, 'w') as file:
+                json_dump({key: [ys.tolist(), xs.tolist()] for key, (ys, xs) in self.entries.items()}, file)
+            replace(temporary, self.path)
+        except BaseException:
+            remove(temporary)
+            raise
+
+    def _checks(self, key, ys, xs):
+        checks = self.checks.get(key)
+        if checks is None:
+            indices = np_linspace(0, len(ys) - 1, min(self.samples, len(ys))).astype(int)
+            region = (slice(ys.min(), ys.max() + 1), slice(xs.min(), xs.max() + 1))
+            checks = self.checks[key] = (ys[indices], xs[indices], region)
+        return checks
+
+    def _valid(self, layer, key, ys, xs, value):
+        sample_ys, sample_xs, region = self._checks(key, ys, xs)
+        if not (layer[sample_ys, sample_xs] == value).all():
+            return False
+        return np_count_nonzero(layer[region] == value) == len(ys)
+
+    def coordinates(self, observation, map_name, layer, value):
+        """
+        (ys, xs) of the pixels of a feature-screen layer equal to `value`
+        on `map_name`, from the cache when the current frame agrees with it.
+        """
+        if self.entries is None:
+            self._load()
+        screen = getattr(observation.feature_screen, layer)
+        key = '{}/{}x{}/{}/{}'.format(map_name, screen.shape[0], screen.shape[1], layer, value)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if self._valid(screen, key, entry[0], entry[1], value):
+                self.hits += 1
+                return entry
+            self.invalidations += 1
+            LOGGER.info("Map cache entry %s no longer matches the screen", key)
+        else:
+            self.misses += 1
+        ys, xs = screen_coordinates(observation, layer, value)
+        self.checks.pop(key, None)
+        if len(ys):
+            self.entries[key] = (ys, xs)
+            self.save()
+        return ys, xs
+
+    def report(self):
+        return {'entries': len(self.entries or {}),
+                'hits': self.hits,
+                'invalidations': self.invalidations,
+                'misses': self.misses}
+
+
+STATIC_MAP_CACHE = StaticMapCache()
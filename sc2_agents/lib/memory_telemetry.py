@@ -0,0 +1,192 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Memory-growth telemetry for long-running agents and trainers.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from collections import defaultdict
+from json import dump as json_dump
+from logging import getLogger
+from os import makedirs
+from os import path
+from os import replace
+from os import sysconf
+from threading import Event
+from threading import Thread
+from time import time
+import tracemalloc
+
+LOGGER = getLogger(__name__)
+MEMORY_REPORT = 'memory_report.json'
+PACKAGE_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+
+
+def resident_set_size():
+    """
+    Current resident set size of this process in bytes.
+    Falls back to the peak RSS where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError):
+        from resource import getrusage
+        from resource import RUSAGE_SELF
+        return getrusage(RUSAGE_SELF).ru_maxrss * 1024
+
+
+def module_name(filename):
+    """
+    The dotted module name of a file in sc2_agents, or None.
+    """
+    filename = path.abspath(filename)
+    if not filename.startswith(PACKAGE_DIR + path.sep):
+        return None
+    relative = path.splitext(path.relpath(filename, path.dirname(PACKAGE_DIR)))[0]
+    return relative.replace(path.sep, '.')
+
+
+class MemoryMonitor(object):
+    """
+    Samples the process RSS every `sample_seconds` in the background and,
+    every `snapshot_episodes` episodes, diffs a tracemalloc snapshot
+    against the previous one.
+
+    Each diff lists the `top_n` growth sites twice: by the innermost frame
+    inside sc2_agents (so growth in numpy or gym called from our code is
+    charged to our line) and by the innermost frame overall. A warning is
+    logged whenever RSS grows by more than `alert_bytes_per_episode` per
+    episode between snapshots. The report is written to `report_dir`.
+    """
+
+    def __init__(self, report_dir, sample_seconds=10.0, snapshot_episodes=100, top_n=10,
+                 alert_bytes_per_episode=1 << 20, traceback_frames=16):
+        self.alert_bytes_per_episode = alert_bytes_per_episode
+        self.alerts = []
+        self.episodes = 0
+        self.report_dir = report_dir
+        self.sample_seconds = sample_seconds
+        self.samples = []
+        self.snapshot_episodes = snapshot_episodes
+        self.snapshots = []
+        self.top_n = top_n
+        self.traceback_frames = traceback_frames
+        self._previous = None
+        self._previous_rss = None
+        self._previous_episode = 0
+        self._started_tracing = False
+        self._stop = Event()
+        self._thread = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+            self._started_tracing = True
+        self._previous = self._take_snapshot()
+        self._previous_rss = resident_set_size()
+        self._thread = Thread(target=self._sample, name='memory-monitor')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def _take_snapshot(self):
+        # leave out the monitor's own snapshots and diffs
+        return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, __file__),
+                                                          tracemalloc.Filter(False, tracemalloc.__file__)))
+
+    def _sample(self):
+        start_time = time()
+        while not self._stop.is_set():
+            self.samples.append((time() - start_time, self.episodes, resident_set_size()))
+            self._stop.wait(self.sample_seconds)
+
+    def _growth_sites(self, snapshot):
+        by_package = defaultdict(lambda: [0, 0])
+        by_frame = defaultdict(lambda: [0, 0])
+        for stat in snapshot.compare_to(self._previous, 'traceback'):
+            frames = list(stat.traceback)
+            innermost = frames[-1]
+            by_frame[(innermost.filename, innermost.lineno)][0] += stat.size_diff
+            by_frame[(innermost.filename, innermost.lineno)][1] += stat.count_diff
+            for frame in reversed(frames):
+                module = module_name(frame.filename)
+                if module is not None:
+                    by_package[(module, frame.lineno)][0] += stat.size_diff
+                    by_package[(module, frame.lineno)][1] += stat.count_diff
+                    break
+
+        def top(sites):
+            ranked = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)[:self.top_n]
+            return [{'site': '{}:{}'.format(*site), 'size_diff': size, 'count_diff': count}
+                    for site, (size, count) in ranked if size > 0]
+        return top(by_package), top(by_frame)
+
+    def snapshot(self):
+        snapshot = self._take_snapshot()
+        rss = resident_set_size()
+        episodes = max(self.episodes - self._previous_episode, 1)
+        growth_per_episode = (rss - self._previous_rss) / episodes
+        package_sites, all_sites = self._growth_sites(snapshot)
+        self.snapshots.append({'episode': self.episodes,
+                               'rss': rss,
+                               'growth_per_episode': growth_per_episode,
+                               'sc2_agents_sites': package_sites,
+                               'all_sites': all_sites})
+        if growth_per_episode > self.alert_bytes_per_episode:
+            alert = "RSS grew {:0.1f} KB per episode over episodes {}-{}; top site {}".format(
+                growth_per_episode / 1024, self._previous_episode, self.episodes,
+                package_sites[0]['site'] if package_sites else 'outside sc2_agents')
+            self.alerts.append({'episode': self.episodes, 'message': alert})
+            LOGGER.warning(alert)
+        self._previous = snapshot
+        self._previous_rss = rss
+        self._previous_episode = self.episodes
+        self.write_report()
+
+    def episode_finished(self):
+        self.episodes += 1
+        if self.snapshot_episodes and self.episodes % self.snapshot_episodes == 0:
+            self.snapshot()
+
+    def write_report(self):
+        if not path.isdir(self.report_dir):
+            makedirs(self.report_dir)
+        report_path = path.join(self.report_dir, MEMORY_REPORT)
+        with open(report_path + '.tmp', 'w') as file:
+            json_dump({'alerts': self.alerts,
+                       'episodes': self.episodes,
+                       'rss_samples': self.samples,
+                       'snapshots': self.snapshots}, file, indent=4)
+        replace(report_path + '.tmp', report_path)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._started_tracing:
+            tracemalloc.stop()
+        self.write_report()
+
@@ -0,0 +1,261 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Lightweight training and agent metrics served in the Prometheus text format.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from sc2_agents.lib.agent_wrapper import AgentWrapper
+from threading import Lock
+from threading import Thread
+from time import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(key, str(value).replace('"', '\\"'))
+                          for key, value in sorted(labels.items())) + '}'
+
+
+def _format_value(value):
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+class Counter(object):
+    """
+    A monotonically increasing value. Updates are a single float add and
+    are meant to come from one thread; the scrape thread only reads.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.help_text = help_text
+        self.name = name
+        self.value = 0.0
+
+    def inc(self, value=1.0):
+        self.value += value
+
+    def samples(self):
+        return [(self.name, {}, self.value)]
+
+
+class Gauge(Counter):
+    """
+    A value that can go up and down.
+    """
+
+    kind = 'gauge'
+
+    def set(self, value):
+        self.value = value
+
+
+class Summary(object):
+    """
+    Count, sum and quantiles of observed values. The quantiles are computed
+    at scrape time over the last `window` observations, which are kept in
+    a fixed-size ring so observing never allocates.
+    """
+
+    kind = 'summary'
+
+    def __init__(self, name, help_text, quantiles=(0.5, 0.9, 0.99), window=1024):
+        self.count = 0
+        self.help_text = help_text
+        self.name = name
+        self.quantiles = quantiles
+        self.sum = 0.0
+        self.values = [0.0] * window
+
+    def observe(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self):
+        start_time = time()
+        try:
+            yield
+        finally:
+            self.observe(time() - start_time)
+
+    def samples(self):
+        window = sorted(self.values[:min(self.count, len(self.values))])
+        samples = []
+        for quantile in self.quantiles:
+            value = window[min(int(quantile * len(window)), len(window) - 1)] if window else float('nan')
+            samples.append((self.name, {'quantile': quantile}, value))
+        samples.append((self.name + '_sum', {}, self.sum))
+        samples.append((self.name + '_count', {}, self.count))
+        return samples
+
+
+class Registry(object):
+    """
+    A named collection of metrics. `labels` are attached to every sample,
+    so that a fleet of training boxes can be told apart when scraped.
+    """
+
+    def __init__(self, labels=None):
+        self.labels = dict(labels or {})
+        self.lock = Lock()
+        self.metrics = {}
+
+    def _get(self, metric_class, name, help_text, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, help_text, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise ValueError("Metric {} is already registered as a {}".format(name, metric.kind))
+            return metric
+
+    def counter(self, name, help_text=''):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text=''):
+        return self._get(Gauge, name, help_text)
+
+    def summary(self, name, help_text='', **kwargs):
+        return self._get(Summary, name, help_text, **kwargs)
+
+    def expose(self):
+        with self.lock:
+            metrics = [self.metrics[name] for name in sorted(self.metrics)]
+        lines = []
+        for metric in metrics:
+            lines.append('# HELP {} {}'.format(metric.name, metric.help_text))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.kind))
+            for name, labels, value in metric.samples():
+                all_labels = dict(self.labels)
+                all_labels.update(labels)
+                lines.append('{}{} {}'.format(name, _format_labels(all_labels), _format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class MetricsServer(object):
+    """
+    Serves a registry at http://host:port/metrics from a daemon thread.
+    """
+
+    def __init__(self, registry=REGISTRY, port=9090, host='127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):    # pylint: disable=C0103
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.expose().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer((host, port), Handler)
+        self.thread = Thread(target=self.server.serve_forever, name='metrics-server')
+        self.thread.daemon = True
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TrainingMetrics(object):
+    """
+    The metrics both trainers publish.
+    """
+
+    def __init__(self, registry=REGISTRY):
+        self.checkpoint_seconds = registry.summary(
+            'sc2_agents_checkpoint_seconds', "Time spent saving checkpoints")
+        self.episode_length = registry.summary(
+            'sc2_agents_episode_length', "Timesteps per episode")
+        self.episode_reward = registry.summary(
+            'sc2_agents_episode_reward', "Reward per episode")
+        self.episodes = registry.counter(
+            'sc2_agents_episodes_total', "Finished episodes")
+        self.step_seconds = registry.summary(
+            'sc2_agents_step_seconds', "Latency of one environment step")
+        self.steps = registry.counter(
+            'sc2_agents_steps_total', "Environment steps")
+        self.steps_per_second = registry.gauge(
+            'sc2_agents_steps_per_second', "Environment steps per second since the start of training")
+        self.start_time = time()
+
+    def episode(self, reward, length):
+        self.episodes.inc()
+        self.episode_length.observe(length)
+        self.episode_reward.observe(reward)
+        self.steps.inc(length)
+        self.steps_per_second.set(self.steps.value / max(time() - self.start_time, 1e-9))
+
+
+class MetricsAgent(AgentWrapper):
+    """
+    Publishes the step latency, steps and episode statistics of a pysc2 agent.
+    """
+
+    def __init__(self, agent, registry=REGISTRY):
+        super(MetricsAgent, self).__init__(agent)
+        self.metrics = TrainingMetrics(registry)
+        self.started = False
+
+    def reset(self):
+        if self.started:
+            self.metrics.episode(self.agent.reward, self.agent.steps)
+        self.started = True
+        super(MetricsAgent, self).reset()
+
+    def step(self, timestep):
+        with self.metrics.step_seconds.time():
+            return super(MetricsAgent, self).step(timestep)
@@ -0,0 +1,195 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Latency, memory and throughput profiles of network specs, and the
+choice of the largest network that fits a per-step latency budget.
+
+Specs are profiled with the NumPy networks, and their per-step latency
+is also timed as the TensorForce agent train_agent builds when
+tensorforce can be imported, since that graph is what runs them.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from json import load as json_load
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import percentile as np_percentile
+from numpy import prod as np_prod
+from numpy.random import RandomState
+from sc2_agents.lib.dqn import Adam
+from sc2_agents.lib.dqn import clip_by_global_norm
+from sc2_agents.lib.dqn import QNetwork
+from time import perf_counter
+
+SUPPORTED_LAYERS = ('conv2d', 'dense', 'dueling', 'flatten')
+
+
+def load_network_spec(file_path):
+    """
+    Read a TensorForce network spec, flattening the observation first
+    when the spec has no flatten layer of its own.
+    """
+    with open(file_path, 'r') as file:
+        spec = json_load(file)
+    if not any(layer['type'] == 'flatten' for layer in spec):
+        spec = [dict(type='flatten')] + spec
+    return spec
+
+
+def unsupported_layers(spec):
+    """
+    The layer types in a spec that the NumPy networks cannot evaluate.
+    """
+    return sorted(set(layer['type'] for layer in spec if layer['type'] not in SUPPORTED_LAYERS))
+
+
+def with_output_layer(spec, num_actions):
+    """
+    The spec followed by the linear layer an agent puts on top of its
+    network to produce one output per action.
+    """
+    return list(spec) + [{'type': 'dense', 'size': num_actions, 'activation': 'linear'}]
+
+
+def _timings(function, repeats, warmup=3):
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(repeats):
+        start_time = perf_counter()
+        function()
+        timings.append(perf_counter() - start_time)
+    return timings
+
+
+def _tape_bytes(tape):
+    total = 0
+    for entry in tape:
+        if entry[0] == 'dueling':
+            total += _tape_bytes(entry[1]) + _tape_bytes(entry[2])
+        elif entry[0] != 'flatten':
+            total += entry[2].nbytes + entry[4].nbytes
+    return total
+
+
+def profile_network(spec, input_shape, num_actions, batch_size=32, repeats=50, seed=0):
+    """
+    Profile a network spec with an output layer of `num_actions` on
+    observations of `input_shape`.
+
+    `act_ms_*` times one observation through the network, as an agent
+    does every step; `update_ms_*` times forward and backward passes over
+    a batch; `train_samples_per_second` includes gradient clipping and
+    the Adam update. Memory covers the parameters, the Adam state and
+    the activations kept for the backward pass of one batch.
+    """
+    random = RandomState(seed)
+    network = QNetwork(with_output_layer(spec, num_actions), input_shape=input_shape, seed=seed)
+    optimizer = Adam(network.parameters)
+    observation = random.randint(0, 2, size=(1,) + tuple(input_shape)).astype(np_float32)
+    batch = random.randint(0, 2, size=(batch_size,) + tuple(input_shape)).astype(np_float32)
+    output_gradients = random.normal(size=(batch_size, num_actions)).astype(np_float32)
+
+    def update():
+        _, tape = network.forward(batch)
+        return network.backward(tape, output_gradients)
+
+    def train():
+        gradients = update()
+        clip_by_global_norm(gradients, 10.0)
+        optimizer.step(gradients)
+
+    act = _timings(lambda: network.q_values(observation), repeats)
+    updates = _timings(update, max(repeats // 5, 3))
+    trains = _timings(train, max(repeats // 5, 3))
+    _, tape = network.forward(batch)
+    return {'parameters': int(network.parameters.size),
+            'parameter_bytes': int(network.parameters.nbytes),
+            'optimizer_bytes': int(optimizer.mean.nbytes + optimizer.variance.nbytes + optimizer.scratch.nbytes),
+            'activation_bytes': _tape_bytes(tape),
+            'act_ms_p50': 1000 * float(np_percentile(act, 50)),
+            'act_ms_p99': 1000 * float(np_percentile(act, 99)),
+            'update_ms_p50': 1000 * float(np_percentile(updates, 50)),
+            'train_samples_per_second': batch_size / float(np_percentile(trains, 50)),
+            'batch_size': batch_size,
+            'input_shape': list(input_shape),
+            'num_actions': num_actions}
+
+
+def tensorforce_available():
+    try:
+        import tensorforce    # pylint: disable=W0611
+    except ImportError:
+        return False
+    return True
+
+
+def profile_tensorforce(spec, input_shape, num_actions, repeats=50, agent_config=None, seed=0, warmup=3):
+    """
+    Time a network spec as a TensorForce agent (PPO unless `agent_config`
+    says otherwise) acting on observations of `input_shape` with
+    `num_actions` actions: `act_ms_*` times `act` and `observe_ms_*` the
+    `observe` that follows it every step, including the updates it runs.
+    `parameters` counts the variables of the agent's model.
+    """
+    from tensorforce.agents import Agent
+    random = RandomState(seed)
+    agent = Agent.from_spec(
+        spec=dict(agent_config or dict(type='ppo_agent')),
+        kwargs=dict(states=dict(type='float', shape=tuple(input_shape)),
+                    actions=dict(type='int', num_actions=num_actions),
+                    network=spec))
+    try:
+        acts, observes = [], []
+        for step in range(warmup + repeats):
+            observation = random.randint(0, 2, size=tuple(input_shape)).astype(np_float32)
+            start_time = perf_counter()
+            agent.act(states=observation)
+            act_time = perf_counter()
+            agent.observe(terminal=False, reward=0.0)
+            if step >= warmup:
+                acts.append(act_time - start_time)
+                observes.append(perf_counter() - act_time)
+        parameters = sum(int(np_prod(variable.get_shape().as_list()))
+                         for variable in agent.model.get_variables(include_submodules=True))
+    finally:
+        agent.close()
+    return {'parameters': parameters,
+            'act_ms_p50': 1000 * float(np_percentile(acts, 50)),
+            'act_ms_p99': 1000 * float(np_percentile(acts, 99)),
+            'observe_ms_p50': 1000 * float(np_percentile(observes, 50)),
+            'observe_ms_p99': 1000 * float(np_percentile(observes, 99)),
+            'input_shape': list(input_shape),
+            'num_actions': num_actions}
+
+
+def select_network(profiles, budget_seconds, latency='act_ms_p99'):
+    """
+    The name of the profile with the most parameters whose `latency` fits
+    in `budget_seconds`, or None when none does. `profiles` maps names to
+    profile_network results.
+    """
+    fitting = [(profile['parameters'], name) for name, profile in profiles.items()
+               if profile[latency] <= 1000 * budget_seconds]
+    return max(fitting)[1] if fitting else None
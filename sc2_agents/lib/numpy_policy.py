@@ -0,0 +1,231 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+A TensorFlow-free forward pass for trained coordinate policies.
+
+A policy is a list of layers in the same format as the TensorForce
+network specs in bin/tensorforce/network_configs, plus an optional
+'dueling' layer, stored with its weights in a single .npz file.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from json import dumps as json_dumps
+from json import loads as json_loads
+from numpy import asarray as np_asarray
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import load as np_load
+from numpy import maximum as np_maximum
+from numpy import pad as np_pad
+from numpy import savez as np_savez
+from numpy import tanh as np_tanh
+from numpy.lib.stride_tricks import as_strided
+
+ACTIVATIONS = {'linear': lambda x: x,
+               'none': lambda x: x,
+               'relu': lambda x: np_maximum(x, 0),
+               'tanh': np_tanh}
+DEFAULT_ACTIVATIONS = {'conv2d': 'relu', 'dense': 'relu'}
+
+
+def _padding(size, window, stride, padding):
+    if padding.upper() == 'VALID':
+        return 0, 0
+    total = max((-(-size // stride) - 1) * stride + window - size, 0)
+    return total // 2, total - total // 2
+
+
+def image_patches(inputs, window, stride=1, padding='SAME'):
+    """
+    A read-only (batch, out_h, out_w, window * window * channels) view of
+    the patches a convolution of NHWC inputs multiplies with its kernel,
+    padded the way TensorFlow pads.
+    """
+    pad_h = _padding(inputs.shape[1], window, stride, padding)
+    pad_w = _padding(inputs.shape[2], window, stride, padding)
+    if any(pad_h + pad_w):
+        inputs = np_pad(inputs, ((0, 0), pad_h, pad_w, (0, 0)), mode='constant')
+    batch, height, width, channels = inputs.shape
+    out_h = (height - window) // stride + 1
+    out_w = (width - window) // stride + 1
+    s_b, s_h, s_w, s_c = inputs.strides
+    patches = as_strided(inputs,
+                         shape=(batch, out_h, out_w, window, window, channels),
+                         strides=(s_b, s_h * stride, s_w * stride, s_h, s_w, s_c),
+                         writeable=False)
+    return patches.reshape(batch, out_h, out_w, -1)
+
+
+def conv2d(inputs, kernel, bias, stride=1, padding='SAME'):
+    """
+    A 2D convolution of NHWC inputs with a square HWIO kernel.
+    """
+    patches = image_patches(inputs, kernel.shape[0], stride, padding)
+    # a 2D product runs on BLAS, a 4D one does not
+    outputs = patches.reshape(-1, patches.shape[-1]).dot(kernel.reshape(-1, kernel.shape[-1])) + bias
+    return outputs.reshape(patches.shape[:3] + (kernel.shape[-1],))
+
+
+class NumpyPolicy(object):
+    """
+    Evaluates a layer spec with NumPy. Calling the policy with a batch of
+    observations returns the argmax action of each, like a deepq `act`.
+
+    `weights` holds one kernel and one bias per conv2d or dense layer in
+    spec order; a dueling layer holds those of its advantage branch and
+    then of its value branch. Inputs without a channel axis are given one
+    before the first convolution.
+    """
+
+    def __init__(self, spec, weights, input_shape=None):
+        self.spec = spec
+        self.input_shape = tuple(int(size) for size in input_shape) if input_shape is not None else None
+        self.weights = [(np_asarray(kernel, dtype=np_float32), np_asarray(bias, dtype=np_float32))
+                        for kernel, bias in weights]
+        expected = parameter_count(spec)
+        if expected != len(self.weights):
+            raise ValueError("The spec has {} weighted layers but {} were given".format(expected, len(self.weights)))
+
+    def _layer(self, index, layer, inputs):
+        kernel, bias = self.weights[index]
+        if layer['type'] == 'conv2d':
+            return conv2d(inputs, kernel, bias, layer.get('stride', 1), layer.get('padding', 'SAME'))
+        return inputs.dot(kernel) + bias
+
+    def _forward(self, layers, outputs, indices):
+        for layer in layers:
+            kind = layer['type']
+            if kind == 'flatten':
+                outputs = outputs.reshape(len(outputs), -1)
+            elif kind in ('conv2d', 'dense'):
+                if kind == 'conv2d' and outputs.ndim == 3:
+                    outputs = outputs[..., None]
+                elif kind == 'dense' and outputs.ndim > 2:
+                    outputs = outputs.reshape(len(outputs), -1)
+                outputs = self._layer(next(indices), layer, outputs)
+                outputs = ACTIVATIONS[layer.get('activation', DEFAULT_ACTIVATIONS[kind])](outputs)
+            elif kind == 'dueling':
+                advantages = self._forward(layer['advantage'], outputs, indices)
+                values = self._forward(layer['value'], outputs, indices)
+                outputs = values + advantages - advantages.mean(axis=1, keepdims=True)
+            else:
+                raise ValueError("Unsupported layer type {}".format(kind))
+        return outputs
+
+    def q_values(self, observations):
+        return self._forward(self.spec, np_asarray(observations, dtype=np_float32), iter(range(parameter_count(self.spec))))
+
+    def __call__(self, observations):
+        return self.q_values(observations).argmax(axis=1)
+
+    def save(self, path):
+        arrays = {'spec': json_dumps(self.spec)}
+        if self.input_shape is not None:
+            arrays['input_shape'] = self.input_shape
+        for index, (kernel, bias) in enumerate(self.weights):
+            arrays['kernel_{:03d}'.format(index)] = kernel
+            arrays['bias_{:03d}'.format(index)] = bias
+        np_savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np_load(path) as data:
+            spec = json_loads(str(data['spec']))
+            weights = [(data['kernel_{:03d}'.format(i)], data['bias_{:03d}'.format(i)])
+                       for i in range(parameter_count(spec))]
+            input_shape = data['input_shape'] if 'input_shape' in data else None
+        return cls(spec, weights, input_shape)
+
+
+def parameter_count(layers):
+    """
+    The number of (kernel, bias) pairs a layer spec consumes.
+    """
+    count = 0
+    for layer in layers:
+        if layer['type'] in ('conv2d', 'dense'):
+            count += 1
+        elif layer['type'] == 'dueling':
+            count += parameter_count(layer['advantage']) + parameter_count(layer['value'])
+    return count
+
+
+def parameter_shapes(layers, input_shape):
+    """
+    The expected (kernel shape, bias shape) of each weighted layer for
+    observations of `input_shape`, in the order NumpyPolicy consumes them.
+    """
+    shapes = []
+
+    def walk(layers, shape):
+        for layer in layers:
+            kind = layer['type']
+            if kind == 'flatten':
+                shape = (int(_product(shape)),)
+            elif kind == 'conv2d':
+                if len(shape) == 2:
+                    shape = shape + (1,)
+                window, stride = layer['window'], layer.get('stride', 1)
+                height, width = shape[:2]
+                if layer.get('padding', 'SAME').upper() == 'VALID':
+                    height, width = (height - window) // stride + 1, (width - window) // stride + 1
+                else:
+                    height, width = -(-height // stride), -(-width // stride)
+                shapes.append(((window, window, shape[2], layer['size']), (layer['size'],)))
+                shape = (height, width, layer['size'])
+            elif kind == 'dense':
+                inputs = int(_product(shape))
+                shapes.append(((inputs, layer['size']), (layer['size'],)))
+                shape = (layer['size'],)
+            elif kind == 'dueling':
+                advantage_shape = walk(layer['advantage'], shape)
+                walk(layer['value'], shape)
+                shape = advantage_shape
+        return shape
+
+    walk(layers, tuple(input_shape))
+    return shapes
+
+
+def _product(shape):
+    result = 1
+    for size in shape:
+        result *= size
+    return result
+
+
+def load_policy(path):
+    """
+    Load a coordinate policy: a NumpyPolicy or QuantizedPolicy for .npz
+    weight files and a baselines deepq act function otherwise.
+    """
+    if path.endswith('.npz'):
+        with np_load(path) as data:
+            quantized = 'input_scale_000' in data
+        if quantized:
+            from sc2_agents.lib.quantization import QuantizedPolicy
+            return QuantizedPolicy.load(path)
+        return NumpyPolicy.load(path)
+    from baselines.deepq.simple import load
+    return load(path)
@@ -0,0 +1,176 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Pipelined stepping of several environments, overlapping the agent's
+inference for one group of environments with the simulation of another.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from concurrent.futures import ThreadPoolExecutor
+from numpy import array as np_array
+from timeit import default_timer
+
+
+class PipelinedRunner(object):
+    """
+    Steps `envs` in `groups` groups that take turns: while the
+    environments of one group simulate their step, `act` chooses the
+    actions of the group whose observations just arrived. Each group's
+    timesteps are a buffer of their own, so the agent reads one group's
+    observations while the other group's are being written.
+
+    `act` maps the indices of a group's environments and their timesteps
+    to one action per environment. With groups=1 the runner is the strict
+    loop that alternates between stepping every environment and acting.
+
+    An environment whose episode ended is reset in its next turn instead
+    of stepped; its reset timestep goes to `act` like any other.
+    """
+
+    def __init__(self, envs, act, groups=2):
+        if not 1 <= groups <= len(envs):
+            raise ValueError("groups must be between 1 and the number of environments")
+        self.act = act
+        self.envs = envs
+        self.groups = [list(range(len(envs)))[group::groups] for group in range(groups)]
+        self.executor = ThreadPoolExecutor(len(envs))
+        self.futures = None
+        self.rewards = [0.0] * len(envs)
+        self.turn = 0
+        self.reset_report()
+
+    def reset_report(self):
+        self.act_seconds = 0.0
+        self.env_seconds = 0.0
+        self.episode_rewards = []
+        self.steps = 0
+        self.wall_seconds = 0.0
+
+    def _env_step(self, index, timestep, action):
+        start_time = default_timer()
+        env = self.envs[index]
+        timestep = env.reset()[0] if timestep is None or timestep.last() else env.step([action])[0]
+        return timestep, default_timer() - start_time
+
+    def _submit(self, group, timesteps, actions):
+        return [self.executor.submit(self._env_step, index, timestep, action)
+                for index, timestep, action in zip(group, timesteps, actions)]
+
+    def _wait(self, futures):
+        results = [future.result() for future in futures]
+        self.env_seconds += sum(seconds for _, seconds in results)
+        return [timestep for timestep, _ in results]
+
+    def run(self, steps):
+        """
+        Run until at least `steps` environment steps have been taken. The
+        environments are reset by the first run and keep stepping in the
+        background between runs.
+        """
+        start_time = default_timer()
+        if self.futures is None:
+            self.futures = [self._submit(group, [None] * len(group), [None] * len(group)) for group in self.groups]
+        taken = 0
+        while taken < steps:
+            turn = self.turn % len(self.groups)
+            group = self.groups[turn]
+            timesteps = self._wait(self.futures[turn])
+            for index, timestep in zip(group, timesteps):
+                if not timestep.first():
+                    self.rewards[index] += timestep.reward
+                    taken += 1
+                if timestep.last():
+                    self.episode_rewards.append(self.rewards[index])
+                    self.rewards[index] = 0.0
+            act_time = default_timer()
+            actions = self.act(group, timesteps)
+            self.act_seconds += default_timer() - act_time
+            self.futures[turn] = self._submit(group, timesteps, actions)
+            self.turn += 1
+        self.steps += taken
+        self.wall_seconds += default_timer() - start_time
+        return self
+
+    def run_episodes(self, episodes):
+        """
+        Run until at least `episodes` episodes have ended since the report
+        was reset.
+        """
+        while len(self.episode_rewards) < episodes:
+            self.run(len(self.envs))
+        return self
+
+    def close(self):
+        for futures in self.futures or []:
+            for future in futures:
+                future.result()
+        self.executor.shutdown()
+        for env in self.envs:
+            env.close()
+
+    def report(self):
+        """
+        Throughput, and the share of the wall time the agent and the
+        environments were busy.
+        """
+        wall_seconds = max(self.wall_seconds, 1e-9)
+        return {'act_seconds': self.act_seconds,
+                'act_utilization': self.act_seconds / wall_seconds,
+                'env_seconds': self.env_seconds,
+                'env_utilization': self.env_seconds / (wall_seconds * len(self.envs)),
+                'episodes': len(self.episode_rewards),
+                'groups': len(self.groups),
+                'steps': self.steps,
+                'steps_per_second': self.steps / wall_seconds,
+                'wall_seconds': self.wall_seconds}
+
+
+def agent_actor(agents):
+    """
+    An `act` function for pysc2 agents, one per environment, that resets
+    an agent at the first timestep of each of its episodes like pysc2's
+    run_loop.
+    """
+    def act(indices, timesteps):
+        actions = []
+        for index, timestep in zip(indices, timesteps):
+            agent = agents[index]
+            if timestep.first():
+                agent.reset()
+            actions.append(agent.step(timestep))
+        return actions
+    return act
+
+
+def coordinate_actor(act_x, act_y, player_neutral=3):
+    """
+    An `act` function that runs a pair of coordinate policies on the
+    screens of a whole group in one batch and returns (x, y) targets.
+    """
+    def act(indices, timesteps):
+        screens = np_array([timestep.observation.feature_screen.player_relative == player_neutral
+                            for timestep in timesteps], dtype='float32')
+        return list(zip(act_x(screens).tolist(), act_y(screens).tolist()))
+    return act
@@ -0,0 +1,237 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Offline diagnostics for act_x/act_y coordinate policies: the policies
+are run over batches of synthetic screens with the beacon (or a mineral
+shard) at every screen position, and how well they target it (or any
+shard) is summarised as heatmaps over those positions.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from json import dump as json_dump
+from logging import getLogger
+from numpy import arange as np_arange
+from numpy import bincount as np_bincount
+from numpy import clip as np_clip
+from numpy import concatenate as np_concatenate
+from numpy import empty as np_empty
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import full as np_full
+from numpy import hypot as np_hypot
+from numpy import isnan as np_isnan
+from numpy import meshgrid as np_meshgrid
+from numpy import nan as np_nan
+from numpy import nanmax as np_nanmax
+from numpy import nanmin as np_nanmin
+from numpy import percentile as np_percentile
+from numpy import savez_compressed as np_savez_compressed
+from numpy import stack as np_stack
+from numpy import uint8 as np_uint8    # pylint: disable=E0611
+from numpy import zeros as np_zeros
+from numpy.random import RandomState
+from os import makedirs
+from os import path
+from sc2_agents.lib.synthetic_screens import mineral_shards_screen
+from sc2_agents.lib.synthetic_screens import move_to_beacon_screen
+from sc2_agents.lib.synthetic_screens import PLAYER_NEUTRAL
+from sc2_agents.lib.synthetic_screens import unit_radius
+from struct import pack
+from time import perf_counter
+from zlib import compress
+from zlib import crc32
+
+LOGGER = getLogger(__name__)
+HEATMAPS = ('accuracy', 'error', 'error_x', 'error_y')
+
+
+def probe_positions(screen_size, margin=None, stride=1):
+    """
+    The (x, y) screen positions to place the probed beacon or shard at.
+    """
+    if margin is None:
+        margin = unit_radius(screen_size, 3)
+    axis = np_arange(margin, screen_size - margin, stride)
+    xs, ys = np_meshgrid(axis, axis)
+    return np_stack([xs.reshape(-1), ys.reshape(-1)], axis=1)
+
+
+def diagnostic_screens(map_name, screen_size, probes, random, shards=20):
+    """
+    player_relative screens with the beacon, or one of `shards` mineral
+    shards, at each probe position and the marine(s) elsewhere at random.
+    Returns the screens and, for each, the (x, y) positions of every unit
+    the policy may target: the beacon, or all the shards.
+
+    The policies only see the neutral units, so the targets are exactly
+    those; which shard the marine would reach first is not part of what
+    they are given. With `shards=1` the probed shard is the only target.
+    """
+    margin = unit_radius(screen_size, 3)
+    count = 1 if map_name == 'MoveToBeacon' else shards
+    screens = np_empty((len(probes), screen_size, screen_size), dtype=np_float32)
+    targets = np_empty((len(probes), count, 2), dtype=np_float32)
+    for index, probe in enumerate(probes):
+        marine = random.uniform(margin, screen_size - margin, size=2)
+        if map_name == 'MoveToBeacon':
+            screens[index] = move_to_beacon_screen(screen_size, probe, marine)
+            targets[index, 0] = probe
+        elif map_name == 'CollectMineralShards':
+            others = random.uniform(margin, screen_size - margin, size=(shards - 1, 2))
+            positions = np_concatenate([probe[None].astype(float), others])
+            screens[index] = mineral_shards_screen(screen_size, positions, [marine])
+            targets[index] = positions
+        else:
+            raise ValueError("No synthetic screens for map {}".format(map_name))
+    return screens, targets
+
+
+def coordinate_predictions(act_x, act_y, screens, player_neutral=PLAYER_NEUTRAL, batch_size=256):
+    """
+    The (x, y) each policy pair picks for a batch of player_relative
+    screens, fed the way MoveToBeaconAgent002 feeds them.
+    """
+    predictions = np_empty((len(screens), 2), dtype=np_float32)
+    for start in range(0, len(screens), batch_size):
+        inputs = (screens[start:start + batch_size] == player_neutral).astype(np_float32)
+        predictions[start:start + batch_size, 0] = act_x(inputs)
+        predictions[start:start + batch_size, 1] = act_y(inputs)
+    return predictions
+
+
+def diagnose(act_x, act_y, map_name='MoveToBeacon', screen_size=64, samples=1, stride=1, shards=20,
+             reach=None, batch_size=256, player_neutral=PLAYER_NEUTRAL, seed=0):
+    """
+    Run a policy pair over `samples` synthetic screens per probe position.
+
+    A prediction counts as accurate when it lands within `reach` pixels of
+    a target, the distance at which the stand-in minigame scores, and its
+    error is measured to the nearest target (see diagnostic_screens). The
+    returned heatmaps are indexed [y, x] by probe position and are NaN
+    where nothing was probed: `accuracy` is the fraction of accurate
+    predictions, `error` the mean distance to the target and
+    `error_x`/`error_y` the mean signed error on each axis.
+    """
+    reach = reach or 2 * unit_radius(screen_size, 2)
+    random = RandomState(seed)
+    probes = probe_positions(screen_size, stride=stride)
+    cells = probes[:, 1] * screen_size + probes[:, 0]
+    sums = {name: np_zeros(screen_size * screen_size) for name in HEATMAPS}
+    counts = np_zeros(screen_size * screen_size)
+    errors = []
+    generate_seconds = inference_seconds = 0.0
+    chunk = max(1, batch_size // samples)
+    for start in range(0, len(probes), chunk):
+        start_time = perf_counter()
+        chunk_probes = probes[start:start + chunk].repeat(samples, axis=0)
+        chunk_cells = cells[start:start + chunk].repeat(samples)
+        screens, targets = diagnostic_screens(map_name, screen_size, chunk_probes, random, shards)
+        generate_seconds += perf_counter() - start_time
+        start_time = perf_counter()
+        predictions = coordinate_predictions(act_x, act_y, screens, player_neutral, batch_size)
+        inference_seconds += perf_counter() - start_time
+        target_offsets = predictions[:, None] - targets
+        nearest = np_hypot(target_offsets[..., 0], target_offsets[..., 1]).argmin(axis=1)
+        offsets = target_offsets[np_arange(len(predictions)), nearest]
+        distances = np_hypot(offsets[:, 0], offsets[:, 1])
+        for name, values in (('accuracy', distances <= reach),
+                             ('error', distances),
+                             ('error_x', offsets[:, 0]),
+                             ('error_y', offsets[:, 1])):
+            sums[name] += np_bincount(chunk_cells, weights=values, minlength=len(counts))
+        counts += np_bincount(chunk_cells, minlength=len(counts))
+        errors.append(distances)
+    errors = np_concatenate(errors)
+    probed = counts > 0
+    heatmaps = {}
+    for name in HEATMAPS:
+        heatmap = np_full(len(counts), np_nan)
+        heatmap[probed] = sums[name][probed] / counts[probed]
+        heatmaps[name] = heatmap.reshape(screen_size, screen_size)
+    summary = {'map_name': map_name,
+               'screen_size': screen_size,
+               'positions': len(probes),
+               'screens': len(errors),
+               'reach': reach,
+               'accuracy': float((errors <= reach).mean()),
+               'error_mean': float(errors.mean()),
+               'error_p50': float(np_percentile(errors, 50)),
+               'error_p90': float(np_percentile(errors, 90)),
+               'worst_accuracy': float(heatmaps['accuracy'][probed.reshape(screen_size, screen_size)].min()),
+               'generate_seconds': generate_seconds,
+               'inference_seconds': inference_seconds,
+               'screens_per_second': len(errors) / inference_seconds if inference_seconds else 0.0}
+    return heatmaps, summary
+
+
+def colorize(heatmap, low=None, high=None):
+    """
+    An (height, width, 3) uint8 image of a heatmap, blue for `low` through
+    red for `high`, with unprobed (NaN) cells black.
+    """
+    low = float(np_nanmin(heatmap)) if low is None else low
+    high = float(np_nanmax(heatmap)) if high is None else high
+    scaled = np_clip((heatmap - low) / ((high - low) or 1.0), 0.0, 1.0)
+    image = np_stack([scaled, 1.0 - 2.0 * abs(scaled - 0.5), 1.0 - scaled], axis=-1)
+    image[np_isnan(heatmap)] = 0.0
+    return (255 * image).astype(np_uint8)
+
+
+def write_png(file_path, image, scale=1):
+    """
+    Write an (height, width, 3) uint8 image as an RGB PNG, each pixel
+    enlarged to a `scale` x `scale` block.
+    """
+    image = image.repeat(scale, axis=0).repeat(scale, axis=1)
+    height, width = image.shape[:2]
+    rows = np_concatenate([np_zeros((height, 1), dtype=np_uint8), image.reshape(height, -1)], axis=1)
+
+    def chunk(kind, data):
+        return pack('>I', len(data)) + kind + data + pack('>I', crc32(kind + data) & 0xFFFFFFFF)
+
+    with open(file_path, 'wb') as file:
+        file.write(b'\x89PNG\r\n\x1a\n')
+        file.write(chunk(b'IHDR', pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        file.write(chunk(b'IDAT', compress(rows.tobytes(), 9)))
+        file.write(chunk(b'IEND', b''))
+
+
+def save_diagnostics(heatmaps, summary, directory, scale=8):
+    """
+    Write the heatmaps to diagnostics.npz, one PNG per heatmap and the
+    summary to diagnostics.json.
+    """
+    if not path.isdir(directory):
+        makedirs(directory)
+    np_savez_compressed(path.join(directory, 'diagnostics.npz'), **heatmaps)
+    reach = summary['reach']
+    ranges = {'accuracy': (0.0, 1.0),
+              'error': (0.0, 4.0 * reach),
+              'error_x': (-2.0 * reach, 2.0 * reach),
+              'error_y': (-2.0 * reach, 2.0 * reach)}
+    for name, heatmap in heatmaps.items():
+        write_png(path.join(directory, name + '.png'), colorize(heatmap, *ranges[name]), scale)
+    with open(path.join(directory, 'diagnostics.json'), 'w') as file:
+        json_dump(summary, file, indent=2, sort_keys=True)
+    LOGGER.info("Wrote diagnostics for {} screens to {}".format(summary['screens'], directory))
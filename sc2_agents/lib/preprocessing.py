@@ -0,0 +1,171 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Observation preprocessing between the gym environments and the agents:
+cropping to a region of interest and downsampling of the screen, with
+actions mapped back to screen coordinates.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from numpy import asarray as np_asarray
+
+
+class ScreenTransform(object):
+    """
+    Crops a (height, width[, channels]) screen to `crop` = (x0, y0, x1, y1)
+    and then reduces it by `factor` in each direction, either keeping the
+    maximum of each factor x factor block (mode 'max', which keeps a unit
+    of a binary mask visible however small it is) or every factor-th pixel
+    (mode 'stride'). Crop sizes that are not a multiple of the factor are
+    trimmed at the bottom and right.
+
+    A point of the reduced screen maps back to the centre of the block it
+    covers on the full screen.
+    """
+
+    def __init__(self, screen_size, crop=None, factor=1, mode='max'):
+        if mode not in ('max', 'stride'):
+            raise ValueError("Unknown downsampling mode {}".format(mode))
+        x0, y0, x1, y1 = crop or (0, 0, screen_size, screen_size)
+        if not 0 <= x0 < x1 <= screen_size or not 0 <= y0 < y1 <= screen_size:
+            raise ValueError("Crop {} does not fit a {}x{} screen".format(crop, screen_size, screen_size))
+        self.crop = (x0, y0, x1, y1)
+        self.factor = factor
+        self.mode = mode
+        self.screen_size = screen_size
+        self.height = (y1 - y0) // factor
+        self.width = (x1 - x0) // factor
+
+    @property
+    def shape(self):
+        return self.height, self.width
+
+    def observation(self, screen):
+        x0, y0 = self.crop[:2]
+        screen = np_asarray(screen)[y0:y0 + self.height * self.factor, x0:x0 + self.width * self.factor]
+        if self.factor == 1:
+            return screen
+        if self.mode == 'stride':
+            return screen[::self.factor, ::self.factor]
+        blocks = screen.reshape((self.height, self.factor, self.width, self.factor) + screen.shape[2:])
+        return blocks.max(axis=(1, 3))
+
+    def screen_point(self, x, y):
+        """
+        Full-screen (x, y) of a point of the reduced screen.
+        """
+        x = min(max(int(x), 0), self.width - 1)
+        y = min(max(int(y), 0), self.height - 1)
+        return (self.crop[0] + x * self.factor + self.factor // 2,
+                self.crop[1] + y * self.factor + self.factor // 2)
+
+    def reduced_point(self, x, y):
+        """
+        Reduced-screen (x, y) of a full-screen point, clipped to the crop.
+        """
+        x = (int(x) - self.crop[0]) // self.factor
+        y = (int(y) - self.crop[1]) // self.factor
+        return min(max(x, 0), self.width - 1), min(max(y, 0), self.height - 1)
+
+    def report(self):
+        return {'crop': self.crop,
+                'factor': self.factor,
+                'mode': self.mode,
+                'pixel_fraction': self.height * self.width / self.screen_size ** 2,
+                'shape': self.shape}
+
+
+class PreprocessingWrapper(object):
+    """
+    Applies a ScreenTransform to the observations of a gym environment
+    whose observations are screens, and maps the actions of the reduced
+    screen back to the full screen.
+
+    Discrete action spaces are taken to index the screen row by row
+    (y * screen_size + x); MultiDiscrete, Tuple and Box action spaces are
+    taken to hold an (x, y) pair. Any other attribute is looked up on the
+    wrapped environment.
+    """
+
+    def __init__(self, env, transform):
+        from gym import spaces
+        self.env = env
+        self.transform = transform
+        observation_space = env.observation_space
+        self.observation_space = spaces.Box(low=transform.observation(observation_space.low),
+                                            high=transform.observation(observation_space.high))
+        if observation_space.shape[:2] != (transform.screen_size, transform.screen_size):
+            raise ValueError("Expected {0}x{0} screens, got {1}".format(transform.screen_size, observation_space.shape))
+        action_space = env.action_space
+        height, width = transform.shape
+        if isinstance(action_space, spaces.Discrete):
+            self.action_space = spaces.Discrete(height * width)
+            self.pair_actions = False
+        elif isinstance(action_space, spaces.MultiDiscrete):
+            self.action_space = spaces.MultiDiscrete([width, height])
+            self.pair_actions = True
+        elif isinstance(action_space, spaces.Tuple):
+            self.action_space = spaces.Tuple((spaces.Discrete(width), spaces.Discrete(height)))
+            self.pair_actions = True
+        elif isinstance(action_space, spaces.Box):
+            self.action_space = spaces.Box(low=0, high=max(width, height) - 1, shape=(2,))
+            self.pair_actions = True
+        else:
+            raise ValueError("Cannot map actions of space {}".format(action_space))
+
+    def __getattr__(self, name):
+        if name == 'env':
+            raise AttributeError(name)
+        return getattr(self.env, name)
+
+    def action(self, action):
+        if self.pair_actions:
+            x, y = self.transform.screen_point(action[0], action[1])
+            return type(action)((x, y)) if isinstance(action, (list, tuple)) else np_asarray((x, y))
+        y, x = divmod(int(action), self.transform.width)
+        x, y = self.transform.screen_point(x, y)
+        return y * self.transform.screen_size + x
+
+    def reset(self, **kwargs):
+        return self.transform.observation(self.env.reset(**kwargs))
+
+    def step(self, action):
+        observation, reward, done, info = self.env.step(self.action(action))
+        return self.transform.observation(observation), reward, done, info
+
+    def close(self):
+        return self.env.close()
+
+
+def preprocess_env(env, crop=None, factor=1, mode='max'):
+    """
+    Wrap a gym environment of square screens, or return it unchanged
+    when neither cropping nor downsampling is asked for.
+    """
+    if not crop and factor == 1:
+        return env
+    screen_size = env.observation_space.shape[0]
+    crop = tuple(int(value) for value in crop) if crop else None
+    return PreprocessingWrapper(env, ScreenTransform(screen_size, crop=crop, factor=factor, mode=mode))
@@ -0,0 +1,196 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Post-training int8 quantization of NumpyPolicy coordinate policies.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from json import dumps as json_dumps
+from json import loads as json_loads
+from numpy import abs as np_abs
+from numpy import asarray as np_asarray
+from numpy import clip as np_clip
+from numpy import count_nonzero as np_count_nonzero
+from numpy import flatnonzero as np_flatnonzero
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import float64 as np_float64    # pylint: disable=E0611
+from numpy import int32 as np_int32    # pylint: disable=E0611
+from numpy import int8 as np_int8    # pylint: disable=E0611
+from numpy import load as np_load
+from numpy import percentile as np_percentile
+from numpy import rint as np_rint
+from numpy import savez as np_savez
+from numpy import searchsorted as np_searchsorted
+from numpy import zeros as np_zeros
+from sc2_agents.lib.numpy_policy import image_patches
+from sc2_agents.lib.numpy_policy import NumpyPolicy
+from sc2_agents.lib.numpy_policy import parameter_count
+
+
+def quantize_kernel(kernel):
+    """
+    Symmetric int8 quantization with one scale per output channel.
+    """
+    scale = np_abs(kernel.reshape(-1, kernel.shape[-1])).max(axis=0) / 127
+    scale[scale == 0] = 1
+    return np_clip(np_rint(kernel / scale), -127, 127).astype(np_int8), scale.astype(np_float32)
+
+
+def accumulation_kernel(kernel_q):
+    """
+    The int8 kernel as the 2D float32 matrix its layer multiplies with,
+    and the bounds of the blocks of rows whose products are summed in
+    float32. Within a block every output stays below 2 ** 24 for inputs
+    in [-127, 127], so float32 holds each partial sum exactly; the blocks
+    are added in float64.
+    """
+    matrix = kernel_q.reshape(-1, kernel_q.shape[-1]).astype(np_float32)
+    bounds, totals = [0], np_zeros(matrix.shape[1], dtype=np_float64)
+    for row, weights in enumerate(np_abs(matrix)):
+        totals += weights
+        if 127 * totals.max() >= 2 ** 24:
+            bounds.append(row)
+            totals = weights.astype(np_float64)
+    bounds.append(len(matrix))
+    return matrix, np_asarray(bounds)
+
+
+def block_dot(inputs, kernel, bounds):
+    """
+    inputs.dot(kernel) summed block by block as accumulation_kernel's
+    bounds say.
+    """
+    if len(bounds) == 2:
+        return inputs.dot(kernel)
+    outputs = 0
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        outputs = outputs + inputs[:, start:stop].dot(kernel[start:stop]).astype(np_float64)
+    return outputs
+
+
+class _Calibration(NumpyPolicy):
+    """
+    Records the input range of every weighted layer over the calibration
+    observations.
+    """
+
+    def __init__(self, policy, percentile):
+        super(_Calibration, self).__init__(policy.spec, policy.weights, policy.input_shape)
+        self.input_ranges = [0.0] * len(self.weights)
+        self.percentile = percentile
+
+    def _layer(self, index, layer, inputs):
+        self.input_ranges[index] = max(self.input_ranges[index], float(np_percentile(np_abs(inputs), self.percentile)))
+        return super(_Calibration, self)._layer(index, layer, inputs)
+
+
+class QuantizedPolicy(NumpyPolicy):
+    """
+    A NumpyPolicy whose conv2d and dense layers run on int8 weights and
+    int8 inputs with exact integer accumulation, rescaled to float32
+    between layers. Kernels use one scale per output channel and inputs
+    one scale per layer, taken from calibration observations.
+
+    NumPy has no int8 matrix kernels and its integer products do not run
+    on BLAS, so each kernel is prepared once as a float32 matrix holding
+    its int8 values and multiplied in blocks small enough for the sums to
+    stay exact (see accumulation_kernel). Inputs are quantized before the
+    convolution patches are taken. A dense layer whose quantized inputs
+    are mostly zero, such as one reading a binary screen, multiplies only
+    the kernel rows of the inputs set anywhere in the batch, in one
+    product.
+    """
+
+    def __init__(self, spec, layers, input_shape=None, sparse_fraction=0.25):
+        if parameter_count(spec) != len(layers):
+            raise ValueError("The spec has {} weighted layers but {} were given".format(
+                parameter_count(spec), len(layers)))
+        self.input_shape = tuple(int(size) for size in input_shape) if input_shape is not None else None
+        self.layers = [(kernel_q, kernel_scale, bias, input_scale) + accumulation_kernel(kernel_q)
+                       for kernel_q, kernel_scale, bias, input_scale in layers]
+        self.sparse_fraction = sparse_fraction
+        self.spec = spec
+
+    @classmethod
+    def from_policy(cls, policy, observations, percentile=99.99, batch_size=256):
+        """
+        Quantize a float32 policy, calibrating the input scales on
+        `observations`, e.g. screens from recorded demonstrations.
+        """
+        calibration = _Calibration(policy, percentile)
+        for start in range(0, len(observations), batch_size):
+            calibration.q_values(observations[start:start + batch_size])
+        layers = []
+        for (kernel, bias), input_range in zip(policy.weights, calibration.input_ranges):
+            kernel_q, kernel_scale = quantize_kernel(kernel)
+            layers.append((kernel_q, kernel_scale, bias, (input_range or 1.0) / 127))
+        return cls(policy.spec, layers, policy.input_shape)
+
+    def _quantize(self, inputs, input_scale):
+        # quantized before the convolution, which copies every input into several patches
+        outputs = inputs * (1 / input_scale)
+        np_rint(outputs, out=outputs)
+        return np_clip(outputs, -127, 127, out=outputs)
+
+    def _layer(self, index, layer, inputs):
+        _, kernel_scale, bias, input_scale, kernel, bounds = self.layers[index]
+        inputs = self._quantize(inputs, input_scale)
+        if layer['type'] == 'conv2d':
+            patches = image_patches(inputs, layer['window'], layer.get('stride', 1), layer.get('padding', 'SAME'))
+            outputs = block_dot(patches.reshape(-1, patches.shape[-1]), kernel, bounds)
+            outputs = outputs.reshape(patches.shape[:3] + (-1,))
+        elif np_count_nonzero(inputs) <= self.sparse_fraction * inputs.size:
+            columns = np_flatnonzero(inputs.any(axis=0))
+            outputs = block_dot(inputs[:, columns], kernel[columns], np_searchsorted(columns, bounds))
+        else:
+            outputs = block_dot(inputs, kernel, bounds)
+        return (outputs * (input_scale * kernel_scale)).astype(np_float32, copy=False) + bias
+
+    def stored_bytes(self):
+        return sum(kernel_q.nbytes + kernel_scale.nbytes + bias.nbytes
+                   for kernel_q, kernel_scale, bias, _, _, _ in self.layers)
+
+    def save(self, path):
+        arrays = {'spec': json_dumps(self.spec)}
+        if self.input_shape is not None:
+            arrays['input_shape'] = self.input_shape
+        for index, (kernel_q, kernel_scale, bias, input_scale, _, _) in enumerate(self.layers):
+            arrays['kernel_{:03d}'.format(index)] = kernel_q
+            arrays['kernel_scale_{:03d}'.format(index)] = kernel_scale
+            arrays['bias_{:03d}'.format(index)] = bias
+            arrays['input_scale_{:03d}'.format(index)] = input_scale
+        np_savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np_load(path) as data:
+            spec = json_loads(str(data['spec']))
+            layers = [(data['kernel_{:03d}'.format(i)],
+                       data['kernel_scale_{:03d}'.format(i)],
+                       data['bias_{:03d}'.format(i)],
+                       float(data['input_scale_{:03d}'.format(i)]))
+                      for i in range(parameter_count(spec))]
+            input_shape = data['input_shape'] if 'input_shape' in data else None
+        return cls(spec, layers, input_shape)
@@ -0,0 +1,134 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Real-time execution of pysc2 agents under a per-step latency budget.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pysc2.lib import actions
+from sc2_agents.lib.agent_wrapper import AgentWrapper
+from sc2_agents.lib.game_time import step_budget
+from sc2_agents.lib.metrics import Registry
+from time import time
+
+
+class RealTimeAgent(AgentWrapper):
+    """
+    Steps the wrapped agent on a single worker thread and waits for its
+    decision at most `budget_seconds`. When the deadline is missed the
+    fallback is issued instead: the last action the agent decided on if
+    it is still available, otherwise `no_op`.
+
+    A decision that overruns keeps the worker busy, so the following steps
+    fall back without stepping the agent until it finishes; its late result
+    becomes the next fallback. Rewards of the steps the agent did not see
+    are added to its counters once it is idle again.
+
+    The budget defaults to the agent's `latency_budget` attribute and then
+    to one step at `step_mul=8`. Decision latencies and deadline misses are
+    kept in `registry`, which can be served with a MetricsServer.
+    """
+
+    def __init__(self, agent, budget_seconds=None, registry=None):
+        super(RealTimeAgent, self).__init__(agent)
+        self.budget_seconds = budget_seconds or getattr(agent, 'latency_budget', None) or step_budget(8)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.last_action = None
+        self.pending = None
+        self.registry = registry or Registry()
+        self.decision_seconds = self.registry.summary(
+            'sc2_agents_decision_seconds', "Latency of the agent's decisions in real-time mode")
+        self.deadline_misses = self.registry.counter(
+            'sc2_agents_deadline_misses_total', "Steps that issued a fallback action")
+        self.real_time_steps = self.registry.counter(
+            'sc2_agents_real_time_steps_total', "Steps taken in real-time mode")
+        self.unseen_reward = 0
+        self.unseen_steps = 0
+
+    def _decide(self, timestep):
+        start_time = time()
+        try:
+            return self.agent.step(timestep)
+        finally:
+            self.decision_seconds.observe(time() - start_time)
+
+    def _settle(self):
+        if self.pending is not None:
+            try:
+                self.last_action = self.pending.result()
+            finally:
+                self.pending = None
+        self.agent.reward += self.unseen_reward
+        self.agent.steps += self.unseen_steps
+        self.unseen_reward = 0
+        self.unseen_steps = 0
+
+    def fallback(self, timestep):
+        if self.last_action is not None and self.last_action.function in timestep.observation.available_actions:
+            return self.last_action
+        return actions.FunctionCall(actions.FUNCTIONS.no_op.id, [])
+
+    def reset(self):
+        self._settle()
+        self.last_action = None
+        super(RealTimeAgent, self).reset()
+
+    def step(self, timestep):
+        deadline = time() + self.budget_seconds
+        self.real_time_steps.inc()
+        if self.pending is not None and not self.pending.done():
+            self.unseen_reward += timestep.reward
+            self.unseen_steps += 1
+            self.deadline_misses.inc()
+            return self.fallback(timestep)
+        self._settle()
+        self.pending = self.executor.submit(self._decide, timestep)
+        try:
+            action = self.pending.result(timeout=max(deadline - time(), 0))
+        except FutureTimeoutError:
+            self.deadline_misses.inc()
+            return self.fallback(timestep)
+        self.pending = None
+        self.last_action = action
+        return action
+
+    def close(self):
+        if self.pending is not None:
+            self.pending.cancel()
+        self.executor.shutdown(wait=True)
+
+    def report(self):
+        steps = self.real_time_steps.value
+        quantiles = {'p{:g}'.format(100 * labels['quantile']): value
+                     for name, labels, value in self.decision_seconds.samples() if 'quantile' in labels}
+        report = {'budget_seconds': self.budget_seconds,
+                  'deadline_misses': int(self.deadline_misses.value),
+                  'decisions': self.decision_seconds.count,
+                  'miss_rate': self.deadline_misses.value / steps if steps else 0.0,
+                  'steps': int(steps)}
+        report.update(('decision_seconds_' + key, value) for key, value in quantiles.items())
+        return report
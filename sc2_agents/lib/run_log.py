@@ -0,0 +1,124 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Per-run training log kept next to a run's checkpoints.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from json import dump as json_dump
+from json import load as json_load
+from numpy import array as np_array
+from numpy import float64 as np_float64    # pylint: disable=E0611
+from numpy import int64 as np_int64    # pylint: disable=E0611
+from os import makedirs
+from os import path
+from os import replace
+from time import time
+
+RUN_LOG = 'run_log.json'
+
+
+class RunLog(object):
+    """
+    Episode rewards and lengths of a training run, with the timesteps and
+    wall-clock seconds spent on them.
+
+    The log is stored as `run_log.json` in the run directory. Opening a
+    directory that already holds a log continues it, so a run resumed from
+    a checkpoint extends the same curve.
+    """
+
+    def __init__(self, directory, resume=True):
+        self.directory = directory
+        self.episode_lengths = []
+        self.episode_rewards = []
+        self.seconds = 0.0
+        self.timesteps = 0
+        if resume and path.isfile(self.path):
+            with open(self.path) as file:
+                data = json_load(file)
+            self.episode_lengths = data['episode_lengths']
+            self.episode_rewards = data['episode_rewards']
+            self.seconds = data['seconds']
+            self.timesteps = data['timesteps']
+        self.start_time = time()
+        self.start_seconds = self.seconds
+
+    @property
+    def path(self):
+        return path.join(self.directory, RUN_LOG)
+
+    def episode(self, reward, length):
+        self.episode_rewards.append(float(reward))
+        self.episode_lengths.append(int(length))
+        self.timesteps += int(length)
+        self.seconds = self.start_seconds + time() - self.start_time
+
+    def rolling_reward(self, window=100):
+        rewards = self.episode_rewards[-window:]
+        return sum(rewards) / len(rewards) if rewards else float('-inf')
+
+    def timesteps_to_reward(self, target, window=100):
+        """
+        The (episodes, timesteps) played until the rolling reward first
+        reached `target`, or None if it never did.
+        """
+        total, timesteps = 0.0, 0
+        for index, (reward, length) in enumerate(zip(self.episode_rewards, self.episode_lengths)):
+            total += reward
+            timesteps += length
+            if index >= window:
+                total -= self.episode_rewards[index - window]
+            if total / min(index + 1, window) >= target:
+                return index + 1, timesteps
+        return None
+
+    def steps_per_second(self):
+        return self.timesteps / self.seconds if self.seconds else 0.0
+
+    def get_state(self):
+        return ({'seconds': self.seconds, 'timesteps': self.timesteps},
+                {'episode_lengths': np_array(self.episode_lengths, dtype=np_int64),
+                 'episode_rewards': np_array(self.episode_rewards, dtype=np_float64)})
+
+    def set_state(self, scalars, arrays):
+        self.episode_lengths = [int(length) for length in arrays['episode_lengths']]
+        self.episode_rewards = [float(reward) for reward in arrays['episode_rewards']]
+        self.seconds = scalars['seconds']
+        self.timesteps = scalars['timesteps']
+        self.start_time = time()
+        self.start_seconds = self.seconds
+
+    def save(self):
+        if not path.isdir(self.directory):
+            makedirs(self.directory)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as file:
+            json_dump({'episode_lengths': self.episode_lengths,
+                       'episode_rewards': self.episode_rewards,
+                       'seconds': self.seconds,
+                       'steps_per_second': self.steps_per_second(),
+                       'timesteps': self.timesteps}, file)
+        replace(temporary, self.path)
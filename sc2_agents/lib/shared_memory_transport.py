@@ -0,0 +1,189 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Shared-memory transport of observations from environment worker processes
+to a learner, passing only slot indices between processes.
+
+The slots live in a memory-mapped file (under /dev/shm where there is
+one), which any process can attach to by its path, so the transport runs
+on every Python the package supports rather than needing 3.8's
+multiprocessing.shared_memory.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from mmap import mmap
+from multiprocessing import get_context
+from numpy import dtype as np_dtype
+from numpy import ndarray as np_ndarray
+from numpy import prod as np_prod
+from numpy import uint64 as np_uint64    # pylint: disable=E0611
+from os import close as os_close
+from os import ftruncate
+from os import open as os_open
+from os import O_RDWR
+from os import path
+from os import remove
+from tempfile import gettempdir
+from tempfile import mkstemp
+
+SHARED_DIRECTORY = '/dev/shm' if path.isdir('/dev/shm') else gettempdir()
+
+
+class SlotReuseError(RuntimeError):
+    """
+    A slot was written again before the reader released it.
+    """
+
+
+class SharedSlots(object):
+    """
+    `num_slots` observation slots of one shape and dtype in a memory-mapped
+    file, each with a generation counter that `write` bumps.
+
+    Created without a `name` the slots get a new file, which `close`
+    removes; given the `name` of existing slots they attach to them.
+    """
+
+    def __init__(self, num_slots, shape, dtype='uint8', name=None):
+        self.dtype = np_dtype(dtype)
+        self.num_slots = num_slots
+        self.shape = tuple(shape)
+        self.slot_bytes = int(np_prod(self.shape)) * self.dtype.itemsize
+        size = num_slots * (self.slot_bytes + 8)
+        self.owner = name is None
+        if self.owner:
+            descriptor, self.name = mkstemp(prefix='sc2_agents_slots_', dir=SHARED_DIRECTORY)
+            ftruncate(descriptor, size)
+        else:
+            descriptor, self.name = os_open(name, O_RDWR), name
+        try:
+            self.memory = mmap(descriptor, size)
+        finally:
+            os_close(descriptor)
+        self.slots = np_ndarray((num_slots,) + self.shape, dtype=self.dtype, buffer=self.memory)
+        self.generations = np_ndarray((num_slots,), dtype=np_uint64, buffer=self.memory,
+                                      offset=num_slots * self.slot_bytes)
+
+    def __getstate__(self):
+        return {'dtype': self.dtype.str, 'name': self.name, 'num_slots': self.num_slots, 'shape': self.shape}
+
+    def __setstate__(self, state):
+        self.__init__(state['num_slots'], state['shape'], state['dtype'], name=state['name'])
+
+    def write(self, slot, observation):
+        """
+        Copy an observation into a slot and return its new generation.
+        """
+        self.slots[slot] = observation
+        self.generations[slot] += 1
+        return int(self.generations[slot])
+
+    def view(self, slot, generation):
+        """
+        The observation in a slot, without copying, checked to be the one
+        written as `generation`.
+        """
+        if int(self.generations[slot]) != generation:
+            raise SlotReuseError("Slot {} was overwritten before it was read".format(slot))
+        return self.slots[slot]
+
+    def close(self):
+        self.slots = self.generations = None
+        try:
+            self.memory.close()
+        except BufferError:
+            # a view handed out is still alive; the mapping goes with it
+            pass
+        if self.owner:
+            remove(self.name)
+            self.owner = False
+
+
+class SharedObservationRing(object):
+    """
+    A fixed set of preallocated observation slots in shared memory.
+
+    Writers take a free slot from the `free` queue, copy the observation
+    into it and post (slot, generation, info) on the `ready` queue; the
+    reader maps the slot without copying and hands it back with `release`
+    once it is done with it. With every slot in flight, `write` blocks (or
+    raises queue.Full after `timeout`), which is the back-pressure that
+    stops fast workers from overrunning the learner.
+
+    Each slot carries a generation counter that the writer bumps on every
+    write. The reader checks it against the message, so a slot reused
+    before it was released is detected instead of silently read.
+
+    The ring can be passed to worker processes as an argument; workers
+    attach to the same SharedSlots by name.
+    """
+
+    def __init__(self, num_slots, shape, dtype='uint8', context=None):
+        context = context or get_context()
+        self.dtype = np_dtype(dtype)
+        self.num_slots = num_slots
+        self.shape = tuple(shape)
+        self.memory = SharedSlots(num_slots, self.shape, self.dtype)
+        self.free = context.Queue()
+        self.ready = context.Queue()
+        self.held = set()
+        for slot in range(num_slots):
+            self.free.put(slot)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['held']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.held = set()
+
+    def write(self, observation, info=None, timeout=None):
+        """
+        Copy an observation into a free slot and post it to the reader.
+        """
+        slot = self.free.get(timeout=timeout)
+        self.ready.put((slot, self.memory.write(slot, observation), info))
+        return slot
+
+    def read(self, timeout=None):
+        """
+        Return (slot, observation view, info) for the next posted observation.
+        The view stays valid until the slot is released.
+        """
+        slot, generation, info = self.ready.get(timeout=timeout)
+        if slot in self.held:
+            raise SlotReuseError("Slot {} was overwritten before it was released".format(slot))
+        observation = self.memory.view(slot, generation)
+        self.held.add(slot)
+        return slot, observation, info
+
+    def release(self, slot):
+        self.held.remove(slot)
+        self.free.put(slot)
+
+    def close(self):
+        self.memory.close()
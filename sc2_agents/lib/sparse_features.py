@@ -0,0 +1,124 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Sparse coordinate-list representation of feature-screen layers.
+
+Scanning a dense screen with `(layer == value).nonzero()` costs a full pass
+per query. A SparseLayer makes one pass per frame to find the non-background
+pixels and groups their coordinates by value, after which each query only
+touches the pixels it returns.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from numpy import argsort as np_argsort
+from numpy import empty as np_empty
+from numpy import flatnonzero as np_flatnonzero
+from numpy import intp as np_intp    # pylint: disable=E0611
+from numpy import unique as np_unique
+from sc2_agents.lib.agent_wrapper import AgentWrapper
+
+SPARSE_KEY = 'feature_screen_sparse'
+
+
+class SparseLayer(object):
+    """
+    The coordinates of every non-background pixel of a layer, grouped by value.
+    Coordinates come back in row-major order, exactly as `nonzero()` returns them.
+    """
+
+    def __init__(self, layer, background=0):
+        self.background = background
+        self.layer = layer
+        self.width = layer.shape[1]
+        flat = layer.reshape(-1)
+        indices = np_flatnonzero(flat != background)
+        values = flat[indices]
+        order = np_argsort(values, kind='stable')
+        indices = indices[order]
+        values, starts = np_unique(values[order], return_index=True)
+        ends = list(starts[1:]) + [len(indices)]
+        self.groups = {int(value): indices[start:end] for value, start, end in zip(values, starts, ends)}
+        self.cache = {}
+
+    def values(self):
+        return sorted(self.groups)
+
+    def count(self, value):
+        group = self.groups.get(value)
+        return 0 if group is None else len(group)
+
+    def coordinates(self, value):
+        """
+        (ys, xs) of the pixels equal to `value`.
+        """
+        coordinates = self.cache.get(value)
+        if coordinates is not None:
+            return coordinates
+        if value == self.background:
+            coordinates = (self.layer == value).nonzero()
+        else:
+            group = self.groups.get(value)
+            if group is None:
+                group = np_empty(0, dtype=np_intp)
+            coordinates = (group // self.width, group % self.width)
+        self.cache[value] = coordinates
+        return coordinates
+
+
+def sparsify(observation, layers):
+    """
+    Attach SparseLayers for the named feature-screen layers to a pysc2
+    observation, where `screen_coordinates` will find them.
+    """
+    feature_screen = observation.feature_screen
+    observation[SPARSE_KEY] = {layer: SparseLayer(getattr(feature_screen, layer)) for layer in layers}
+    return observation
+
+
+def screen_coordinates(observation, layer, value):
+    """
+    (ys, xs) of the pixels of a feature-screen layer equal to `value`.
+    Uses the observation's sparse layers when present and falls back to
+    scanning the dense layer otherwise.
+    """
+    sparse = observation.get(SPARSE_KEY) if hasattr(observation, 'get') else None
+    if sparse is not None and layer in sparse:
+        return sparse[layer].coordinates(value)
+    return (getattr(observation.feature_screen, layer) == value).nonzero()
+
+
+class SparseObservationAgent(AgentWrapper):
+    """
+    Builds the sparse layers of each observation once before the wrapped
+    agent sees it.
+    """
+
+    def __init__(self, agent, layers=('player_relative', 'selected', 'unit_type')):
+        super(SparseObservationAgent, self).__init__(agent)
+        self.layers = layers
+
+    def step(self, timestep):
+        sparsify(timestep.observation, self.layers)
+        return super(SparseObservationAgent, self).step(timestep)
@@ -0,0 +1,186 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+A game-free stand-in for the MoveToBeacon and CollectMineralShards
+minigames, for benchmarks and policy evaluation on machines without
+StarCraft II.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from collections import namedtuple
+from numpy import array as np_array
+from numpy import clip as np_clip
+from numpy import hypot as np_hypot
+from numpy import int32 as np_int32    # pylint: disable=E0611
+from numpy import zeros as np_zeros
+from numpy.random import RandomState
+from sc2_agents.lib.synthetic_screens import mineral_shards_screen
+from sc2_agents.lib.synthetic_screens import move_to_beacon_screen
+from sc2_agents.lib.synthetic_screens import unit_radius
+
+# pysc2 function ids
+NO_OP = 0
+SELECT_ARMY = 7
+MOVE_SCREEN = 331
+
+FIRST, MID, LAST = 0, 1, 2
+
+
+class NamedDict(dict):
+    """
+    A dict whose keys can also be read as attributes, like pysc2's.
+    """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class TimeStep(namedtuple('TimeStep', ['step_type', 'reward', 'discount', 'observation'])):
+    """
+    Same fields and helpers as pysc2's environment.TimeStep.
+    """
+
+    def first(self):
+        return self.step_type == FIRST
+
+    def last(self):
+        return self.step_type == LAST
+
+
+class StandInMinigame(object):
+    """
+    Marines move towards the last Move_screen target at `marine_speed`
+    pixels per agent step. In MoveToBeacon reaching the beacon scores 1 and
+    moves it elsewhere; in CollectMineralShards every shard a marine
+    reaches scores 1 and a new set of 20 appears once all are collected.
+    An episode lasts `episode_steps` agent steps, as with step_mul=8.
+
+    `reset` and `step` return lists of TimeSteps like pysc2's SC2Env, and
+    `step` accepts a pysc2 FunctionCall or a plain (x, y) target.
+    """
+
+    def __init__(self, map_name='MoveToBeacon', screen_size=64, episode_steps=240, marine_speed=None, seed=None):
+        if map_name not in ('MoveToBeacon', 'CollectMineralShards'):
+            raise ValueError("No stand-in for map {}".format(map_name))
+        self.episode_steps = episode_steps
+        self.map_name = map_name
+        self.marine_speed = marine_speed or 3.0 * screen_size / 64
+        self.random = RandomState(seed)
+        self.screen_size = screen_size
+        self.reach = 2 * unit_radius(screen_size, 2)
+        self.destination = None
+        self.marines = None
+        self.targets = None
+        self.steps = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def observation_spec(self):
+        return {'feature_screen': (1, self.screen_size, self.screen_size)}
+
+    def action_spec(self):
+        return {'screen': (self.screen_size, self.screen_size)}
+
+    def _positions(self, count):
+        margin = unit_radius(self.screen_size, 3)
+        return self.random.uniform(margin, self.screen_size - margin, size=(count, 2))
+
+    def _screen(self):
+        marines = self.marines.astype(int)
+        targets = self.targets.astype(int)
+        if self.map_name == 'MoveToBeacon':
+            return move_to_beacon_screen(self.screen_size, targets[0], marines[0])
+        return mineral_shards_screen(self.screen_size, targets, marines)
+
+    def _timestep(self, step_type, reward):
+        observation = NamedDict(
+            available_actions=np_array([NO_OP, SELECT_ARMY, MOVE_SCREEN], dtype=np_int32),
+            feature_screen=NamedDict(player_relative=self._screen()),
+            player=np_zeros(11, dtype=np_int32))
+        return [TimeStep(step_type, reward, 0.0 if step_type == LAST else 1.0, observation)]
+
+    def reset(self):
+        self.steps = 0
+        if self.map_name == 'MoveToBeacon':
+            self.marines, self.targets = self._positions(1), self._positions(1)
+        else:
+            self.marines, self.targets = self._positions(2), self._positions(20)
+        self.destination = None
+        return self._timestep(FIRST, 0.0)
+
+    def step(self, actions):
+        action = actions[0] if isinstance(actions, list) else actions
+        if hasattr(action, 'function'):
+            if action.function == MOVE_SCREEN:
+                self.destination = np_array(action.arguments[1], dtype=float)
+        elif action is not None:
+            self.destination = np_array(action, dtype=float)
+        if self.destination is not None:
+            offsets = self.destination - self.marines
+            distances = np_hypot(offsets[:, 0], offsets[:, 1])[:, None]
+            moves = offsets * (self.marine_speed / distances.clip(min=self.marine_speed))
+            self.marines = np_clip(self.marines + moves, 0, self.screen_size - 1)
+        reward = 0.0
+        for marine in self.marines:
+            offsets = self.targets - marine
+            reached = np_hypot(offsets[:, 0], offsets[:, 1]) <= self.reach
+            reward += float(reached.sum())
+            if reached.any():
+                if self.map_name == 'MoveToBeacon':
+                    self.targets = self._positions(1)
+                else:
+                    self.targets = self.targets[~reached]
+        if not len(self.targets):
+            self.targets = self._positions(20)
+        self.steps += 1
+        return self._timestep(LAST if self.steps >= self.episode_steps else MID, reward)
+
+
+def coordinate_episodes(act_x, act_y, env, episodes, player_neutral=3):
+    """
+    Play `episodes` episodes moving to the coordinates chosen by a pair of
+    coordinate policies, the way MoveToBeaconAgent002 does, and return the
+    episode rewards.
+    """
+    rewards = []
+    for _ in range(episodes):
+        timestep = env.reset()[0]
+        total = 0.0
+        while not timestep.last():
+            screen = (timestep.observation.feature_screen.player_relative == player_neutral).astype(int)[None]
+            timestep = env.step((int(act_x(screen)[0]), int(act_y(screen)[0])))[0]
+            total += timestep.reward
+        rewards.append(total)
+    return rewards
@@ -0,0 +1,178 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Successive-halving search over training configurations.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from json import dump as json_dump
+from logging import getLogger
+from math import exp
+from math import log
+from multiprocessing.pool import ThreadPool
+from numpy.random import RandomState
+from os import makedirs
+from os import path
+from os import replace
+from sc2_agents.lib.run_log import RunLog
+
+LOGGER = getLogger(__name__)
+
+
+def sample_configs(search_space, num_configs, seed=None):
+    """
+    Draw configurations from a search space.
+
+    Each value of `search_space` is either a list to choose from or a
+    dict with one of the keys 'uniform', 'log_uniform' or 'int_uniform'
+    mapping to a [low, high] range.
+    """
+    random = RandomState(seed)
+    configs = []
+    for _ in range(num_configs):
+        config = {}
+        for name in sorted(search_space):
+            space = search_space[name]
+            if isinstance(space, list):
+                config[name] = space[random.randint(len(space))]
+            elif 'uniform' in space:
+                config[name] = float(random.uniform(*space['uniform']))
+            elif 'log_uniform' in space:
+                low, high = space['log_uniform']
+                config[name] = float(exp(random.uniform(log(low), log(high))))
+            elif 'int_uniform' in space:
+                low, high = space['int_uniform']
+                config[name] = int(random.randint(low, high + 1))
+            else:
+                raise ValueError("Unknown search space for {}: {}".format(name, space))
+        configs.append(config)
+    return configs
+
+
+class Trial(object):
+    """
+    One configuration under search and the scores it reached at each rung.
+    """
+
+    def __init__(self, trial_id, config, directory):
+        self.budget = 0
+        self.config = config
+        self.directory = directory
+        self.rungs = []
+        self.status = 'running'
+        self.trial_id = trial_id
+
+    @property
+    def score(self):
+        return self.rungs[-1]['rolling_reward'] if self.rungs else float('-inf')
+
+    def to_dict(self):
+        return {'budget': self.budget,
+                'config': self.config,
+                'directory': self.directory,
+                'rungs': self.rungs,
+                'status': self.status,
+                'trial_id': self.trial_id}
+
+
+class SuccessiveHalving(object):
+    """
+    Runs every configuration at `min_budget` timesteps, keeps the best
+    1 / `eta` of them by rolling episode reward and repeats with `eta`
+    times the budget until `max_budget` is reached or one trial is left.
+
+    `run_trial(trial, budget)` must train `trial` up to `budget` timesteps,
+    leaving a RunLog in `trial.directory`, and return True on success.
+    Up to `workers` trials of a rung run at the same time. The curve of
+    every trial at every rung is kept in `search.json` in `output_dir`.
+    """
+
+    def __init__(self, configs, run_trial, output_dir, min_budget, max_budget, eta=3, workers=4, window=100):
+        self.eta = eta
+        self.max_budget = max_budget
+        self.min_budget = min_budget
+        self.output_dir = output_dir
+        self.run_trial = run_trial
+        self.trials = [Trial(i, config, path.join(output_dir, 'trial_{:03d}'.format(i)))
+                       for i, config in enumerate(configs)]
+        self.window = window
+        self.workers = workers
+
+    def _run(self, trial, budget, rung):
+        try:
+            succeeded = self.run_trial(trial, budget)
+        except Exception:    # pylint: disable=W0703
+            LOGGER.exception("Trial {} failed".format(trial.trial_id))
+            succeeded = False
+        run_log = RunLog(trial.directory)
+        trial.budget = budget
+        trial.rungs.append({'budget': budget,
+                            'episode_rewards': run_log.episode_rewards,
+                            'rolling_reward': run_log.rolling_reward(self.window) if succeeded else float('-inf'),
+                            'rung': rung,
+                            'seconds': run_log.seconds})
+        if not succeeded:
+            trial.status = 'failed'
+        LOGGER.info("Trial {} rung {} budget {}: rolling reward {:0.2f}".format(
+            trial.trial_id, rung, budget, trial.score))
+
+    def save(self):
+        if not path.isdir(self.output_dir):
+            makedirs(self.output_dir)
+        search_path = path.join(self.output_dir, 'search.json')
+        with open(search_path + '.tmp', 'w') as file:
+            json_dump({'eta': self.eta,
+                       'max_budget': self.max_budget,
+                       'min_budget': self.min_budget,
+                       'trials': [trial.to_dict() for trial in self.trials],
+                       'window': self.window}, file, indent=4)
+        replace(search_path + '.tmp', search_path)
+
+    def run(self):
+        alive = list(self.trials)
+        budget = self.min_budget
+        rung = 0
+        pool = ThreadPool(self.workers)
+        try:
+            while alive:
+                pool.map(lambda trial: self._run(trial, budget, rung), alive)
+                alive = sorted((trial for trial in alive if trial.status != 'failed'),
+                               key=lambda trial: trial.score, reverse=True)
+                if budget >= self.max_budget or len(alive) <= 1:
+                    break
+                keep = max(1, len(alive) // self.eta)
+                for trial in alive[keep:]:
+                    trial.status = 'stopped'
+                alive = alive[:keep]
+                LOGGER.info("Rung {}: promoting trials {}".format(rung, [trial.trial_id for trial in alive]))
+                self.save()
+                budget = min(budget * self.eta, self.max_budget)
+                rung += 1
+        finally:
+            pool.close()
+        for trial in alive:
+            trial.status = 'completed'
+        self.save()
+        return alive[0] if alive else None
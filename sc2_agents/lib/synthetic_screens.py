@@ -0,0 +1,70 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Synthetic player_relative screens for benchmarks, stand-in environments
+and offline policy diagnostics.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from numpy import int32 as np_int32    # pylint: disable=E0611
+from numpy import ogrid as np_ogrid
+from numpy import zeros as np_zeros
+
+PLAYER_FRIENDLY = 1
+PLAYER_HOSTILE = 4
+PLAYER_NEUTRAL = 3
+
+
+def draw_disc(screen, x, y, radius, value):
+    """
+    Paint a filled disc of `value` centred on (x, y).
+    """
+    height, width = screen.shape
+    ys, xs = np_ogrid[:height, :width]
+    screen[(xs - x) ** 2 + (ys - y) ** 2 <= radius ** 2] = value
+    return screen
+
+
+def unit_radius(screen_size, radius_at_64=2):
+    """
+    Units cover proportionally more pixels at higher screen resolutions.
+    """
+    return max(1, int(round(radius_at_64 * screen_size / 64)))
+
+
+def move_to_beacon_screen(screen_size, beacon, marine, beacon_radius=None, marine_radius=None):
+    screen = np_zeros((screen_size, screen_size), dtype=np_int32)
+    draw_disc(screen, beacon[0], beacon[1], beacon_radius or unit_radius(screen_size, 3), PLAYER_NEUTRAL)
+    draw_disc(screen, marine[0], marine[1], marine_radius or unit_radius(screen_size, 1), PLAYER_FRIENDLY)
+    return screen
+
+
+def mineral_shards_screen(screen_size, shards, marines, shard_radius=None, marine_radius=None):
+    screen = np_zeros((screen_size, screen_size), dtype=np_int32)
+    for x, y in shards:
+        draw_disc(screen, x, y, shard_radius or unit_radius(screen_size, 1), PLAYER_NEUTRAL)
+    for x, y in marines:
+        draw_disc(screen, x, y, marine_radius or unit_radius(screen_size, 1), PLAYER_FRIENDLY)
+    return screen
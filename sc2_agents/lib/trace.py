@@ -0,0 +1,353 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Observation traces: the exact timesteps an agent saw, recorded into one
+compact file and replayed to any agent without a game binary.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from json import dumps as json_dumps
+from json import loads as json_loads
+from logging import getLogger
+from numpy import array as np_array
+from numpy import asarray as np_asarray
+from numpy import ascontiguousarray as np_ascontiguousarray
+from numpy import concatenate as np_concatenate
+from numpy import cumsum as np_cumsum
+from numpy import float32 as np_float32    # pylint: disable=E0611
+from numpy import frombuffer as np_frombuffer
+from numpy import int32 as np_int32    # pylint: disable=E0611
+from numpy import int64 as np_int64    # pylint: disable=E0611
+from numpy import load as np_load
+from numpy import ndarray
+from numpy import percentile as np_percentile
+from numpy import savez as np_savez
+from numpy import stack as np_stack
+from numpy import uint16 as np_uint16    # pylint: disable=E0611
+from numpy import uint8 as np_uint8    # pylint: disable=E0611
+from numpy import zeros as np_zeros
+from numpy.random import seed as np_seed
+from random import seed as random_seed
+from sc2_agents.lib.agent_wrapper import AgentWrapper
+from sc2_agents.lib.standin_env import NamedDict
+from sc2_agents.lib.standin_env import TimeStep
+from time import perf_counter
+from zlib import compress
+from zlib import decompress
+
+LOGGER = getLogger(__name__)
+LAYER_FIELDS = ('feature_screen', 'feature_minimap')
+TRACE_VERSION = 1
+
+
+def layer_names(layers):
+    """
+    The names of the layers of a feature_screen or feature_minimap, in order.
+    """
+    if hasattr(layers, 'keys'):
+        return list(layers.keys())
+    index_names = getattr(layers, '_index_names', None)
+    if index_names and index_names[0]:
+        return sorted(index_names[0], key=index_names[0].get)
+    from pysc2.lib import features
+    field_features = features.SCREEN_FEATURES if len(layers) == len(features.SCREEN_FEATURES) else features.MINIMAP_FEATURES
+    return [feature.name for feature in field_features]
+
+
+def stack_layers(layers):
+    """
+    The layers of a feature_screen or feature_minimap as one (layers, height, width) array.
+    """
+    if hasattr(layers, 'keys'):
+        return np_stack([np_asarray(layer) for layer in layers.values()])
+    return np_asarray(layers)
+
+
+def compact(array):
+    """
+    The array in the narrowest unsigned dtype that holds its values exactly.
+    """
+    if array.dtype.kind not in 'iu' or array.size == 0 or array.min() < 0:
+        return array
+    for dtype in (np_uint8, np_uint16):
+        if array.max() <= (1 << 8 * dtype().itemsize) - 1:
+            return array.astype(dtype)
+    return array
+
+
+def action_record(action):
+    """
+    A FunctionCall as a JSON-friendly [function_id, arguments] pair.
+    """
+    return [int(action.function), [[int(value) for value in argument] for argument in action.arguments]]
+
+
+class LayerArray(ndarray):
+    """
+    A stack of feature layers whose layers can also be read by name,
+    as attributes or string keys, like pysc2's named arrays.
+    """
+
+    def __new__(cls, array, names):
+        layers = np_asarray(array).view(cls)
+        layers.names = {name: index for index, name in enumerate(names)}
+        return layers
+
+    def __array_finalize__(self, obj):
+        self.names = getattr(obj, 'names', None)
+
+    def __getattr__(self, name):
+        names = self.__dict__.get('names')
+        if names and name in names:
+            return self[name]
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return super(LayerArray, self).__getitem__(self.names[key]).view(ndarray)
+        return super(LayerArray, self).__getitem__(key)
+
+
+class TraceRecorder(AgentWrapper):
+    """
+    Records every timestep the wrapped agent sees, and the action it takes.
+
+    The feature layers of each step are zlib-compressed on arrival (they
+    are mostly empty, so a 64x64 screen shrinks to a few hundred bytes),
+    the other observation fields (`player`, `available_actions`,
+    `game_loop`, ...) are kept as they are, ragged fields as a
+    concatenation plus per-step lengths. `close` writes everything to a
+    single .npz file that loads without pickle.
+    """
+
+    def __init__(self, agent, path, fields=None):
+        super(TraceRecorder, self).__init__(agent)
+        self.fields = fields
+        self.path = path
+        self.episode = -1
+        self.obs_spec = None
+        self.layers = {}
+        self.values = {}
+        self.records = {'episode': [], 'step_type': [], 'reward': [], 'discount': [], 'action': []}
+        self.raw_bytes = 0
+
+    def setup(self, obs_spec, action_spec):
+        super(TraceRecorder, self).setup(obs_spec, action_spec)
+        try:
+            self.obs_spec = {key: [int(size) for size in shape] for key, shape in obs_spec.items()}
+        except (AttributeError, TypeError, ValueError):
+            self.obs_spec = None
+
+    def reset(self):
+        super(TraceRecorder, self).reset()
+        self.episode += 1
+
+    def _record_layers(self, field, layers):
+        frame = np_ascontiguousarray(stack_layers(layers))
+        record = self.layers.get(field)
+        if record is None:
+            record = self.layers[field] = {'names': layer_names(layers), 'blobs': [],
+                                           'shape': list(frame.shape), 'dtype': frame.dtype.str}
+        self.raw_bytes += frame.nbytes
+        record['blobs'].append(compress(frame.astype(record['dtype'], copy=False).data, 6))
+
+    def _record_value(self, field, value):
+        value = np_asarray(value)
+        self.raw_bytes += value.nbytes
+        self.values.setdefault(field, []).append(value)
+
+    def step(self, timestep):
+        action = super(TraceRecorder, self).step(timestep)
+        observation = timestep.observation
+        for field in self.fields or observation.keys():
+            if field not in observation:
+                continue
+            if field in LAYER_FIELDS:
+                self._record_layers(field, observation[field])
+            else:
+                self._record_value(field, observation[field])
+        self.records['episode'].append(self.episode)
+        self.records['step_type'].append(int(timestep.step_type))
+        self.records['reward'].append(float(timestep.reward or 0))
+        self.records['discount'].append(float(timestep.discount))
+        self.records['action'].append(action_record(action))
+        return action
+
+    def _arrays(self):
+        arrays = {'episode': np_array(self.records['episode'], dtype=np_int32),
+                  'step_type': np_array(self.records['step_type'], dtype=np_uint8),
+                  'reward': np_array(self.records['reward'], dtype=np_float32),
+                  'discount': np_array(self.records['discount'], dtype=np_float32)}
+        layers = {}
+        for field, record in self.layers.items():
+            lengths = np_array([len(blob) for blob in record['blobs']], dtype=np_int64)
+            arrays[field + '/blobs'] = np_frombuffer(b''.join(record['blobs']), dtype=np_uint8)
+            arrays[field + '/lengths'] = lengths
+            layers[field] = {key: record[key] for key in ('names', 'shape', 'dtype')}
+        shapes = {}
+        for field, values in self.values.items():
+            if all(value.shape == values[0].shape for value in values):
+                arrays[field] = compact(np_stack(values))
+                shapes[field] = {'ragged': False, 'dtype': values[0].dtype.str}
+            elif all(value.ndim >= 1 and value.shape[1:] == values[0].shape[1:] for value in values):
+                arrays[field] = compact(np_concatenate(values))
+                arrays[field + '/lengths'] = np_array([len(value) for value in values], dtype=np_int64)
+                shapes[field] = {'ragged': True, 'dtype': values[0].dtype.str}
+            else:
+                LOGGER.warning("Skipping {}: its shape changes in more than the first axis".format(field))
+        arrays['header'] = np_array(json_dumps({'version': TRACE_VERSION,
+                                                'agent': self.agent.__class__.__name__,
+                                                'obs_spec': self.obs_spec,
+                                                'layers': layers,
+                                                'values': shapes,
+                                                'actions': self.records['action']}))
+        return arrays
+
+    def close(self):
+        """
+        Write the trace and return its size in bytes.
+        """
+        if not self.records['step_type']:
+            return 0
+        arrays = self._arrays()
+        with open(self.path, 'wb') as file:
+            np_savez(file, **arrays)
+            size = file.tell()
+        LOGGER.info("Wrote {} steps to {} ({:.1f} kB, {:.1f}x smaller than raw)".format(
+            len(self.records['step_type']), self.path, size / 1024, self.raw_bytes / max(size, 1)))
+        return size
+
+
+class Trace(object):
+    """
+    A recorded trace, decoded back into pysc2-style timesteps.
+
+    Observations are NamedDicts whose feature layers are LayerArrays, so
+    agents read `observation.feature_screen.player_relative`,
+    `observation['player']` and `observation.available_actions` exactly
+    as they would from the game.
+    """
+
+    def __init__(self, path):
+        with np_load(path, allow_pickle=False) as trace:
+            arrays = {key: trace[key] for key in trace.files}
+        self.header = json_loads(str(arrays['header']))
+        if self.header['version'] != TRACE_VERSION:
+            raise ValueError("{} has trace version {}, expected {}".format(
+                path, self.header['version'], TRACE_VERSION))
+        self.actions = [(function, arguments) for function, arguments in self.header['actions']]
+        self.episodes = arrays['episode']
+        self.step_types = arrays['step_type']
+        self.rewards = arrays['reward']
+        self.discounts = arrays['discount']
+        self.fields = {}
+        for field, layers in self.header['layers'].items():
+            self.fields[field] = self._decode_layers(arrays[field + '/blobs'], arrays[field + '/lengths'], layers)
+        for field, values in self.header['values'].items():
+            # fields were narrowed by `compact`, agents see their original dtype
+            field_values = arrays[field].astype(values['dtype'])
+            if values['ragged']:
+                offsets = np_concatenate([np_zeros(1, dtype=np_int64), np_cumsum(arrays[field + '/lengths'])])
+                self.fields[field] = [field_values[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+            else:
+                self.fields[field] = list(field_values)
+
+    def __len__(self):
+        return len(self.step_types)
+
+    @staticmethod
+    def _decode_layers(blobs, lengths, layers):
+        frames = []
+        start = 0
+        for length in lengths:
+            data = decompress(blobs[start:start + length].data)
+            frame = np_frombuffer(data, dtype=layers['dtype']).reshape(layers['shape'])
+            frames.append(LayerArray(frame, layers['names']))
+            start += length
+        return frames
+
+    @property
+    def obs_spec(self):
+        return self.header['obs_spec']
+
+    def timestep(self, index):
+        observation = NamedDict((field, values[index]) for field, values in self.fields.items())
+        return TimeStep(int(self.step_types[index]),
+                        float(self.rewards[index]),
+                        float(self.discounts[index]),
+                        observation)
+
+    def timesteps(self):
+        """
+        Every recorded timestep, decoded up front.
+        """
+        return [self.timestep(index) for index in range(len(self))]
+
+
+def replay(agent, trace, repeat=1, seed=None, compare=True, max_mismatches=10):
+    """
+    Feed a Trace to an agent as fast as it can take it.
+
+    Timesteps are decoded before the clock starts, so the timings cover
+    only the agent. The agent is `reset` at the first step of every
+    episode, as pysc2's run loop does. When `compare` is set every action
+    is checked against the recorded one; `seed` seeds `random` and
+    `numpy.random` before each pass so that agents that draw random
+    numbers can still reproduce the recorded decisions.
+    """
+    timesteps = trace.timesteps()
+    agent.setup(trace.obs_spec, None)
+    latencies = []
+    mismatches = []
+    mismatch_count = 0
+    start = perf_counter()
+    for _ in range(repeat):
+        if seed is not None:
+            random_seed(seed)
+            np_seed(seed)
+        for index, timestep in enumerate(timesteps):
+            if timestep.first():
+                agent.reset()
+            step_start = perf_counter()
+            action = agent.step(timestep)
+            latencies.append(perf_counter() - step_start)
+            if compare:
+                decision = action_record(action)
+                if tuple(decision) != trace.actions[index]:
+                    mismatch_count += 1
+                    if len(mismatches) < max_mismatches:
+                        mismatches.append({'step': index, 'recorded': list(trace.actions[index]), 'replayed': decision})
+    seconds = perf_counter() - start
+    latencies = np_array(latencies)
+    report = {'steps': len(latencies),
+              'seconds': seconds,
+              'steps_per_second': len(latencies) / seconds if seconds else 0.0,
+              'step_ms_mean': 1000 * float(latencies.mean()) if len(latencies) else 0.0,
+              'step_ms_p50': 1000 * float(np_percentile(latencies, 50)) if len(latencies) else 0.0,
+              'step_ms_p99': 1000 * float(np_percentile(latencies, 99)) if len(latencies) else 0.0}
+    if compare:
+        report['mismatches'] = mismatch_count
+        report['first_mismatches'] = mismatches
+    return report
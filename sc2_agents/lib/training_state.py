@@ -0,0 +1,185 @@
+# MIT License
+#
+# Copyright (c) 2018 Benjamin Bueno (bbueno5000)
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Snapshots of the complete state of a training run, for resuming it
+where it stopped.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from json import dump as json_dump
+from json import load as json_load
+from logging import getLogger
+from numpy import ascontiguousarray as np_ascontiguousarray
+from numpy import asarray as np_asarray
+from numpy import load as np_load
+from numpy import ndarray
+from numpy import save as np_save
+from numpy import uint32 as np_uint32    # pylint: disable=E0611
+from numpy.random import get_state as np_get_state
+from numpy.random import set_state as np_set_state
+from os import listdir
+from os import makedirs
+from os import path
+from os import replace
+from random import getstate as random_getstate
+from random import setstate as random_setstate
+from shutil import rmtree
+from time import time
+
+LOGGER = getLogger(__name__)
+LATEST = 'LATEST'
+STATE_FILE = 'state.json'
+
+
+def random_state(random=None):
+    """
+    The state of a numpy RandomState (the global one by default) as
+    (scalars, arrays).
+    """
+    _, keys, position, has_gauss, cached_gaussian = random.get_state() if random is not None else np_get_state()
+    return ({'position': int(position), 'has_gauss': int(has_gauss), 'cached_gaussian': float(cached_gaussian)},
+            {'keys': keys})
+
+
+def set_random_state(scalars, arrays, random=None):
+    state = ('MT19937', np_asarray(arrays['keys'], dtype=np_uint32),
+             scalars['position'], scalars['has_gauss'], scalars['cached_gaussian'])
+    if random is not None:
+        random.set_state(state)
+    else:
+        np_set_state(state)
+
+
+class GlobalRandomState(object):
+    """
+    The state of `random` and `numpy.random`, as a TrainingState component.
+    """
+
+    def get_state(self):
+        scalars, arrays = random_state()
+        version, internal, gauss_next = random_getstate()
+        scalars['python'] = [version, list(internal), gauss_next]
+        return scalars, arrays
+
+    def set_state(self, scalars, arrays):
+        set_random_state(scalars, arrays)
+        version, internal, gauss_next = scalars['python']
+        random_setstate((version, tuple(internal), gauss_next))
+
+
+class TrainingState(object):
+    """
+    Numbered snapshots of a run's components in `directory`.
+
+    A component is any object with `get_state()`, returning a dict of
+    JSON scalars and a dict of arrays, and `set_state(scalars, arrays)`.
+    Each array is written as its own .npy file and loaded back memory
+    mapped copy-on-write, so resuming maps even a large replay buffer
+    instantly and reads its pages as they are touched.
+
+    A snapshot is written to a temporary directory that is renamed into
+    place, and the LATEST file is then replaced to point at it, so a run
+    stopped mid-save resumes from the previous complete snapshot. The
+    last `keep` snapshots are kept.
+    """
+
+    def __init__(self, directory, keep=2):
+        self.directory = directory
+        self.keep = keep
+
+    def _snapshots(self):
+        if not path.isdir(self.directory):
+            return []
+        return sorted(name for name in listdir(self.directory)
+                      if name.startswith('state-') and not name.endswith('.tmp'))
+
+    @property
+    def latest(self):
+        """
+        The directory of the last complete snapshot, or None.
+        """
+        try:
+            with open(path.join(self.directory, LATEST)) as file:
+                name = file.read().strip()
+        except IOError:
+            return None
+        return path.join(self.directory, name) if path.isdir(path.join(self.directory, name)) else None
+
+    def save(self, components, scalars=None):
+        """
+        Snapshot every component of the `components` dict, plus a dict of
+        run `scalars`, and return the seconds it took.
+        """
+        start_time = time()
+        snapshots = self._snapshots()
+        number = int(snapshots[-1].split('-')[1]) + 1 if snapshots else 0
+        name = 'state-{:08d}'.format(number)
+        temporary = path.join(self.directory, name + '.tmp')
+        if path.isdir(temporary):
+            rmtree(temporary)
+        makedirs(temporary)
+        state = {'components': {}, 'scalars': scalars or {}, 'saved_at': time()}
+        for component_name, component in components.items():
+            component_scalars, arrays = component.get_state()
+            for key, array in arrays.items():
+                np_save(path.join(temporary, '{}.{}.npy'.format(component_name, key)), np_ascontiguousarray(array))
+            state['components'][component_name] = {'scalars': component_scalars, 'arrays': sorted(arrays)}
+        with open(path.join(temporary, STATE_FILE), 'w') as file:
+            json_dump(state, file)
+        replace(temporary, path.join(self.directory, name))
+        with open(path.join(self.directory, LATEST + '.tmp'), 'w') as file:
+            file.write(name)
+        replace(path.join(self.directory, LATEST + '.tmp'), path.join(self.directory, LATEST))
+        for old in self._snapshots()[:-self.keep]:
+            rmtree(path.join(self.directory, old), ignore_errors=True)
+        seconds = time() - start_time
+        LOGGER.info("Saved training state {} in {:.2f}s".format(name, seconds))
+        return seconds
+
+    def load(self, components, mmap_mode='c'):
+        """
+        Restore every component of the `components` dict from the last
+        snapshot and return its run scalars, or None when there is no
+        snapshot to resume from.
+        """
+        snapshot = self.latest
+        if snapshot is None:
+            return None
+        start_time = time()
+        with open(path.join(snapshot, STATE_FILE)) as file:
+            state = json_load(file)
+        missing = set(components) - set(state['components'])
+        if missing:
+            raise ValueError("{} holds no state for {}".format(snapshot, ', '.join(sorted(missing))))
+        for component_name, component in components.items():
+            saved = state['components'][component_name]
+            arrays = {}
+            for key in saved['arrays']:
+                array = np_load(path.join(snapshot, '{}.{}.npy'.format(component_name, key)), mmap_mode=mmap_mode)
+                # a plain ndarray view keeps the mapping without memmap's per-operation overhead
+                arrays[key] = array.view(ndarray) if mmap_mode else array
+            component.set_state(saved['scalars'], arrays)
+        LOGGER.info("Resumed from {} in {:.2f}s".format(snapshot, time() - start_time))
+        return state['scalars']
@@ -31,5 +31,6 @@ setup(name='sc2_agents',
       url='https://github.com/bbueno5000/sc2_agents',
       packages=['sc2_agents',
                 'sc2_agents.agents',
-                'sc2_agents.bin'],
+                'sc2_agents.bin',
+                'sc2_agents.lib'],
       install_requires=['pysc2', 'tensorflow==1.4'])